@@ -0,0 +1,47 @@
+"""add outbox
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-15 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create outbox table for callback deliveries
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('subscription_id', sa.Integer(), nullable=False),
+        sa.Column('callback_url', sa.String(), nullable=False),
+        sa.Column('post_guid', sa.String(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('status', sa.String(16), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['subscription_id'], ['subscriptions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_outbox_pending_next_attempt_at',
+        'outbox',
+        ['next_attempt_at'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade():
+    op.drop_index('ix_outbox_pending_next_attempt_at', table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,34 @@
+"""cascade posts on channel delete
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-03-16 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Posts now record ingested guids, they must not block channel deletion
+    op.drop_constraint('posts_channel_id_fkey', 'posts', type_='foreignkey')
+    op.create_foreign_key(
+        'posts_channel_id_fkey',
+        'posts', 'channels',
+        ['channel_id'], ['id'],
+        ondelete='CASCADE'
+    )
+
+
+def downgrade():
+    op.drop_constraint('posts_channel_id_fkey', 'posts', type_='foreignkey')
+    op.create_foreign_key(
+        'posts_channel_id_fkey',
+        'posts', 'channels',
+        ['channel_id'], ['id']
+    )
@@ -0,0 +1,34 @@
+"""add shared post agents
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-03-17 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Post agents shared by channels, one per shard
+    op.create_table(
+        'shared_post_agents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('huginn_agent_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('shard'),
+        sa.UniqueConstraint('huginn_agent_id')
+    )
+
+
+def downgrade():
+    op.drop_table('shared_post_agents')
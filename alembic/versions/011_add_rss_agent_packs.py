@@ -0,0 +1,36 @@
+"""add rss agent packs
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-03-18 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # RSS agents polling feeds of several channels
+    op.create_table(
+        'rss_agent_packs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('huginn_rss_agent_id', sa.Integer(), nullable=False),
+        sa.Column('huginn_post_agent_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('huginn_rss_agent_id')
+    )
+    # Состав пака выбирается по RSS агенту канала
+    op.create_index('ix_channels_huginn_rss_agent_id', 'channels', ['huginn_rss_agent_id'])
+
+
+def downgrade():
+    op.drop_index('ix_channels_huginn_rss_agent_id', table_name='channels')
+    op.drop_table('rss_agent_packs')
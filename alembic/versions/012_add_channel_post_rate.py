@@ -0,0 +1,29 @@
+"""add channel post rate
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-03-19 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Observed posting rate and current polling schedule of channels
+    op.add_column('channels', sa.Column('last_post_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('channels', sa.Column('post_interval_ewma', sa.Float(), nullable=True))
+    op.add_column('channels', sa.Column('poll_schedule', sa.String(16), nullable=True))
+
+
+def downgrade():
+    op.drop_column('channels', 'poll_schedule')
+    op.drop_column('channels', 'post_interval_ewma')
+    op.drop_column('channels', 'last_post_at')
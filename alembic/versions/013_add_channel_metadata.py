@@ -0,0 +1,29 @@
+"""add channel metadata
+
+Revision ID: 013
+Revises: 012
+Create Date: 2024-03-21 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Title and photo of channels cached from RSSHub feeds
+    op.add_column('channels', sa.Column('title', sa.String(255), nullable=True))
+    op.add_column('channels', sa.Column('photo_url', sa.String(1024), nullable=True))
+    op.add_column('channels', sa.Column('metadata_checked_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('channels', 'metadata_checked_at')
+    op.drop_column('channels', 'photo_url')
+    op.drop_column('channels', 'title')
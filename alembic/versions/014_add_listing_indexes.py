@@ -0,0 +1,25 @@
+"""add listing indexes
+
+Revision ID: 014
+Revises: 013
+Create Date: 2024-03-22 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination of subscriptions filtered by channel or callback URL
+    op.create_index('ix_subscriptions_channel_id_id', 'subscriptions', ['channel_id', 'id'])
+    op.create_index('ix_subscriptions_callback_url_id', 'subscriptions', ['callback_url', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_subscriptions_callback_url_id', table_name='subscriptions')
+    op.drop_index('ix_subscriptions_channel_id_id', table_name='subscriptions')
@@ -0,0 +1,30 @@
+"""add outbox cleanup index
+
+Revision ID: 015
+Revises: 014
+Create Date: 2024-03-23 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Retention sweep of delivered and failed outbox rows
+    op.create_index(
+        'ix_outbox_finished_created_at',
+        'outbox',
+        ['created_at'],
+        postgresql_where=sa.text("status <> 'pending'")
+    )
+
+
+def downgrade():
+    op.drop_index('ix_outbox_finished_created_at', table_name='outbox')
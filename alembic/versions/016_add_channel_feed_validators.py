@@ -0,0 +1,27 @@
+"""add channel feed validators
+
+Revision ID: 016
+Revises: 015
+Create Date: 2024-03-24 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Conditional GET validators of the last feed response seen by the native poller
+    op.add_column('channels', sa.Column('feed_etag', sa.String(255), nullable=True))
+    op.add_column('channels', sa.Column('feed_last_modified', sa.String(64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('channels', 'feed_last_modified')
+    op.drop_column('channels', 'feed_etag')
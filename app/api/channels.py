@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import get_channel_repository, get_channel_service
+from app.repositories.channel_repository import ChannelRepository
+from app.schemas.channel import ChannelBatchCreate, ChannelBatchResponse, ChannelPage
+from app.services.channel_service import ChannelService
+
+router = APIRouter()
+
+@router.get("/", response_model=ChannelPage)
+async def list_channels(
+    after: int | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    channel_name: str | None = None,
+    is_monitored: bool | None = None,
+    callback_url: str | None = Query(None, description="only channels subscribed by this callback URL"),
+    channel_repository: ChannelRepository = Depends(get_channel_repository)
+):
+    """
+    List channels ordered by ID.
+    Pages are fetched by ID cursor, so every page costs the same.
+    """
+    rows = await channel_repository.list_page(
+        limit + 1, after, channel_name=channel_name, is_monitored=is_monitored, callback_url=callback_url
+    )
+    items = rows[:limit]
+    return ChannelPage(
+        items=items,
+        next_cursor=items[-1]["id"] if len(rows) > limit else None
+    )
+
+@router.post("/batch", response_model=ChannelBatchResponse, status_code=201)
+async def create_channels(
+    channels: ChannelBatchCreate,
+    channel_service: ChannelService = Depends(get_channel_service)
+):
+    """
+    Start monitoring many Telegram channels at once.
+    Huginn agents of all new channels are created with one scenario import.
+    """
+    created, existing = await channel_service.create_channels(channels.channel_urls)
+    return ChannelBatchResponse(created=created, existing=existing)
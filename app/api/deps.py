@@ -2,30 +2,34 @@
 
 from typing import AsyncGenerator
 
+import httpx
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.core.http_client import get_http_client
+from app.db.session import get_async_db
+from app.repositories.channel_repository import ChannelRepository
 from app.repositories.subscription_repository import SubscriptionRepository
 from app.services.channel_service import ChannelService
 from app.services.webhook_service import WebhookService
 
 
-def get_db_session() -> Session:
-    db = next(get_db())
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_channel_service(db: Session = Depends(get_db_session)) -> ChannelService:
-    return ChannelService(db)
+async def get_channel_service(
+    db: AsyncSession = Depends(get_async_db),
+    http_client: httpx.AsyncClient = Depends(get_http_client)
+) -> AsyncGenerator[ChannelService, None]:
+    async with ChannelService(db, http_client=http_client) as service:
+        yield service
 
 async def get_webhook_service(
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db),
+    http_client: httpx.AsyncClient = Depends(get_http_client)
 ) -> AsyncGenerator[WebhookService, None]:
-    async with WebhookService(db) as service:
+    async with WebhookService(db, http_client=http_client) as service:
         yield service
 
-def get_subscription_repository(db: Session = Depends(get_db)) -> SubscriptionRepository:
+def get_subscription_repository(db: AsyncSession = Depends(get_async_db)) -> SubscriptionRepository:
     return SubscriptionRepository(db)
+
+def get_channel_repository(db: AsyncSession = Depends(get_async_db)) -> ChannelRepository:
+    return ChannelRepository(db)
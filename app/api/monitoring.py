@@ -0,0 +1,12 @@
+# app/api/monitoring.py
+
+from fastapi import APIRouter
+
+from app.services.webhook_service import callback_circuit_breakers
+
+router = APIRouter()
+
+@router.get("/circuit-breakers")
+async def get_circuit_breakers():
+    """State of circuit breakers protecting callback hosts"""
+    return callback_circuit_breakers.snapshot()
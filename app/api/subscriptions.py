@@ -1,11 +1,42 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from app.api.deps import get_channel_service
-from app.schemas.subscription import SubscriptionCreate, SubscriptionResponse
+from app.api.deps import get_channel_service, get_subscription_repository
+from app.repositories.subscription_repository import SubscriptionRepository
+from app.schemas.subscription import (
+    SubscriptionBatchCreate,
+    SubscriptionBatchDelete,
+    SubscriptionBatchDeleteResponse,
+    SubscriptionBatchResponse,
+    SubscriptionCreate,
+    SubscriptionPage,
+    SubscriptionResponse,
+)
 from app.services.channel_service import ChannelService
 
 router = APIRouter()
 
+@router.get("/", response_model=SubscriptionPage)
+async def list_subscriptions(
+    after: int | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    callback_url: str | None = None,
+    channel_name: str | None = None,
+    is_active: bool | None = None,
+    subscription_repository: SubscriptionRepository = Depends(get_subscription_repository)
+):
+    """
+    List subscriptions ordered by ID.
+    Pages are fetched by ID cursor, so every page costs the same.
+    """
+    rows = await subscription_repository.list_page(
+        limit + 1, after, callback_url=callback_url, channel_name=channel_name, is_active=is_active
+    )
+    items = rows[:limit]
+    return SubscriptionPage(
+        items=items,
+        next_cursor=items[-1]["id"] if len(rows) > limit else None
+    )
+
 @router.post("/", response_model=SubscriptionResponse)
 async def create_subscription(
     subscription: SubscriptionCreate,
@@ -17,6 +48,34 @@ async def create_subscription(
     """
     return await channel_service.create_subscription(subscription)
 
+@router.post("/batch", response_model=SubscriptionBatchResponse)
+async def create_subscriptions(
+    subscriptions: SubscriptionBatchCreate,
+    channel_service: ChannelService = Depends(get_channel_service)
+):
+    """
+    Subscribe one callback URL to many Telegram channels.
+    Every channel gets its own result, failed channels do not fail the batch.
+    """
+    results = await channel_service.create_subscriptions(
+        subscriptions.channel_urls, str(subscriptions.callback_url)
+    )
+    return SubscriptionBatchResponse(results=results)
+
+@router.post("/batch/delete", response_model=SubscriptionBatchDeleteResponse)
+async def delete_subscriptions(
+    subscriptions: SubscriptionBatchDelete,
+    channel_service: ChannelService = Depends(get_channel_service)
+):
+    """
+    Delete many subscriptions at once, e.g. all subscriptions of a callback URL.
+    Monitoring of channels left without subscribers is stopped.
+    """
+    return await channel_service.delete_subscriptions(
+        subscriptions.subscription_ids,
+        str(subscriptions.callback_url) if subscriptions.callback_url else None
+    )
+
 @router.delete("/{subscription_id}", status_code=204)
 async def delete_subscription(
     subscription_id: int,
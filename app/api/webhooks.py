@@ -1,6 +1,6 @@
 # app/api/webhooks.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, status
 
 from app.api.deps import get_webhook_service
 from app.schemas.post import PostWebhook
@@ -11,8 +11,27 @@ router = APIRouter()
 @router.post("/rss")
 async def process_rss_webhook(
     post: PostWebhook,
+    response: Response,
     webhook_service: WebhookService = Depends(get_webhook_service)
 ):
-    """Process incoming webhook from Huginn RSS agent"""
-    await webhook_service.process_post(post)
-    return {"status": "success"} 
\ No newline at end of file
+    """
+    Process incoming webhook from Huginn RSS agent.
+    Deliveries queued to the outbox are sent to subscribers in background
+    and answered with 202, otherwise the post is already delivered.
+    """
+    if await webhook_service.process_post(post):
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"status": "accepted"}
+    return {"status": "success"}
+
+@router.post("/rss/batch", status_code=202)
+async def process_rss_webhook_batch(
+    posts: list[PostWebhook],
+    webhook_service: WebhookService = Depends(get_webhook_service)
+):
+    """
+    Process several events from Huginn RSS agent in one request,
+    e.g. a backfill after downtime or the first fetch of a new channel.
+    """
+    summary = await webhook_service.process_batch(posts)
+    return {"status": "accepted", **summary}
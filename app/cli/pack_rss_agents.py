@@ -0,0 +1,41 @@
+"""Move channels with dedicated RSS agents into multi-feed RSS agent packs
+
+Deletes the dedicated agents once their feeds are packed and merges
+draining packs:
+
+    HUGINN_RSS_FEEDS_PER_AGENT=50 python -m app.cli.pack_rss_agents
+"""
+import asyncio
+import logging
+import sys
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.huginn_client import huginn_client
+from app.services.rss_agent_packs import RssAgentPacks
+from app.services.shared_post_agents import SharedPostAgents
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> int:
+    if settings.HUGINN_RSS_FEEDS_PER_AGENT <= 1:
+        logger.error("HUGINN_RSS_FEEDS_PER_AGENT must be greater than 1")
+        return 1
+
+    try:
+        async with AsyncSessionLocal() as db:
+            packs = RssAgentPacks(db, huginn_client, SharedPostAgents(db, huginn_client))
+            summary = await packs.pack_dedicated_channels()
+            summary["removed_packs"] = await packs.rebalance()
+    finally:
+        await huginn_client.aclose()
+        await async_engine.dispose()
+
+    print(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
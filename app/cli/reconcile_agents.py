@@ -0,0 +1,40 @@
+"""Reconcile Huginn agents with channels in the database
+
+Deletes orphaned Timon agents, provisions agents of monitored channels that
+lost them and enables disabled agents. With --dry-run only reports the drift:
+
+    python -m app.cli.reconcile_agents --dry-run
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.agent_reconciler import AgentReconciler
+from app.services.channel_service import ChannelService
+from app.services.huginn_client import huginn_client
+
+logger = logging.getLogger(__name__)
+
+
+async def main(dry_run: bool) -> int:
+    try:
+        async with AsyncSessionLocal() as db:
+            async with ChannelService(db, huginn_client=huginn_client) as channel_service:
+                report = await AgentReconciler(channel_service).run(dry_run=dry_run)
+    finally:
+        await huginn_client.aclose()
+        await async_engine.dispose()
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Reconcile Huginn agents with channels")
+    parser.add_argument("--dry-run", action="store_true", help="only report the drift")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.dry_run)))
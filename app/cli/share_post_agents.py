@@ -0,0 +1,37 @@
+"""Relink existing channels to shared Huginn Post agents
+
+Removes per-channel Post agents once their channels are relinked:
+
+    HUGINN_SHARED_POST_AGENTS=4 python -m app.cli.share_post_agents
+"""
+import asyncio
+import logging
+import sys
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.huginn_client import huginn_client
+from app.services.shared_post_agents import SharedPostAgents
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> int:
+    if settings.HUGINN_SHARED_POST_AGENTS <= 0:
+        logger.error("HUGINN_SHARED_POST_AGENTS must be greater than 0")
+        return 1
+
+    try:
+        async with AsyncSessionLocal() as db:
+            summary = await SharedPostAgents(db, huginn_client).relink_channels()
+    finally:
+        await huginn_client.aclose()
+        await async_engine.dispose()
+
+    print(summary)
+    return 1 if summary["failed_channels"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -18,11 +19,108 @@ class Settings(BaseSettings):
     HUGINN_ADMIN_EMAIL: str
     HUGINN_ADMIN_PASSWORD: str
     HUGINN_ADMIN_USERNAME: str
+    HUGINN_TIMEOUT: float = 30.0
+    # Check agent links and status in background after provisioning
+    HUGINN_VERIFY_AGENTS: bool = False
+    # Number of Post agents shared by all channels, sharded by channel name.
+    # 0 creates a dedicated Post agent for every channel
+    HUGINN_SHARED_POST_AGENTS: int = 0
+    # Maximum number of channel feeds polled by one RSS agent.
+    # 1 creates a dedicated RSS agent for every channel
+    HUGINN_RSS_FEEDS_PER_AGENT: int = 1
+
+    # Backend polling channel feeds: "huginn" agents or the "native" in-process poller
+    RSS_POLLING_BACKEND: Literal["huginn", "native"] = "huginn"
+    NATIVE_POLLER_INTERVAL: float = 60.0
+    NATIVE_POLLER_CONCURRENCY: int = 20
+    NATIVE_POLLER_REFRESH_INTERVAL: float = 60.0
+    # Channels are split by name over NATIVE_POLLER_SHARDS processes,
+    # each process polls only the channels of its NATIVE_POLLER_SHARD
+    NATIVE_POLLER_SHARDS: int = 1
+    NATIVE_POLLER_SHARD: int = 0
 
     # App configuration
     APP_HOST: str
     EXTERNAL_APP_HOST: str
 
+    # Async database connection pool
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: float = 30.0
+
+    # Callback delivery configuration
+    CALLBACK_MAX_CONCURRENCY: int = 100
+    CALLBACK_MAX_CONCURRENCY_PER_HOST: int = 10
+
+    # Circuit breaker for callback hosts
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int = 5
+    CIRCUIT_BREAKER_WINDOW_SIZE: int = 20
+    CIRCUIT_BREAKER_COOLDOWN: float = 60.0
+
+    # Shared HTTP client pool configuration
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 200
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_HTTP2: bool = False
+    # Размер пула для отдельных хостов, например {"api.example.com": 20}
+    HTTP_HOST_POOL_LIMITS: dict[str, int] = {}
+
+    # Outbox configuration
+    # При выключенном outbox посты рассылаются прямо в запросе вебхука
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_WORKERS: int = 4
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_LEASE_SECONDS: float = 300.0
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_DELAY: float = 10.0
+    # Delivered and failed outbox rows are deleted this many seconds after creation,
+    # 0 keeps them forever
+    OUTBOX_RETENTION_SECONDS: float = 7 * 24 * 3600.0
+    OUTBOX_CLEANUP_INTERVAL: float = 3600.0
+    OUTBOX_CLEANUP_BATCH_SIZE: int = 1000
+
+    # HTML parsing of large posts in worker processes, 0 workers parses inline
+    HTML_PARSE_WORKERS: int = 2
+    HTML_PARSE_OFFLOAD_THRESHOLD: int = 64 * 1024
+
+    # Maximum number of channels provisioned by POST /channels/batch
+    CHANNEL_BATCH_MAX_SIZE: int = 500
+
+    # Maximum number of channels in POST /subscriptions/batch
+    # and number of RSSHub checks it runs at once
+    SUBSCRIPTION_BATCH_MAX_SIZE: int = 500
+    SUBSCRIPTION_BATCH_CHECK_CONCURRENCY: int = 10
+
+    # Maximum number of posts accepted by POST /webhook/rss/batch
+    WEBHOOK_BATCH_MAX_SIZE: int = 500
+
+    # Number of recently ingested post guids kept in memory for deduplication
+    RECENT_POST_GUIDS_CACHE_SIZE: int = 10000
+
+    # Adaptive polling: RSS agents move between schedule tiers
+    # by the observed interval between channel posts
+    ADAPTIVE_POLLING_ENABLED: bool = False
+    ADAPTIVE_POLLING_INTERVAL: float = 600.0
+    ADAPTIVE_POLLING_HYSTERESIS: float = 0.25
+    ADAPTIVE_POLLING_MIN_SCHEDULE: str = "every_1m"
+    ADAPTIVE_POLLING_MAX_SCHEDULE: str = "every_1h"
+    POST_INTERVAL_EWMA_ALPHA: float = 0.3
+
+    # Seconds a cached channel route stays valid without invalidation
+    ROUTING_CACHE_TTL: float = 300.0
+
+    # Seconds channel title and photo read from RSSHub stay valid,
+    # private or nonexistent channels are checked again after the negative TTL
+    CHANNEL_METADATA_TTL: float = 3600.0
+    CHANNEL_METADATA_NEGATIVE_TTL: float = 300.0
+    # Number of channels whose title and photo are kept in memory
+    CHANNEL_METADATA_CACHE_SIZE: int = 10000
+    # Maximum number of bytes of an RSSHub feed read to find the channel title and photo
+    RSSHUB_FEED_HEADER_MAX_BYTES: int = 256 * 1024
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -34,6 +132,12 @@ class Settings(BaseSettings):
             return self.DATABASE_URL
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def get_async_database_url(self) -> str:
+        """Same database as get_database_url, but through the asyncpg driver"""
+        scheme, _, rest = self.get_database_url.partition("://")
+        return f"postgresql+asyncpg://{rest}"
+
 
 @lru_cache()
 def get_settings():
@@ -8,3 +8,19 @@ class ChannelAlreadyExists(HTTPException):
 class ChannelNotFound(HTTPException):
     def __init__(self):
         super().__init__(status_code=404, detail="Channel not found")
+
+class ChannelUnavailable(HTTPException):
+    """RSSHub reports the channel as private or nonexistent"""
+    def __init__(self, detail: str):
+        super().__init__(status_code=400, detail=detail)
+
+class CallbackRequestFailed(HTTPException):
+    def __init__(self, callback_status_code: int):
+        super().__init__(
+            status_code=500,
+            detail=f"Failed to send callback request: HTTP {callback_status_code}"
+        )
+        self.callback_status_code = callback_status_code
+
+class CallbackServerError(CallbackRequestFailed):
+    """Callback host responded with 5xx, counted as failure by circuit breaker"""
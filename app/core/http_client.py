@@ -0,0 +1,87 @@
+import importlib.util
+import logging
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientPool:
+    """
+    Process-wide pool of keep-alive HTTP connections shared by all services.
+    The client is created lazily on first use and closed in app lifespan.
+    """
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+
+    def _is_http2_available(self) -> bool:
+        if not settings.HTTP_HTTP2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 is enabled but 'h2' package is not installed, falling back to HTTP/1.1")
+            return False
+        return True
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = self._is_http2_available()
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+
+        # Отдельный транспорт (и пул соединений) для хостов с собственным лимитом
+        mounts = {
+            f"all://{host}": httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+                ),
+                http2=http2
+            )
+            for host, max_connections in settings.HTTP_HOST_POOL_LIMITS.items()
+        }
+
+        logger.info(
+            "Creating shared HTTP client",
+            extra={
+                "max_connections": settings.HTTP_MAX_CONNECTIONS,
+                "max_keepalive_connections": settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                "keepalive_expiry": settings.HTTP_KEEPALIVE_EXPIRY,
+                "http2": http2,
+                "host_pools": list(settings.HTTP_HOST_POOL_LIMITS)
+            }
+        )
+        return httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT,
+            limits=limits,
+            http2=http2,
+            mounts=mounts
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self) -> None:
+        """Create the shared client eagerly on app startup"""
+        _ = self.client
+
+    async def close(self) -> None:
+        """Close all pooled connections on app shutdown"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+http_client_pool = HTTPClientPool()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    return http_client_pool.client
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessPool:
+    """
+    Process-wide pool for CPU-bound work that must not run on the event loop.
+    The executor is created lazily on first use and shut down in app lifespan.
+
+    Args:
+        max_workers: Number of worker processes, 0 disables the pool
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            logger.info(f"Creating process pool with {self.max_workers} workers")
+            # spawn: дочерний процесс не наследует event loop и потоки приложения
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run picklable `func(*args)` in a worker process"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        except BrokenProcessPool:
+            # Упавший воркер ломает весь пул, пересоздаем его при следующем вызове
+            self._executor = None
+            raise
+
+    async def start(self) -> None:
+        """Create the executor eagerly on app startup"""
+        if self.enabled:
+            _ = self.executor
+
+    async def close(self) -> None:
+        """Stop worker processes on app shutdown"""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+html_parse_pool = ProcessPool(max_workers=settings.HTML_PARSE_WORKERS)
@@ -1,5 +1,8 @@
 from app.db.session import Base
 from app.models.channel import Channel
+from app.models.outbox import OutboxMessage
 from app.models.post import Post
+from app.models.rss_agent_pack import RssAgentPack
+from app.models.shared_post_agent import SharedPostAgent
 
 # Импортируем все модели здесь, чтобы Alembic мог их видеть
@@ -1,10 +1,19 @@
 # app/main.py
 
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.api import subscriptions, webhooks
+from app.api import channels, monitoring, subscriptions, webhooks
+from app.core.config import settings
+from app.core.http_client import http_client_pool
+from app.core.process_pool import html_parse_pool
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.huginn_client import huginn_client
+from app.services.monitoring_backends import get_monitoring_backend
+from app.services.outbox_worker import outbox_worker_pool
+from app.services.routing_cache import routing_cache
 
 # Настройка логирования
 logging.basicConfig(
@@ -12,7 +21,40 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
+
+async def warm_routing_cache() -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await routing_cache.warm(db)
+    except Exception as e:
+        # Без прогрева кэш заполнится при первых вебхуках
+        logger.error(f"Failed to warm routing cache: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client_pool.start()
+    await html_parse_pool.start()
+    await warm_routing_cache()
+    if settings.OUTBOX_ENABLED:
+        await outbox_worker_pool.start()
+    monitoring_backend = get_monitoring_backend()
+    await monitoring_backend.start()
+    yield
+    await monitoring_backend.stop()
+    if settings.OUTBOX_ENABLED:
+        await outbox_worker_pool.stop()
+    await huginn_client.aclose()
+    await http_client_pool.close()
+    await html_parse_pool.close()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.include_router(channels.router, prefix="/channels", tags=["channels"])
 app.include_router(subscriptions.router, prefix="/subscriptions", tags=["subscriptions"])
 app.include_router(webhooks.router, prefix="/webhook", tags=["webhooks"])
+app.include_router(monitoring.router, prefix="/monitoring", tags=["monitoring"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,7 +12,18 @@ class Channel(Base):
     channel_name = Column(String, unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_monitored = Column(Boolean, default=True)
-    huginn_rss_agent_id = Column(Integer, nullable=True)
+    huginn_rss_agent_id = Column(Integer, nullable=True, index=True)
     huginn_post_agent_id = Column(Integer, nullable=True)
-    
+    # Частота постов для адаптивного расписания опроса RSS агента
+    last_post_at = Column(DateTime(timezone=True), nullable=True)
+    post_interval_ewma = Column(Float, nullable=True)
+    poll_schedule = Column(String(16), nullable=True)
+    # Название и фото канала из RSSHub, перечитываются после CHANNEL_METADATA_TTL
+    title = Column(String(255), nullable=True)
+    photo_url = Column(String(1024), nullable=True)
+    metadata_checked_at = Column(DateTime(timezone=True), nullable=True)
+    # Валидаторы условного GET последнего ответа фида для нативного опросчика
+    feed_etag = Column(String(255), nullable=True)
+    feed_last_modified = Column(String(64), nullable=True)
+
     subscriptions = relationship("Subscription", cascade="all, delete-orphan")
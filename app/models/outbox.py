@@ -0,0 +1,53 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+)
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
+class OutboxMessage(Base):
+    """Callback delivery waiting to be sent by an outbox worker"""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    subscription_id = Column(
+        Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False
+    )
+    callback_url = Column(String, nullable=False)
+    post_guid = Column(String, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    status = Column(String(16), nullable=False, default=OutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Частичный индекс: воркеры ищут только ожидающие доставки
+        Index(
+            "ix_outbox_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=(status == OutboxStatus.PENDING)
+        ),
+        # Очистка удаляет старые доставленные и неудачные сообщения
+        Index(
+            "ix_outbox_finished_created_at",
+            "created_at",
+            postgresql_where=(status != OutboxStatus.PENDING)
+        ),
+    )
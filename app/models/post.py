@@ -16,7 +16,7 @@ class Post(Base):
     __tablename__ = "posts"
 
     id = Column(Integer, primary_key=True)
-    channel_id = Column(Integer, ForeignKey('channels.id'))
+    channel_id = Column(Integer, ForeignKey('channels.id', ondelete='CASCADE'))
     title = Column(Text)
     link = Column(String)
     published_at = Column(DateTime(timezone=True))
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+class RssAgentPack(Base):
+    """Huginn RSS agent polling feeds of several channels
+
+    Channels of a pack point to its agents, the feed list of the RSS agent
+    is built from them.
+    """
+    __tablename__ = "rss_agent_packs"
+
+    id = Column(Integer, primary_key=True)
+    huginn_rss_agent_id = Column(Integer, unique=True, nullable=False)
+    huginn_post_agent_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
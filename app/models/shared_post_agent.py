@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+class SharedPostAgent(Base):
+    """Huginn Post agent shared by all channels of a shard"""
+    __tablename__ = "shared_post_agents"
+
+    id = Column(Integer, primary_key=True)
+    shard = Column(Integer, unique=True, nullable=False)
+    huginn_agent_id = Column(Integer, unique=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.sql import func
 
 from app.db.session import Base
@@ -13,4 +13,10 @@ class Subscription(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)
     title = Column(String(255), nullable=True)
-    photo_url = Column(String(1024), nullable=True) 
\ No newline at end of file
+    photo_url = Column(String(1024), nullable=True) 
+
+    __table_args__ = (
+        # Постраничные выборки по каналу и callback URL идут по id
+        Index("ix_subscriptions_channel_id_id", "channel_id", "id"),
+        Index("ix_subscriptions_callback_url_id", "callback_url", "id"),
+    )
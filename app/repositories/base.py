@@ -1,29 +1,31 @@
 from typing import Generic, Type, TypeVar
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 class BaseRepository(Generic[ModelType]):
-    def __init__(self, model: Type[ModelType], db: Session):
+    def __init__(self, model: Type[ModelType], db: AsyncSession):
         self.model = model
         self.db = db
 
-    def get_by_id(self, id: int) -> ModelType | None:
-        return self.db.query(self.model).filter(self.model.id == id).first()
+    async def get_by_id(self, id: int) -> ModelType | None:
+        return await self.db.get(self.model, id)
 
-    def get_all(self):
-        return self.db.query(self.model).all()
+    async def get_all(self) -> list[ModelType]:
+        result = await self.db.execute(select(self.model))
+        return list(result.scalars().all())
 
-    def create(self, obj: ModelType) -> ModelType:
+    async def create(self, obj: ModelType) -> ModelType:
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        await self.db.commit()
+        await self.db.refresh(obj)
         return obj
 
-    def delete(self, obj: ModelType) -> None:
+    async def delete(self, obj: ModelType) -> None:
         """Delete object from database."""
-        self.db.delete(obj)
-        self.db.commit()
+        await self.db.delete(obj)
+        await self.db.commit()
@@ -1,36 +1,314 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
+
+from sqlalchemy import Float, Row, RowMapping, and_, case, cast, delete, func, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.channel import Channel
+from app.models.rss_agent_pack import RssAgentPack
+from app.models.subscription import Subscription
 from app.repositories.base import BaseRepository
 
 
 class ChannelRepository(BaseRepository[Channel]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(Channel, db)
 
-    def get(self, channel_id: int) -> Channel | None:
+    async def get(self, channel_id: int) -> Channel | None:
         """Get channel by ID"""
-        return self.db.query(Channel).filter(Channel.id == channel_id).first()
+        return await self.db.get(Channel, channel_id)
 
-    def get_by_channel_name(self, channel_name: str) -> Channel | None:
+    async def get_by_channel_name(self, channel_name: str) -> Channel | None:
         """Get channel by channel_name"""
-        return self.db.query(Channel).filter(Channel.channel_name == channel_name).first()
+        result = await self.db.execute(
+            select(Channel).where(Channel.channel_name == channel_name)
+        )
+        return result.scalars().first()
+
+    async def get_by_channel_names(self, channel_names: list[str]) -> list[Channel]:
+        """Get channels by channel_names"""
+        result = await self.db.execute(
+            select(Channel).where(Channel.channel_name.in_(channel_names))
+        )
+        return list(result.scalars().all())
+
+    async def get_monitored_feeds(self) -> list[Row]:
+        """Names and feed validators of all monitored channels"""
+        result = await self.db.execute(
+            select(Channel.channel_name, Channel.feed_etag, Channel.feed_last_modified)
+            .where(Channel.is_monitored.is_(True))
+        )
+        return list(result.all())
+
+    async def list_page(
+        self,
+        limit: int,
+        after_id: int | None = None,
+        channel_name: str | None = None,
+        is_monitored: bool | None = None,
+        callback_url: str | None = None,
+        has_dedicated_rss_agent: bool | None = None
+    ) -> list[RowMapping]:
+        """Page of channels ordered by id, starting after after_id
+
+        callback_url keeps channels with a subscription of that callback,
+        has_dedicated_rss_agent keeps channels with an RSS agent of their own,
+        not one of an RSS agent pack. Returns plain column values without
+        loading ORM objects.
+        """
+        query = (
+            select(
+                Channel.id,
+                Channel.channel_name,
+                Channel.is_monitored,
+                Channel.created_at,
+                Channel.title,
+                Channel.photo_url,
+                Channel.huginn_rss_agent_id,
+                Channel.huginn_post_agent_id
+            )
+            .order_by(Channel.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(Channel.id > after_id)
+        if channel_name is not None:
+            query = query.where(Channel.channel_name == channel_name)
+        if is_monitored is not None:
+            query = query.where(Channel.is_monitored.is_(is_monitored))
+        if callback_url is not None:
+            query = query.where(
+                select(Subscription.id)
+                .where(Subscription.channel_id == Channel.id, Subscription.callback_url == callback_url)
+                .exists()
+            )
+        if has_dedicated_rss_agent is not None:
+            dedicated = and_(
+                Channel.huginn_rss_agent_id.is_not(None),
+                ~select(RssAgentPack.id)
+                .where(RssAgentPack.huginn_rss_agent_id == Channel.huginn_rss_agent_id)
+                .exists()
+            )
+            query = query.where(dedicated if has_dedicated_rss_agent else ~dedicated)
+        result = await self.db.execute(query)
+        return list(result.mappings().all())
+
+    async def get_names_by_rss_agent_id(self, rss_agent_id: int) -> list[str]:
+        """Names of channels polled by an RSS agent"""
+        result = await self.db.execute(
+            select(Channel.channel_name)
+            .where(Channel.huginn_rss_agent_id == rss_agent_id)
+            .order_by(Channel.id)
+        )
+        return list(result.scalars().all())
 
-    def create(self, channel: Channel) -> Channel:
+    async def count_by_rss_agent_ids(self, rss_agent_ids: list[int]) -> dict[int, int]:
+        """Number of channels polled by each RSS agent"""
+        result = await self.db.execute(
+            select(Channel.huginn_rss_agent_id, func.count(Channel.id))
+            .where(Channel.huginn_rss_agent_id.in_(rss_agent_ids))
+            .group_by(Channel.huginn_rss_agent_id)
+        )
+        return dict(result.tuples().all())
+
+    async def get_with_active_subscriptions(
+        self,
+        channel_names: list[str]
+    ) -> list[tuple[Channel, Subscription | None]]:
+        """Channels by names joined with their active subscriptions in one query"""
+        result = await self.db.execute(
+            select(Channel, Subscription)
+            .outerjoin(
+                Subscription,
+                and_(
+                    Subscription.channel_id == Channel.id,
+                    Subscription.is_active == True
+                )
+            )
+            .where(Channel.channel_name.in_(channel_names))
+            .order_by(Channel.id, Subscription.id)
+        )
+        return list(result.tuples().all())
+
+    async def create(self, channel: Channel) -> Channel:
         """Create new channel"""
         self.db.add(channel)
-        self.db.commit()
-        self.db.refresh(channel)
+        await self.db.commit()
+        await self.db.refresh(channel)
         return channel
 
-    def update(self, channel: Channel) -> Channel:
+    async def create_many(self, channels: list[Channel]) -> list[Channel]:
+        """Create several channels in one transaction"""
+        self.db.add_all(channels)
+        await self.db.commit()
+        for channel in channels:
+            await self.db.refresh(channel)
+        return channels
+
+    async def update(self, channel: Channel) -> Channel:
         """Update channel in database"""
         self.db.add(channel)
-        self.db.commit()
-        self.db.refresh(channel)
+        await self.db.commit()
+        await self.db.refresh(channel)
         return channel
 
-    def delete(self, channel: Channel) -> None:
+    async def set_post_agent_id(self, channel_id: int, agent_id: int) -> None:
+        """Point channel to another Huginn Post agent"""
+        await self.db.execute(
+            update(Channel)
+            .where(Channel.id == channel_id)
+            .values(huginn_post_agent_id=agent_id)
+        )
+        await self.db.commit()
+
+    async def set_agent_ids(self, channel_names: list[str], rss_agent_id: int, post_agent_id: int) -> None:
+        """Point channels to Huginn agents in one statement"""
+        await self.db.execute(
+            update(Channel)
+            .where(Channel.channel_name.in_(channel_names))
+            .values(huginn_rss_agent_id=rss_agent_id, huginn_post_agent_id=post_agent_id)
+        )
+        await self.db.commit()
+
+    async def set_agent_ids_by_group(self, groups: list[tuple[list[str], int, int]]) -> None:
+        """Point groups of channels to shared (rss_agent_id, post_agent_id) in one transaction"""
+        for channel_names, rss_agent_id, post_agent_id in groups:
+            await self.db.execute(
+                update(Channel)
+                .where(Channel.channel_name.in_(channel_names))
+                .values(huginn_rss_agent_id=rss_agent_id, huginn_post_agent_id=post_agent_id)
+            )
+        await self.db.commit()
+
+    async def set_agent_ids_by_channel(self, agent_ids: dict[str, tuple[int, int]]) -> None:
+        """Point every channel to its own (rss_agent_id, post_agent_id) in one transaction"""
+        for channel_name, (rss_agent_id, post_agent_id) in agent_ids.items():
+            await self.db.execute(
+                update(Channel)
+                .where(Channel.channel_name == channel_name)
+                .values(huginn_rss_agent_id=rss_agent_id, huginn_post_agent_id=post_agent_id)
+            )
+        await self.db.commit()
+
+    async def record_post(self, channel_id: int, posted_at: datetime, alpha: float) -> None:
+        """
+        Update the exponentially weighted mean interval between channel posts.
+        Posts older than the last recorded one are ignored. The update is not
+        committed, it belongs to the transaction recording the post.
+        """
+        interval = cast(
+            func.extract("epoch", literal(posted_at) - Channel.last_post_at),
+            Float
+        )
+        await self.db.execute(
+            update(Channel)
+            .where(
+                Channel.id == channel_id,
+                or_(Channel.last_post_at.is_(None), Channel.last_post_at < posted_at)
+            )
+            .values(
+                post_interval_ewma=case(
+                    (Channel.last_post_at.is_(None), Channel.post_interval_ewma),
+                    (Channel.post_interval_ewma.is_(None), interval),
+                    else_=alpha * interval + (1 - alpha) * Channel.post_interval_ewma
+                ),
+                last_post_at=posted_at
+            )
+        )
+
+    async def get_agent_references(self) -> list[Row]:
+        """Name, monitoring flag and Huginn agent IDs of every channel"""
+        result = await self.db.execute(
+            select(
+                Channel.channel_name,
+                Channel.is_monitored,
+                Channel.huginn_rss_agent_id,
+                Channel.huginn_post_agent_id
+            ).order_by(Channel.id)
+        )
+        return list(result.all())
+
+    async def clear_agent_ids(self, channel_names: list[str]) -> None:
+        """Forget Huginn agents of channels"""
+        await self.db.execute(
+            update(Channel)
+            .where(Channel.channel_name.in_(channel_names))
+            .values(huginn_rss_agent_id=None, huginn_post_agent_id=None, poll_schedule=None)
+        )
+        await self.db.commit()
+
+    async def set_metadata(
+        self,
+        channel_id: int,
+        title: str | None,
+        photo_url: str | None,
+        checked_at: datetime
+    ) -> None:
+        """Save title and photo read from the channel feed"""
+        await self.db.execute(
+            update(Channel)
+            .where(Channel.id == channel_id)
+            .values(title=title, photo_url=photo_url, metadata_checked_at=checked_at)
+        )
+        await self.db.commit()
+
+    async def set_feed_validators(
+        self,
+        channel_name: str,
+        etag: str | None,
+        last_modified: str | None
+    ) -> None:
+        """Save conditional GET validators of the last processed feed response"""
+        await self.db.execute(
+            update(Channel)
+            .where(Channel.channel_name == channel_name)
+            .values(feed_etag=etag, feed_last_modified=last_modified)
+        )
+        await self.db.commit()
+
+    async def get_with_active_subscription_counts(self, channel_ids: list[int]) -> list[Row]:
+        """Name, Huginn agent IDs and number of active subscriptions of channels"""
+        result = await self.db.execute(
+            select(
+                Channel.id,
+                Channel.channel_name,
+                Channel.huginn_rss_agent_id,
+                Channel.huginn_post_agent_id,
+                func.count(Subscription.id).label("active_subscriptions")
+            )
+            .outerjoin(
+                Subscription,
+                and_(Subscription.channel_id == Channel.id, Subscription.is_active.is_(True))
+            )
+            .where(Channel.id.in_(channel_ids))
+            .group_by(Channel.id)
+        )
+        return list(result.all())
+
+    async def delete_many(self, channel_ids: list[int]) -> None:
+        """Delete channels and commit the transaction"""
+        if channel_ids:
+            await self.db.execute(delete(Channel).where(Channel.id.in_(channel_ids)))
+        await self.db.commit()
+
+    async def get_polled(self) -> list[Channel]:
+        """Channels with an RSS agent"""
+        result = await self.db.execute(
+            select(Channel)
+            .where(Channel.huginn_rss_agent_id.isnot(None))
+            .order_by(Channel.id)
+        )
+        return list(result.scalars().all())
+
+    async def set_poll_schedule(self, rss_agent_id: int, schedule: str) -> None:
+        """Record schedule of an RSS agent on all channels it polls"""
+        await self.db.execute(
+            update(Channel)
+            .where(Channel.huginn_rss_agent_id == rss_agent_id)
+            .values(poll_schedule=schedule)
+        )
+        await self.db.commit()
+
+    async def delete(self, channel: Channel) -> None:
         """Delete channel from database"""
-        self.db.delete(channel)
-        self.db.commit()
+        await self.db.delete(channel)
+        await self.db.commit()
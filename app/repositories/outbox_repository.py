@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Row, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.outbox import OutboxMessage, OutboxStatus
+from app.models.subscription import Subscription
+from app.repositories.base import BaseRepository
+
+
+class OutboxRepository(BaseRepository[OutboxMessage]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(OutboxMessage, db)
+
+    async def enqueue(self, messages: list[OutboxMessage]) -> list[OutboxMessage]:
+        """
+        Add deliveries to the current transaction, the caller commits them with the post guid.
+
+        Subscription ids may come from a stale routing cache, so deliveries of
+        subscriptions already deleted are dropped instead of failing the whole
+        transaction on the foreign key. Returns the deliveries actually added.
+        """
+        subscription_ids = {message.subscription_id for message in messages}
+        # FOR KEY SHARE не дает удалить подписки до коммита, вставка не упадет на FK
+        existing = set((await self.db.execute(
+            select(Subscription.id)
+            .where(Subscription.id.in_(subscription_ids))
+            .with_for_update(key_share=True)
+        )).scalars())
+        messages = [message for message in messages if message.subscription_id in existing]
+        if messages:
+            self.db.add_all(messages)
+            await self.db.flush()
+        return messages
+
+    async def claim_batch(self, limit: int, lease_seconds: float) -> list[Row]:
+        """
+        Claim up to `limit` due deliveries for the current worker.
+
+        Rows are locked with FOR UPDATE SKIP LOCKED so concurrent workers never
+        claim the same row. A claimed row stays pending but its next_attempt_at
+        is moved forward by the lease, so it is picked up again if the worker
+        dies before recording the outcome.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = (
+            select(OutboxMessage.id)
+            .where(
+                OutboxMessage.status == OutboxStatus.PENDING,
+                OutboxMessage.next_attempt_at <= now
+            )
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(claimable))
+            .values(
+                attempts=OutboxMessage.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease_seconds)
+            )
+            .returning(
+                OutboxMessage.id,
+                OutboxMessage.subscription_id,
+                OutboxMessage.callback_url,
+                OutboxMessage.post_guid,
+                OutboxMessage.payload,
+                OutboxMessage.attempts
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await self.db.execute(stmt)).all()
+        await self.db.commit()
+        return sorted(rows, key=lambda row: row.id)
+
+    async def mark_delivered(self, message_id: int) -> None:
+        await self.db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(
+                status=OutboxStatus.DELIVERED,
+                delivered_at=datetime.now(timezone.utc),
+                last_error=None
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def mark_failed(
+        self,
+        message_id: int,
+        error: str,
+        retry_in: float | None
+    ) -> None:
+        """Schedule the next attempt, or give up if retry_in is None"""
+        values = {"last_error": error}
+        if retry_in is None:
+            values["status"] = OutboxStatus.FAILED
+        else:
+            values["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=retry_in)
+
+        await self.db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def defer(self, message_id: int, reason: str, retry_in: float) -> None:
+        """Reschedule a message that was claimed but not sent, without using up an attempt"""
+        await self.db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(
+                attempts=OutboxMessage.attempts - 1,
+                next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=retry_in),
+                last_error=reason
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def delete_finished(self, older_than: float, limit: int) -> int:
+        """
+        Delete up to `limit` delivered or failed messages created more than
+        `older_than` seconds ago, returns the number of deleted rows.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+        finished = (
+            select(OutboxMessage.id)
+            .where(
+                OutboxMessage.status != OutboxStatus.PENDING,
+                OutboxMessage.created_at < cutoff
+            )
+            .order_by(OutboxMessage.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            delete(OutboxMessage)
+            .where(OutboxMessage.id.in_(finished))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount
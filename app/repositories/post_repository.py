@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.post import Post
+from app.repositories.base import BaseRepository
+
+
+class PostRepository(BaseRepository[Post]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(Post, db)
+
+    async def insert_if_absent(
+        self,
+        channel_id: int,
+        guid: str,
+        title: str | None = None,
+        link: str | None = None,
+        published_at: datetime | None = None
+    ) -> bool:
+        """
+        Record the post guid with INSERT ... ON CONFLICT DO NOTHING.
+        Returns False if the channel already has a post with this guid.
+        The row is only flushed, the caller commits it together with the deliveries.
+        """
+        stmt = (
+            insert(Post)
+            .values(
+                channel_id=channel_id,
+                guid=guid,
+                title=title,
+                link=link,
+                published_at=published_at
+            )
+            .on_conflict_do_nothing(constraint='uix_channel_guid')
+            .returning(Post.id)
+        )
+        inserted_id = (await self.db.execute(stmt)).scalar()
+        return inserted_id is not None
+
+    async def insert_many_if_absent(self, channel_id: int, posts: list[dict]) -> set[str]:
+        """
+        Record several posts of one channel with a single INSERT ... ON CONFLICT DO NOTHING.
+        `posts` are dicts with guid, title, link and published_at.
+        Returns guids that were not ingested before. The rows are only flushed,
+        the caller commits them together with the deliveries.
+        """
+        if not posts:
+            return set()
+        stmt = (
+            insert(Post)
+            .values([{"channel_id": channel_id, **post} for post in posts])
+            .on_conflict_do_nothing(constraint='uix_channel_guid')
+            .returning(Post.guid)
+        )
+        return set((await self.db.execute(stmt)).scalars().all())
@@ -0,0 +1,21 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.rss_agent_pack import RssAgentPack
+from app.repositories.base import BaseRepository
+
+
+class RssAgentPackRepository(BaseRepository[RssAgentPack]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(RssAgentPack, db)
+
+    async def get_by_rss_agent_id(self, rss_agent_id: int) -> RssAgentPack | None:
+        result = await self.db.execute(
+            select(RssAgentPack).where(RssAgentPack.huginn_rss_agent_id == rss_agent_id)
+        )
+        return result.scalars().first()
+
+    async def get_rss_agent_ids(self) -> set[int]:
+        """Huginn IDs of all pack RSS agents"""
+        result = await self.db.execute(select(RssAgentPack.huginn_rss_agent_id))
+        return set(result.scalars().all())
@@ -0,0 +1,44 @@
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.shared_post_agent import SharedPostAgent
+from app.repositories.base import BaseRepository
+
+
+class SharedPostAgentRepository(BaseRepository[SharedPostAgent]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(SharedPostAgent, db)
+
+    async def get_agent_id(self, shard: int) -> int | None:
+        """Huginn ID of the shared Post agent of a shard"""
+        result = await self.db.execute(
+            select(SharedPostAgent.huginn_agent_id).where(SharedPostAgent.shard == shard)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_agent_ids(self) -> set[int]:
+        """Huginn IDs of all shared Post agents"""
+        result = await self.db.execute(select(SharedPostAgent.huginn_agent_id))
+        return set(result.scalars().all())
+
+    async def save(self, agent_ids: dict[int, int]) -> None:
+        """Store Huginn agent IDs by shard, an existing shard keeps its agent"""
+        if not agent_ids:
+            return
+        await self.db.execute(
+            insert(SharedPostAgent)
+            .values([
+                {"shard": shard, "huginn_agent_id": agent_id}
+                for shard, agent_id in agent_ids.items()
+            ])
+            .on_conflict_do_nothing()
+        )
+        await self.db.commit()
+
+    async def delete_by_agent_ids(self, agent_ids: set[int]) -> None:
+        """Forget shared agents, e.g. deleted in Huginn"""
+        await self.db.execute(
+            delete(SharedPostAgent).where(SharedPostAgent.huginn_agent_id.in_(agent_ids))
+        )
+        await self.db.commit()
@@ -1,59 +1,154 @@
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from typing import Optional
 
+from sqlalchemy import RowMapping, and_, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.channel import Channel
 from app.models.subscription import Subscription
 from app.repositories.base import BaseRepository
 
 
 class SubscriptionRepository(BaseRepository[Subscription]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(Subscription, db)
 
-    def get_active_by_channel_id(self, channel_id: int) -> list[Subscription]:
-        return (
-            self.db.query(Subscription)
-            .filter(
+    async def get_active_by_channel_id(self, channel_id: int) -> list[Subscription]:
+        result = await self.db.execute(
+            select(Subscription)
+            .where(
                 and_(
                     Subscription.channel_id == channel_id,
                     Subscription.is_active == True
                 )
             )
-            .all()
         )
+        return list(result.scalars().all())
+
+    async def get_all_active(self) -> list[Subscription]:
+        result = await self.db.execute(
+            select(Subscription).where(Subscription.is_active == True)
+        )
+        return list(result.scalars().all())
 
-    def get_by_channel_and_callback(
+    async def get_by_channel_and_callback(
         self, 
         channel_id: int, 
         callback_url: str
     ) -> Subscription | None:
-        return (
-            self.db.query(Subscription)
-            .filter(
+        result = await self.db.execute(
+            select(Subscription)
+            .where(
                 and_(
                     Subscription.channel_id == channel_id,
                     Subscription.callback_url == callback_url
                 )
             )
-            .first()
         )
+        return result.scalars().first()
+
+    async def get_by_channel_ids_and_callback(
+        self,
+        channel_ids: list[int],
+        callback_url: str
+    ) -> list[Subscription]:
+        result = await self.db.execute(
+            select(Subscription)
+            .where(
+                and_(
+                    Subscription.channel_id.in_(channel_ids),
+                    Subscription.callback_url == callback_url
+                )
+            )
+        )
+        return list(result.scalars().all())
+
+    async def save_many(self, subscriptions: list[Subscription]) -> list[Subscription]:
+        """Insert or update several subscriptions in one transaction"""
+        self.db.add_all(subscriptions)
+        await self.db.commit()
+        # Значения по умолчанию из БД перечитываем одним запросом
+        await self.db.execute(
+            select(Subscription)
+            .where(Subscription.id.in_([subscription.id for subscription in subscriptions]))
+            .execution_options(populate_existing=True)
+        )
+        return subscriptions
+
+    async def delete_many(
+        self,
+        subscription_ids: Optional[list[int]] = None,
+        callback_url: Optional[str] = None
+    ) -> list[int]:
+        """Delete subscriptions by IDs or callback URL, returns their channel IDs
+
+        With both filters only the listed subscriptions of the callback URL
+        are deleted. Does not commit: the caller finishes the transaction.
+        """
+        conditions = []
+        if subscription_ids is not None:
+            conditions.append(Subscription.id.in_(subscription_ids))
+        if callback_url is not None:
+            conditions.append(Subscription.callback_url == callback_url)
+        result = await self.db.execute(
+            delete(Subscription).where(and_(*conditions)).returning(Subscription.channel_id)
+        )
+        return list(result.scalars().all())
+
+    async def list_page(
+        self,
+        limit: int,
+        after_id: int | None = None,
+        callback_url: str | None = None,
+        channel_name: str | None = None,
+        is_active: bool | None = None
+    ) -> list[RowMapping]:
+        """Page of subscriptions ordered by id, starting after after_id
+
+        Returns plain column values without loading ORM objects.
+        """
+        query = (
+            select(
+                Subscription.id,
+                Subscription.channel_id,
+                Channel.channel_name,
+                Subscription.callback_url,
+                Subscription.is_active,
+                Subscription.created_at,
+                Subscription.title,
+                Subscription.photo_url
+            )
+            .join(Channel, Channel.id == Subscription.channel_id)
+            .order_by(Subscription.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(Subscription.id > after_id)
+        if callback_url is not None:
+            query = query.where(Subscription.callback_url == callback_url)
+        if channel_name is not None:
+            query = query.where(Channel.channel_name == channel_name)
+        if is_active is not None:
+            query = query.where(Subscription.is_active.is_(is_active))
+        result = await self.db.execute(query)
+        return list(result.mappings().all())
 
-    def get(self, subscription_id: int) -> Subscription | None:
-        return self.db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    async def get(self, subscription_id: int) -> Subscription | None:
+        return await self.db.get(Subscription, subscription_id)
 
-    def create(self, subscription: Subscription) -> Subscription:
+    async def create(self, subscription: Subscription) -> Subscription:
         self.db.add(subscription)
-        self.db.commit()
-        self.db.refresh(subscription)
+        await self.db.commit()
+        await self.db.refresh(subscription)
         return subscription
 
-    def update(self, subscription: Subscription) -> Subscription:
+    async def update(self, subscription: Subscription) -> Subscription:
         """Update subscription in database"""
         self.db.add(subscription)
-        self.db.commit()
-        self.db.refresh(subscription)
+        await self.db.commit()
+        await self.db.refresh(subscription)
         return subscription
 
-    def delete(self, subscription: Subscription) -> None:
+    async def delete(self, subscription: Subscription) -> None:
         """Physically delete subscription from database"""
-        self.db.delete(subscription)
-        self.db.commit() 
\ No newline at end of file
+        await self.db.delete(subscription)
+        await self.db.commit()
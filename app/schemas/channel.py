@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, ConfigDict, HttpUrl
@@ -7,11 +8,37 @@ class ChannelCreate(BaseModel):
     channel_url: HttpUrl
     callback_url: HttpUrl
 
+class ChannelBatchCreate(BaseModel):
+    channel_urls: list[HttpUrl]
+
+
 class ChannelResponse(BaseModel):
     id: int
     channel_name: str
-    callback_url: str
+    callback_url: Optional[str] = None
     huginn_rss_agent_id: Optional[int] = None
     huginn_post_agent_id: Optional[int] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class ChannelBatchResponse(BaseModel):
+    created: list[ChannelResponse]
+    existing: list[ChannelResponse]
+
+
+class ChannelListItem(BaseModel):
+    id: int
+    channel_name: str
+    is_monitored: Optional[bool] = None
+    created_at: datetime
+    title: Optional[str] = None
+    photo_url: Optional[str] = None
+    huginn_rss_agent_id: Optional[int] = None
+    huginn_post_agent_id: Optional[int] = None
+
+
+class ChannelPage(BaseModel):
+    items: list[ChannelListItem]
+    # id последнего элемента страницы, None на последней странице
+    next_cursor: Optional[int] = None
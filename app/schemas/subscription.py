@@ -9,6 +9,16 @@ class SubscriptionCreate(BaseModel):
     callback_url: HttpUrl
 
 
+class SubscriptionBatchCreate(BaseModel):
+    channel_urls: list[HttpUrl]
+    callback_url: HttpUrl
+
+
+class SubscriptionBatchDelete(BaseModel):
+    subscription_ids: Optional[list[int]] = None
+    callback_url: Optional[HttpUrl] = None
+
+
 class SubscriptionResponse(BaseModel):
     id: int
     channel_id: int
@@ -33,4 +43,39 @@ class SubscriptionResponse(BaseModel):
             "channel_title": obj.title,  # маппинг title -> channel_title
             "channel_photo_url": obj.photo_url  # маппинг photo_url -> channel_photo_url
         }
-        return super().model_validate(data) 
\ No newline at end of file
+        return super().model_validate(data) 
+
+
+class SubscriptionBatchItem(BaseModel):
+    channel_name: str
+    # created, reactivated, exists или failed
+    status: str
+    subscription: Optional[SubscriptionResponse] = None
+    error: Optional[str] = None
+
+
+class SubscriptionBatchResponse(BaseModel):
+    results: list[SubscriptionBatchItem]
+
+
+class SubscriptionBatchDeleteResponse(BaseModel):
+    deleted_subscriptions: int
+    released_channels: int
+    deleting_agents: int
+
+
+class SubscriptionListItem(BaseModel):
+    id: int
+    channel_id: int
+    channel_name: str
+    callback_url: str
+    is_active: bool
+    created_at: datetime
+    title: str | None = None
+    photo_url: str | None = None
+
+
+class SubscriptionPage(BaseModel):
+    items: list[SubscriptionListItem]
+    # id последнего элемента страницы, None на последней странице
+    next_cursor: int | None = None
@@ -0,0 +1,239 @@
+# app/services/agent_reconciler.py
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+from app.services.channel_service import ChannelService
+from app.services.monitoring_backends import huginn_backend
+
+logger = logging.getLogger(__name__)
+
+# Агенты Timon отличаем от чужих по именам из шаблонов агентов
+TIMON_AGENT_NAME_PREFIXES = ("RSS Monitor - ", "Post Agent - ")
+# Свежий агент может быть ещё не сохранён в БД создающим его запросом
+ORPHAN_GRACE_PERIOD = timedelta(minutes=10)
+RECONCILE_CONCURRENCY = 10
+
+
+class AgentReconciler:
+    """
+    Finds drift between Huginn agents and channels and fixes it:
+    deletes orphaned agents, provisions agents of channels that lost them
+    and enables disabled agents.
+    """
+
+    def __init__(self, channel_service: ChannelService):
+        self.channel_service = channel_service
+        self.huginn_client = channel_service.huginn_client
+        self.channel_repository = channel_service.channel_repository
+        self.rss_agent_packs = channel_service.rss_agent_packs
+        self.shared_post_agents = channel_service.shared_post_agents
+        self._semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def run(self, dry_run: bool = False) -> dict:
+        """Reconcile Huginn with the database, returns a summary report"""
+        # Huginn читаем раньше БД: всё, что сохранено в БД к моменту чтения, уже в списке
+        agents = {agent["id"]: agent for agent in await self.huginn_client.list_agents()}
+        # Агенты с id больше последнего прочитанного созданы после чтения, их не трогаем
+        last_listed_id = max(agents, default=0)
+
+        channels = await self.channel_repository.get_agent_references()
+        shared_agent_ids = await self.shared_post_agents.repository.get_agent_ids()
+        packs = await self.rss_agent_packs.repository.get_all()
+
+        referenced = set(shared_agent_ids)
+        for pack in packs:
+            referenced |= {pack.huginn_rss_agent_id, pack.huginn_post_agent_id}
+        for channel in channels:
+            referenced |= {channel.huginn_rss_agent_id, channel.huginn_post_agent_id}
+        referenced.discard(None)
+
+        errors = []
+        # Список без стабильного курсора пропускает агентов, если во время чтения
+        # другие агенты удаляются: отсутствующих в списке проверяем по одному
+        unlisted = {
+            agent_id for agent_id in referenced
+            if agent_id <= last_listed_id and agent_id not in agents
+        }
+        unconfirmed = await self._confirm_missing(unlisted, agents, errors)
+
+        def missing(agent_id: int | None) -> bool:
+            if agent_id is None:
+                return True
+            return agent_id <= last_listed_id and agent_id not in agents and agent_id not in unconfirmed
+
+        orphaned = sorted(
+            agent_id for agent_id, agent in agents.items()
+            if agent_id not in referenced and self._is_timon_agent(agent) and self._is_settled(agent)
+        )
+        # Каналы бэкенда без агентов Huginn не ломаются, все агенты Timon становятся лишними
+        broken_channels = [] if not self.channel_service.monitoring_backend.uses_huginn_agents else [
+            channel.channel_name for channel in channels
+            if channel.is_monitored and (
+                missing(channel.huginn_rss_agent_id) or missing(channel.huginn_post_agent_id)
+            )
+        ]
+        disabled = sorted(
+            agent_id for agent_id in referenced
+            if agent_id in agents and agents[agent_id].get("disabled")
+        )
+
+        report = {
+            "dry_run": dry_run,
+            "huginn_agents": len(agents),
+            "orphaned_agents": orphaned,
+            "broken_channels": broken_channels,
+            "disabled_agents": disabled,
+            "deleted_agents": 0,
+            "reprovisioned_channels": 0,
+            "restarted_agents": 0,
+            "errors": errors
+        }
+        if dry_run:
+            logger.info("Huginn reconciliation dry run", extra=self._log_extra(report))
+            return report
+
+        report["deleted_agents"] = await self._run_concurrently(
+            orphaned, self.huginn_client.delete_agent, report["errors"]
+        )
+        report["restarted_agents"] = await self._run_concurrently(
+            disabled, lambda agent_id: self._restart_agent(agents[agent_id]), report["errors"]
+        )
+
+        stale_packs = [
+            pack for pack in packs
+            if missing(pack.huginn_rss_agent_id) or missing(pack.huginn_post_agent_id)
+        ]
+        stale_shared = {agent_id for agent_id in shared_agent_ids if missing(agent_id)}
+        report["reprovisioned_channels"] = await self._reprovision(
+            broken_channels, stale_packs, stale_shared, agents, report["errors"]
+        )
+
+        logger.info("Huginn reconciliation finished", extra=self._log_extra(report))
+        return report
+
+    @staticmethod
+    def _is_timon_agent(agent: dict) -> bool:
+        return agent.get("name", "").startswith(TIMON_AGENT_NAME_PREFIXES)
+
+    @staticmethod
+    def _is_settled(agent: dict) -> bool:
+        created_at = agent.get("created_at")
+        if not created_at:
+            return True
+        created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        return datetime.now(timezone.utc) - created_at > ORPHAN_GRACE_PERIOD
+
+    @staticmethod
+    def _log_extra(report: dict) -> dict:
+        return {
+            key: len(value) if isinstance(value, list) else value
+            for key, value in report.items()
+        }
+
+    async def _confirm_missing(
+        self,
+        agent_ids: set[int],
+        agents: dict[int, dict],
+        errors: list[str]
+    ) -> set[int]:
+        """
+        Fetch agents absent from the listing one by one. Found agents are added
+        to `agents`, 404 confirms the agent is gone. Returns ids that could not
+        be checked, they are left alone until the next run.
+        """
+        unconfirmed = set()
+
+        async def confirm(agent_id: int) -> None:
+            async with self._semaphore:
+                try:
+                    agents[agent_id] = await self.huginn_client.get_agent_status(agent_id)
+                except HTTPException as e:
+                    if e.status_code != 404:
+                        errors.append(f"agent {agent_id}: {e.detail}")
+                        unconfirmed.add(agent_id)
+                except Exception as e:
+                    errors.append(f"agent {agent_id}: {e}")
+                    unconfirmed.add(agent_id)
+
+        await asyncio.gather(*(confirm(agent_id) for agent_id in agent_ids))
+        if agent_ids:
+            logger.info(
+                "Checked agents missing from Huginn listing",
+                extra={
+                    "checked": len(agent_ids),
+                    "found": len(agent_ids & agents.keys()),
+                    "unconfirmed": len(unconfirmed)
+                }
+            )
+        return unconfirmed
+
+    async def _run_concurrently(self, agent_ids: list[int], action, errors: list[str]) -> int:
+        async def run(agent_id: int) -> bool:
+            async with self._semaphore:
+                try:
+                    await action(agent_id)
+                    return True
+                except Exception as e:
+                    errors.append(f"agent {agent_id}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(run(agent_id) for agent_id in agent_ids))
+        return sum(results)
+
+    async def _restart_agent(self, agent: dict) -> None:
+        await self.huginn_client.enable_agent(agent["id"])
+        if agent.get("type") == "Agents::RssAgent":
+            await self.huginn_client.start_agent(agent["id"])
+
+    async def _reprovision(
+        self,
+        channel_names: list[str],
+        stale_packs: list,
+        stale_shared: set[int],
+        agents: dict[int, dict],
+        errors: list[str]
+    ) -> int:
+        """Drop what is left of broken agent pairs and provision channels again"""
+        # Сначала забываем агентов, которых нет в Huginn, чтобы их не выдали заново
+        for pack in stale_packs:
+            await self._delete_leftovers(
+                [pack.huginn_rss_agent_id, pack.huginn_post_agent_id], agents, stale_shared
+            )
+            await self.rss_agent_packs.repository.delete(pack)
+        if stale_shared:
+            await self.shared_post_agents.repository.delete_by_agent_ids(stale_shared)
+        if not channel_names:
+            return 0
+
+        stale_pack_agent_ids = {pack.huginn_rss_agent_id for pack in stale_packs}
+        pack_agent_ids = await self.rss_agent_packs.repository.get_rss_agent_ids()
+        for channel in await self.channel_repository.get_by_channel_names(channel_names):
+            # Живой пак других каналов не трогаем
+            if channel.huginn_rss_agent_id in pack_agent_ids | stale_pack_agent_ids:
+                continue
+            await self._delete_leftovers(
+                [channel.huginn_rss_agent_id, channel.huginn_post_agent_id], agents, stale_shared
+            )
+        await self.channel_repository.clear_agent_ids(channel_names)
+
+        # Агенты создаются так же, как для новых каналов: одним импортом сценария или в паках
+        try:
+            await huginn_backend.attach_agents(self.channel_service, channel_names)
+            return len(channel_names)
+        except Exception as e:
+            errors.append(f"channels {channel_names}: {e}")
+            return 0
+
+    async def _delete_leftovers(
+        self,
+        agent_ids: list[int | None],
+        agents: dict[int, dict],
+        stale_shared: set[int]
+    ) -> None:
+        shared_agent_ids = await self.shared_post_agents.repository.get_agent_ids()
+        for agent_id in agent_ids:
+            if agent_id in agents and agent_id not in shared_agent_ids | stale_shared:
+                await self.channel_service._delete_agent_quietly(agent_id)
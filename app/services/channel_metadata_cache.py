@@ -0,0 +1,112 @@
+# app/services/channel_metadata_cache.py
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.exceptions.http_exceptions import ChannelUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ChannelMetadata:
+    title: Optional[str]
+    photo_url: Optional[str]
+    checked_at: datetime
+    # Причина недоступности канала, закэшированная как отрицательный результат
+    error: Optional[str] = None
+
+
+class ChannelMetadataCache:
+    """
+    In-memory title and photo of channels read from their RSSHub feeds.
+
+    Private and nonexistent channels are cached as errors for `negative_ttl`
+    seconds. Concurrent lookups of one channel share a single RSSHub request.
+    At most `maxsize` channels are kept, the least recently used is evicted first.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, ChannelMetadata] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def get(self, channel_name: str) -> ChannelMetadata | None:
+        entry = self._entries.get(channel_name)
+        if entry is None:
+            return None
+        ttl = self.negative_ttl if entry.error else self.ttl
+        if datetime.now(timezone.utc) - entry.checked_at > timedelta(seconds=ttl):
+            self._entries.pop(channel_name, None)
+            return None
+        self._entries.move_to_end(channel_name)
+        return entry
+
+    def put(self, channel_name: str, metadata: ChannelMetadata) -> None:
+        self._entries[channel_name] = metadata
+        self._entries.move_to_end(channel_name)
+        # Проверки случайных имен не должны раздувать кэш: вытесняем давно не читанные
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, channel_name: str) -> None:
+        self._entries.pop(channel_name, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def lookup(
+        self,
+        channel_name: str,
+        fetch: Callable[[], Awaitable[tuple[Optional[str], Optional[str]]]]
+    ) -> ChannelMetadata:
+        """Cached metadata of a channel, fetch() reads title and photo_url from RSSHub
+
+        Raises ChannelUnavailable for channels known to be private or nonexistent.
+        """
+        entry = self.get(channel_name)
+        if entry is None:
+            task = self._inflight.get(channel_name)
+            if task is None:
+                task = asyncio.create_task(self._fetch(channel_name, fetch))
+                self._inflight[channel_name] = task
+                task.add_done_callback(lambda _: self._inflight.pop(channel_name, None))
+            # shield: отмена одного запроса не отменяет проверку для остальных
+            entry = await asyncio.shield(task)
+
+        if entry.error:
+            raise ChannelUnavailable(entry.error)
+        return entry
+
+    async def _fetch(
+        self,
+        channel_name: str,
+        fetch: Callable[[], Awaitable[tuple[Optional[str], Optional[str]]]]
+    ) -> ChannelMetadata:
+        checked_at = datetime.now(timezone.utc)
+        try:
+            title, photo_url = await fetch()
+        except ChannelUnavailable as e:
+            # Таймауты и ошибки RSSHub не кэшируем, только ответ о недоступности канала
+            entry = ChannelMetadata(title=None, photo_url=None, checked_at=checked_at, error=e.detail)
+        else:
+            entry = ChannelMetadata(title=title, photo_url=photo_url, checked_at=checked_at)
+        self.put(channel_name, entry)
+        return entry
+
+
+channel_metadata_cache = ChannelMetadataCache(
+    ttl=settings.CHANNEL_METADATA_TTL,
+    negative_ttl=settings.CHANNEL_METADATA_NEGATIVE_TTL,
+    maxsize=settings.CHANNEL_METADATA_CACHE_SIZE
+)
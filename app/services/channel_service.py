@@ -1,38 +1,72 @@
 # app/services/channel_service.py
+import asyncio
 import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from urllib.parse import urlparse
 
 from fastapi import HTTPException
 from httpx import AsyncClient, TimeoutException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.exceptions.http_exceptions import ChannelUnavailable
 from app.models.channel import Channel
 from app.models.subscription import Subscription
 from app.repositories.channel_repository import ChannelRepository
 from app.repositories.subscription_repository import SubscriptionRepository
 from app.schemas.channel import ChannelCreate
-from app.schemas.subscription import SubscriptionCreate, SubscriptionResponse
-from app.services.huginn_client import HuginnClient
+from app.schemas.subscription import (
+    SubscriptionBatchItem,
+    SubscriptionCreate,
+    SubscriptionResponse,
+)
+from app.services.channel_metadata_cache import ChannelMetadata, channel_metadata_cache
+from app.services.huginn_client import AsyncHuginnClient, get_huginn_client
+from app.services.monitoring_backends import MonitoringBackend, get_monitoring_backend
+from app.services.routing_cache import routing_cache
+from app.services.rss_agent_packs import RssAgentPacks
+from app.services.shared_post_agents import SharedPostAgents
+from app.utils.feed_header import parse_feed_header, read_prefix
 
 logger = logging.getLogger(__name__)
 
 
 class ChannelService:
-    def __init__(self, db: Session):
+    RSSHUB_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        http_client: Optional[AsyncClient] = None,
+        huginn_client: Optional[AsyncHuginnClient] = None
+    ):
         self.channel_repository = ChannelRepository(db)
         self.subscription_repository = SubscriptionRepository(db)
-        self.huginn_client = HuginnClient()
-        self.http_client = AsyncClient(timeout=10.0)
+        # Сессия Huginn общая для процесса, вход выполняется один раз
+        self.huginn_client = huginn_client or get_huginn_client()
+        self.shared_post_agents = SharedPostAgents(db, self.huginn_client)
+        self.rss_agent_packs = RssAgentPacks(db, self.huginn_client, self.shared_post_agents)
+        # Общий клиент из пула не закрываем, закрываем только собственный
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or AsyncClient(timeout=self.RSSHUB_TIMEOUT)
+        self.routing_cache = routing_cache
+        self.metadata_cache = channel_metadata_cache
+
+    @property
+    def monitoring_backend(self) -> MonitoringBackend:
+        return get_monitoring_backend()
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.http_client.aclose()
+        if self._owns_http_client:
+            await self.http_client.aclose()
 
-    def create_channel(self, channel: ChannelCreate) -> Channel:
+    async def create_channel(self, channel: ChannelCreate) -> Channel:
         channel_name = self._extract_channel_name_from_url(channel.channel_url)
-        self._check_channel_exists(channel_name)
+        await self._check_channel_exists(channel_name)
         
         new_channel = Channel(
             channel_name=channel_name,
@@ -47,106 +81,124 @@ class ChannelService:
                 detail="callback_url is required"
             )
         
-        self.channel_repository.create(new_channel)
-        
-        try:
-            # Create agents
-            rss_agent_id = self.huginn_client.create_rss_agent(channel_name)
-            post_agent_id = self.huginn_client.create_post_agent(channel_name)
-            
-            # Link agents
-            self.huginn_client.link_agents(rss_agent_id, post_agent_id)
-            
-            # Check links
-            links = self.huginn_client.get_agent_links(rss_agent_id)
-            logger.info(f"RSS Agent links: {links}")
-            
-            # RSS agent should send events to Post agent
-            if post_agent_id not in links["receivers"]:
-                logger.warning(f"Post agent {post_agent_id} not found in RSS agent receivers!")
-            
-            # Post agent should receive events from RSS
-            post_links = self.huginn_client.get_agent_links(post_agent_id)
-            if rss_agent_id not in post_links["sources"]:
-                logger.warning(f"RSS agent {rss_agent_id} not found in Post agent sources!")
-            
-            # Start agents
-            self.huginn_client.start_agent(rss_agent_id)
-            
-            # Check status
-            rss_status = self.huginn_client.get_agent_status(rss_agent_id)
-            post_status = self.huginn_client.get_agent_status(post_agent_id)
-            
-            logger.info(f"RSS Agent status: {rss_status}")
-            logger.info(f"Post Agent status: {post_status}")
-            
-            new_channel.huginn_rss_agent_id = rss_agent_id
-            new_channel.huginn_post_agent_id = post_agent_id
-            self.channel_repository.update(new_channel)
-        except HTTPException as e:
-            self.channel_repository.delete(new_channel)
-            raise e
-        
+        await self.monitoring_backend.provision(self, [new_channel])
         return new_channel
 
+    async def create_channels(self, channel_urls: list) -> tuple[list[Channel], list[Channel]]:
+        """Start monitoring many channels, returns created and already existing channels
+
+        All new channels are provisioned together by the monitoring backend,
+        e.g. their Huginn agents are created with one scenario import.
+        """
+        if len(channel_urls) > settings.CHANNEL_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch is too large, maximum is {settings.CHANNEL_BATCH_MAX_SIZE} channels"
+            )
+
+        return await self._create_channels(self._extract_channel_names(channel_urls))
+
+    async def _create_channels(self, channel_names: list[str]) -> tuple[list[Channel], list[Channel]]:
+        existing = await self.channel_repository.get_by_channel_names(channel_names)
+        existing_names = {channel.channel_name for channel in existing}
+        new_names = [name for name in channel_names if name not in existing_names]
+        if not new_names:
+            return [], existing
+
+        channels = [Channel(channel_name=name, is_monitored=True) for name in new_names]
+        await self.monitoring_backend.provision(self, channels)
+        logger.info(
+            "Successfully provisioned channels",
+            extra={"created_channels": len(channels), "existing_channels": len(existing)}
+        )
+        return channels, existing
+
+    async def _delete_agent_quietly(self, agent_id: int) -> None:
+        try:
+            await self.huginn_client.delete_agent(agent_id)
+        except Exception as e:
+            logger.error(f"Failed to delete Huginn agent {agent_id}: {e}")
+
+    def _extract_channel_names(self, urls: list) -> list[str]:
+        # dict сохраняет порядок и убирает повторы
+        return list(dict.fromkeys(self._extract_channel_name_from_url(url) for url in urls))
+
     def _extract_channel_name_from_url(self, url: str) -> str:
         parsed_url = urlparse(str(url))
         return parsed_url.path.strip('/').split('/')[-1]
 
-    def _check_channel_exists(self, channel_name: str) -> None:
-        if self.channel_repository.get_by_channel_name(channel_name):
+    async def _check_channel_exists(self, channel_name: str) -> None:
+        if await self.channel_repository.get_by_channel_name(channel_name):
             raise HTTPException(status_code=400, detail="Channel already exists")
 
-    def delete_channel(self, channel_id: int) -> None:
-        channel = self.channel_repository.get_by_id(channel_id)
+    async def delete_channel(self, channel_id: int) -> None:
+        channel = await self.channel_repository.get_by_id(channel_id)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
         
-        try:
-            if channel.huginn_rss_agent_id:
-                self.huginn_client.delete_agent(channel.huginn_rss_agent_id)
-            if channel.huginn_post_agent_id:
-                self.huginn_client.delete_agent(channel.huginn_post_agent_id)
-        except HTTPException as e:
-            logger.error(f"Error deleting Huginn agents: {e}")
-            raise e
-        
-        self.channel_repository.delete(channel)
+        await self.channel_repository.delete(channel)
+        self.routing_cache.invalidate(channel.channel_name)
+        await self.monitoring_backend.teardown(self, [channel])
+
+    def _stored_metadata(self, channel: Optional[Channel]) -> Optional[ChannelMetadata]:
+        """Title and photo saved in the channel row, None if they expired"""
+        checked_at = channel.metadata_checked_at if channel else None
+        if checked_at and datetime.now(timezone.utc) - checked_at <= timedelta(
+            seconds=self.metadata_cache.ttl
+        ):
+            return ChannelMetadata(title=channel.title, photo_url=channel.photo_url, checked_at=checked_at)
+        return None
+
+    async def _lookup_metadata(self, channel_name: str) -> ChannelMetadata:
+        return await self.metadata_cache.lookup(
+            channel_name, lambda: self._check_channel_availability(channel_name)
+        )
+
+    async def _get_channel_metadata(self, channel_name: str, channel: Optional[Channel]) -> ChannelMetadata:
+        """Title and photo of a channel, RSSHub is asked only when the cached ones expired"""
+        stored = self._stored_metadata(channel)
+        if stored:
+            return stored
+
+        metadata = await self._lookup_metadata(channel_name)
+        # Сохраняем в канал, чтобы кэш пережил перезапуск
+        checked_at = channel.metadata_checked_at if channel else None
+        if channel and (checked_at is None or checked_at < metadata.checked_at):
+            await self.channel_repository.set_metadata(
+                channel.id, metadata.title, metadata.photo_url, metadata.checked_at
+            )
+        return metadata
 
     async def _check_channel_availability(self, channel_name: str) -> tuple[str, str]:
         """Проверяет доступность канала через RSSHub напрямую и возвращает title и photo_url"""
         rsshub_url = f"http://rsshub:1200/telegram/channel/{channel_name}"
         
         try:
-            response = await self.http_client.get(rsshub_url)
-            
-            if response.status_code == 503:
-                error_message = "Channel is private or inaccessible"
-                if "Unable to fetch message feed" in response.text:
-                    error_message = "This channel is private or doesn't exist"
-                raise HTTPException(
-                    status_code=400,
-                    detail=error_message
-                )
-                
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Failed to verify channel: HTTP {response.status_code}"
+            # Фид читается потоком: заголовок канала идёт до постов, остальное не скачиваем
+            async with self.http_client.stream("GET", rsshub_url, timeout=self.RSSHUB_TIMEOUT) as response:
+                if response.status_code == 503:
+                    error_message = "Channel is private or inaccessible"
+                    body = await read_prefix(response.aiter_bytes(), settings.RSSHUB_FEED_HEADER_MAX_BYTES)
+                    if b"Unable to fetch message feed" in body:
+                        error_message = "This channel is private or doesn't exist"
+                    raise ChannelUnavailable(error_message)
+
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Failed to verify channel: HTTP {response.status_code}"
+                    )
+
+                title, photo_url = await parse_feed_header(
+                    response.aiter_bytes(), settings.RSSHUB_FEED_HEADER_MAX_BYTES
                 )
 
-            # Parse XML response
-            from xml.etree import ElementTree as ET
-            root = ET.fromstring(response.text)
-            
-            # Extract title and photo_url
-            channel_elem = root.find('channel')
-            title = channel_elem.find('title').text.replace(' - Telegram Channel', '')
-            image_elem = channel_elem.find('image')
-            photo_url = image_elem.find('url').text if image_elem is not None else None
-            
-            return title, photo_url
+            if title is None:
+                raise ValueError("Feed has no channel title")
+            return title.replace(' - Telegram Channel', ''), photo_url
                 
+        except HTTPException:
+            raise
         except TimeoutException:
             raise HTTPException(
                 status_code=400,
@@ -170,55 +222,41 @@ class ChannelService:
         logger.debug(f"Extracted channel name: {channel_name}")
         
         # Check if channel exists
-        channel = self.channel_repository.get_by_channel_name(channel_name)
+        channel = await self.channel_repository.get_by_channel_name(channel_name)
         
         # Get channel info from RSS feed
-        channel_title, channel_photo_url = await self._check_channel_availability(channel_name)
+        metadata = await self._get_channel_metadata(channel_name, channel)
+        channel_title, channel_photo_url = metadata.title, metadata.photo_url
         
         if not channel:
             logger.info(f"Channel {channel_name} not found, creating new")
             channel = Channel(
                 channel_name=channel_name,
-                is_monitored=True
+                is_monitored=True,
+                title=metadata.title,
+                photo_url=metadata.photo_url,
+                metadata_checked_at=metadata.checked_at
             )
-            self.channel_repository.create(channel)
-            
-            # Create Huginn agents for new channel
             try:
-                # Create agents
-                rss_agent_id = self.huginn_client.create_rss_agent(channel_name)
-                post_agent_id = self.huginn_client.create_post_agent(channel_name)
-                
-                # Link agents
-                self.huginn_client.link_agents(rss_agent_id, post_agent_id)
-                
-                # Start agents
-                self.huginn_client.start_agent(rss_agent_id)
-                
-                # Update channel with agent IDs
-                channel.huginn_rss_agent_id = rss_agent_id
-                channel.huginn_post_agent_id = post_agent_id
-                self.channel_repository.update(channel)
+                await self.monitoring_backend.provision(self, [channel])
                 
                 logger.info(
-                    "Successfully created Huginn agents",
+                    "Successfully started channel monitoring",
                     extra={
                         "channel_name": channel_name,
-                        "rss_agent_id": rss_agent_id,
-                        "post_agent_id": post_agent_id
+                        "rss_agent_id": channel.huginn_rss_agent_id,
+                        "post_agent_id": channel.huginn_post_agent_id
                     }
                 )
             except Exception as e:
-                # Cleanup on failure
-                self.channel_repository.delete(channel)
-                logger.error(f"Failed to create Huginn agents: {e}")
+                logger.error(f"Failed to start channel monitoring: {e}")
                 raise HTTPException(
                     status_code=500,
                     detail=f"Failed to setup channel monitoring: {str(e)}"
                 )
         
         # Check if subscription already exists
-        existing_sub = self.subscription_repository.get_by_channel_and_callback(
+        existing_sub = await self.subscription_repository.get_by_channel_and_callback(
             channel.id,
             str(subscription.callback_url)
         )
@@ -247,7 +285,8 @@ class ChannelService:
             existing_sub.is_active = True
             existing_sub.title = channel_title
             existing_sub.photo_url = channel_photo_url
-            self.subscription_repository.update(existing_sub)
+            await self.subscription_repository.update(existing_sub)
+            self.routing_cache.invalidate(channel_name)
             return SubscriptionResponse.model_validate(existing_sub)
         
         # Create new subscription
@@ -265,7 +304,8 @@ class ChannelService:
             title=channel_title,
             photo_url=channel_photo_url
         )
-        self.subscription_repository.create(new_sub)
+        await self.subscription_repository.create(new_sub)
+        self.routing_cache.invalidate(channel_name)
         
         logger.info(
             "Successfully created subscription",
@@ -276,46 +316,212 @@ class ChannelService:
         )
         return SubscriptionResponse.model_validate(new_sub)
 
+    async def create_subscriptions(
+        self,
+        channel_urls: list,
+        callback_url: str
+    ) -> list[SubscriptionBatchItem]:
+        """Subscribe one callback to many channels, returns a result for every channel
+
+        Channels are checked in RSSHub concurrently, missing channels are
+        provisioned together and all subscriptions are saved in one transaction.
+        A channel that failed the check or provisioning does not fail the batch.
+        """
+        if len(channel_urls) > settings.SUBSCRIPTION_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch is too large, maximum is {settings.SUBSCRIPTION_BATCH_MAX_SIZE} channels"
+            )
+
+        channel_names = self._extract_channel_names(channel_urls)
+        channels = {
+            channel.channel_name: channel
+            for channel in await self.channel_repository.get_by_channel_names(channel_names)
+        }
+
+        semaphore = asyncio.Semaphore(settings.SUBSCRIPTION_BATCH_CHECK_CONCURRENCY)
+
+        async def check(channel_name: str) -> ChannelMetadata:
+            stored = self._stored_metadata(channels.get(channel_name))
+            if stored:
+                return stored
+            async with semaphore:
+                return await self._lookup_metadata(channel_name)
+
+        # Проверки не используют сессию БД, поэтому их можно запускать параллельно
+        checks = await asyncio.gather(*(check(name) for name in channel_names), return_exceptions=True)
+        errors: dict[str, str] = {}
+        metadata: dict[str, ChannelMetadata] = {}
+        for channel_name, result in zip(channel_names, checks):
+            if isinstance(result, HTTPException):
+                errors[channel_name] = result.detail
+            elif isinstance(result, BaseException):
+                errors[channel_name] = str(result)
+            else:
+                metadata[channel_name] = result
+
+        new_names = [name for name in metadata if name not in channels]
+        if new_names:
+            try:
+                await self._create_channels(new_names)
+            except Exception as e:
+                logger.error(f"Failed to provision channels of subscriptions batch: {e}")
+                detail = e.detail if isinstance(e, HTTPException) else f"Failed to setup channel monitoring: {e}"
+                errors.update({name: detail for name in new_names})
+            # После отката объекты сессии истекают, каналы перечитываем одним запросом
+            channels = {
+                channel.channel_name: channel
+                for channel in await self.channel_repository.get_by_channel_names(list(metadata))
+            }
+
+        existing_subscriptions = {
+            subscription.channel_id: subscription
+            for subscription in await self.subscription_repository.get_by_channel_ids_and_callback(
+                [channel.id for channel in channels.values()], callback_url
+            )
+        }
+        statuses: dict[str, tuple[str, Subscription]] = {}
+        changed: list[Subscription] = []
+        for channel_name, channel_metadata in metadata.items():
+            channel = channels.get(channel_name)
+            if channel is None:
+                errors.setdefault(channel_name, "Failed to setup channel monitoring")
+                continue
+            if channel.metadata_checked_at is None or channel.metadata_checked_at < channel_metadata.checked_at:
+                channel.title = channel_metadata.title
+                channel.photo_url = channel_metadata.photo_url
+                channel.metadata_checked_at = channel_metadata.checked_at
+
+            subscription = existing_subscriptions.get(channel.id)
+            if subscription is not None and subscription.is_active:
+                statuses[channel_name] = ("exists", subscription)
+                continue
+            if subscription is not None:
+                subscription.is_active = True
+                status = "reactivated"
+            else:
+                subscription = Subscription(
+                    channel_id=channel.id,
+                    callback_url=callback_url,
+                    is_active=True
+                )
+                status = "created"
+            subscription.title = channel_metadata.title
+            subscription.photo_url = channel_metadata.photo_url
+            statuses[channel_name] = (status, subscription)
+            changed.append(subscription)
+
+        # Подписки и метаданные каналов сохраняются одной транзакцией
+        await self.subscription_repository.save_many(changed)
+        for channel_name, (status, _) in statuses.items():
+            if status != "exists":
+                self.routing_cache.invalidate(channel_name)
+
+        results = []
+        for channel_name in channel_names:
+            if channel_name in statuses:
+                status, subscription = statuses[channel_name]
+                results.append(SubscriptionBatchItem(
+                    channel_name=channel_name,
+                    status=status,
+                    subscription=SubscriptionResponse.model_validate(subscription)
+                ))
+            else:
+                results.append(SubscriptionBatchItem(
+                    channel_name=channel_name, status="failed", error=errors[channel_name]
+                ))
+
+        logger.info(
+            "Created subscriptions batch",
+            extra={
+                "channels": len(channel_names),
+                "changed_subscriptions": len(changed),
+                "failed_channels": len(channel_names) - len(statuses)
+            }
+        )
+        return results
+
+    async def delete_subscriptions(
+        self,
+        subscription_ids: Optional[list[int]] = None,
+        callback_url: Optional[str] = None
+    ) -> dict:
+        """Delete subscriptions by IDs or callback URL in one transaction
+
+        With both filters only the listed subscriptions of the callback URL
+        are deleted. Channels left without active subscriptions are deleted
+        in the same transaction, then the monitoring backend stops polling them.
+        """
+        if subscription_ids is None and callback_url is None:
+            raise HTTPException(status_code=400, detail="subscription_ids or callback_url is required")
+        if subscription_ids is not None and len(subscription_ids) > settings.SUBSCRIPTION_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch is too large, maximum is {settings.SUBSCRIPTION_BATCH_MAX_SIZE} subscriptions"
+            )
+
+        try:
+            channel_ids = await self.subscription_repository.delete_many(subscription_ids, callback_url)
+            # Одним запросом находим каналы, у которых не осталось активных подписок
+            channels = await self.channel_repository.get_with_active_subscription_counts(
+                list(set(channel_ids))
+            )
+            released = [channel for channel in channels if channel.active_subscriptions == 0]
+            await self.channel_repository.delete_many([channel.id for channel in released])
+        except Exception as e:
+            logger.error(f"Failed to delete subscriptions: {e}")
+            await self.channel_repository.db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to delete subscriptions: {str(e)}"
+            )
+
+        for channel in channels:
+            self.routing_cache.invalidate(channel.channel_name)
+
+        deleting_agents = await self.monitoring_backend.teardown(self, released) if released else 0
+
+        summary = {
+            "deleted_subscriptions": len(channel_ids),
+            "released_channels": len(released),
+            "deleting_agents": deleting_agents
+        }
+        logger.info("Deleted subscriptions", extra=summary)
+        return summary
+
     async def delete_subscription(self, subscription_id: int) -> None:
         """Delete subscription and cleanup if needed"""
         logger.info(f"Deleting subscription {subscription_id}")
         
-        subscription = self.subscription_repository.get(subscription_id)
+        subscription = await self.subscription_repository.get(subscription_id)
         if not subscription:
             logger.warning(f"Subscription {subscription_id} not found")
             raise HTTPException(status_code=404, detail="Subscription not found")
 
         try:
             # Получаем канал до удаления подписки
-            channel = self.channel_repository.get(subscription.channel_id)
+            channel = await self.channel_repository.get(subscription.channel_id)
             if not channel:
                 logger.warning(f"Channel {subscription.channel_id} not found")
                 raise HTTPException(status_code=404, detail="Channel not found")
 
             # Проверяем, есть ли еще активные подписки на этот канал
-            active_subscriptions = self.subscription_repository.get_active_by_channel_id(
+            active_subscriptions = await self.subscription_repository.get_active_by_channel_id(
                 subscription.channel_id
             )
             
             # Если это единственная активная подписка (текущая)
             if len(active_subscriptions) <= 1:
                 logger.info(f"Last active subscription for channel {subscription.channel_id}, cleaning up")
-                
-                # Удаляем агентов в Huginn если они есть
-                if channel.huginn_rss_agent_id and channel.huginn_post_agent_id:
-                    logger.info("Deleting Huginn agents")
-                    try:
-                        self.huginn_client.delete_agent(channel.huginn_rss_agent_id)
-                        self.huginn_client.delete_agent(channel.huginn_post_agent_id)
-                    except Exception as e:
-                        logger.error(f"Failed to delete Huginn agents: {e}")
-
-                # Удаляем канал
+
+                # Удаляем канал и останавливаем его опрос
                 logger.info(f"Deleting channel {channel.id}")
-                self.channel_repository.delete(channel)
+                await self.channel_repository.delete(channel)
+                await self.monitoring_backend.teardown(self, [channel])
 
             # Физически удаляем подписку
-            self.subscription_repository.delete(subscription)
+            await self.subscription_repository.delete(subscription)
+            self.routing_cache.invalidate(channel.channel_name)
             logger.info(f"Successfully deleted subscription {subscription_id}")
 
         except Exception as e:
@@ -323,4 +529,5 @@ class ChannelService:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to delete subscription: {str(e)}"
-            )
\ No newline at end of file
+            )
+
@@ -1,7 +1,11 @@
+import asyncio
+import json
 import logging
-from typing import Any, Dict, Optional
+import re
+import uuid
+from typing import Optional
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
 from app.core.config import settings
@@ -9,23 +13,199 @@ from app.core.exceptions.http_exceptions import HTTPException
 
 logger = logging.getLogger(__name__)
 
-class HuginnClient:
-    def __init__(self):
+
+def get_csrf_token(html_content: str) -> str:
+    soup = BeautifulSoup(html_content, 'html.parser')
+    csrf = soup.find('meta', attrs={'name': 'csrf-token'})
+    if not csrf:
+        raise HTTPException(status_code=500, detail="CSRF token not found in Huginn login page")
+    return csrf.get('content')
+
+
+def agent_links(agent_data: dict) -> dict:
+    """Links of an agent from its document returned by GET /agents/{id}.json"""
+    # В Huginn есть два типа связей:
+    # source_ids - агенты, от которых получаем события
+    # receiver_ids - агенты, которым отправляем события
+    return {
+        "sources": agent_data.get("source_ids", []),
+        "receivers": agent_data.get("receiver_ids", [])
+    }
+
+
+def rss_feed_url(channel_username: str) -> str:
+    return f"http://rsshub:1200/telegram/channel/{channel_username}"
+
+
+def build_rss_agent_payload(channel_username: str, feed_channels: Optional[list[str]] = None) -> dict:
+    """RSS agent polling the channel feed, or feeds of feed_channels for a pack"""
+    return {
+        "agent": {
+            "type": "Agents::RssAgent",
+            "name": f"RSS Monitor - {channel_username}",
+            "schedule": "every_1m",
+            "options": {
+                "expected_update_period_in_days": "2",
+                "url": [rss_feed_url(name) for name in feed_channels or [channel_username]],
+                "mode": "on_change",
+                "type": "json",
+                "clean": "false"
+            }
+        }
+    }
+
+
+def build_post_agent_payload(channel_username: str) -> dict:
+    # Изменяем webhook_url чтобы использовать порт 8001
+    webhook_url = f"{settings.APP_HOST}/webhook/rss"
+    logger.info(f"Configuring Post agent to send webhooks to: {webhook_url}")
+    
+    return {
+        "agent": {
+            "type": "Agents::PostAgent",
+            "name": f"Post Agent - {channel_username}",
+            "payload_mode": "merge",
+            "options": {
+                "post_url": webhook_url,  # Теперь будет использовать http://app:8001/webhook/rss
+                "expected_receive_period_in_days": "2",
+                "content_type": "json",
+                "method": "post",
+                "payload": {
+                    "title": "{{ title }}",
+                    "link": "{{ url }}",
+                    "guid": "{{ guid }}",
+                    "description": "{{ description }}",
+                    "published": "{{ published }}"
+                },
+                "headers": {
+                    "Content-Type": "application/json"
+                }
+            }
+        }
+    }
+
+
+def scenario_agent_guid(kind: str, channel_username: str) -> str:
+    """Stable guid of a channel agent inside an imported scenario"""
+    # Повторный импорт с тем же guid обновляет агента, а не создаёт дубль
+    return f"timon-{kind}-{channel_username}"
+
+
+def shared_post_agent_key(shard: int) -> str:
+    """Name of a shared Post agent, used in place of a channel name"""
+    return f"shared-{shard}"
+
+
+def _scenario_agent(kind: str, payload: dict, key: str) -> dict:
+    return {
+        **payload["agent"],
+        "guid": scenario_agent_guid(kind, key),
+        "disabled": False,
+        "keep_events_for": 0,
+        "propagate_immediately": False
+    }
+
+
+def _scenario(name: str, description: str, agents: list[dict], links: list[dict]) -> dict:
+    return {
+        "schema_version": 1,
+        "name": name,
+        "description": description,
+        "guid": f"timon-channels-{uuid.uuid4().hex}",
+        "agents": agents,
+        "links": links,
+        "control_links": []
+    }
+
+
+def build_channels_scenario(
+    channel_usernames: list[str],
+    post_agent_shards: Optional[dict[str, int]] = None
+) -> dict:
+    """Huginn scenario with linked RSS and Post agents for every channel
+
+    With post_agent_shards RSS agents are linked to shared Post agents of their
+    shards instead of dedicated ones. Shared agents have stable guids, so the
+    import reuses them if they already exist.
+    """
+    agents = []
+    links = []
+    shared_indexes: dict[int, int] = {}
+    for channel_username in channel_usernames:
+        agents.append(_scenario_agent("rss", build_rss_agent_payload(channel_username), channel_username))
+        rss_index = len(agents) - 1
+
+        if post_agent_shards is None:
+            agents.append(_scenario_agent("post", build_post_agent_payload(channel_username), channel_username))
+            post_index = len(agents) - 1
+        else:
+            shard = post_agent_shards[channel_username]
+            if shard not in shared_indexes:
+                key = shared_post_agent_key(shard)
+                agents.append(_scenario_agent("post", build_post_agent_payload(key), key))
+                shared_indexes[shard] = len(agents) - 1
+            post_index = shared_indexes[shard]
+
+        links.append({"source": rss_index, "receiver": post_index})
+
+    return _scenario(
+        f"Timon channels ({len(channel_usernames)})",
+        "RSS and Post agents of Telegram channels",
+        agents,
+        links
+    )
+
+
+class AsyncHuginnClient:
+    """
+    Non-blocking Huginn client.
+
+    One instance is shared by the whole process (see `huginn_client`), so the
+    login and CSRF token are reused between requests. Authentication is lazy:
+    the session is established on the first request and re-established when
+    Huginn answers 302 or 401; a lock makes concurrent requests wait for a
+    single login instead of each logging in.
+    """
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.base_url = settings.HUGINN_URL
         self.admin_username = settings.HUGINN_ADMIN_USERNAME
         self.admin_password = settings.HUGINN_ADMIN_PASSWORD
-        self.session = requests.Session()
+        self._http_client = http_client
         self.csrf_token = None
-        self._authenticate()
+        self._auth_lock = asyncio.Lock()
+        # Номер текущей сессии: запрос, получивший 302, обновляет только свою сессию
+        self._session_generation = 0
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        # Отдельный клиент: cookie сессии Huginn не должны попадать в запросы к подписчикам
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(timeout=settings.HUGINN_TIMEOUT)
+            self.csrf_token = None
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close the Huginn session on app shutdown"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self.csrf_token = None
+
+    async def _ensure_authenticated(self, expired_generation: Optional[int] = None) -> int:
+        """Log in if there is no session or the given session expired, returns current session"""
+        async with self._auth_lock:
+            # Пока ждали блокировку, сессию мог обновить другой запрос
+            if self.csrf_token is not None and self._session_generation != expired_generation:
+                return self._session_generation
+            await self._authenticate()
+            self._session_generation += 1
+            return self._session_generation
 
     def _get_csrf_token(self, html_content: str) -> str:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        csrf = soup.find('meta', attrs={'name': 'csrf-token'})
-        if not csrf:
-            raise HTTPException(status_code=500, detail="CSRF token not found in Huginn login page")
-        return csrf.get('content')
+        return get_csrf_token(html_content)
 
-    def _authenticate(self):
+    async def _authenticate(self):
         logger.info(f"Attempting to authenticate with Huginn at {self.base_url}")
         
         # Get login page
@@ -33,9 +213,8 @@ class HuginnClient:
         logger.info(f"Getting login page from {login_url}")
         
         try:
-            response = self.session.get(login_url)
+            response = await self.http_client.get(login_url, follow_redirects=True)
             logger.info(f"Login page response status: {response.status_code}")
-            logger.debug(f"Login page content: {response.text[:500]}")  # First 500 chars
             
             if response.status_code != 200:
                 logger.error(f"Failed to get login page. Status: {response.status_code}")
@@ -43,7 +222,6 @@ class HuginnClient:
                 raise HTTPException(status_code=500, detail="Failed to load Huginn login page")
             
             self.csrf_token = self._get_csrf_token(response.text)
-            logger.info(f"Got CSRF token: {self.csrf_token[:10]}...")  # First 10 chars
             
             # Login
             login_data = {
@@ -55,20 +233,19 @@ class HuginnClient:
             }
             
             logger.info("Sending login request...")
-            logger.debug(f"Login data: {login_data}")
             
-            response = self.session.post(
+            response = await self.http_client.post(
                 login_url,
                 data=login_data,
                 headers={
                     'Content-Type': 'application/x-www-form-urlencoded',
                     'Accept': 'text/html,application/json',
                     'X-CSRF-Token': self.csrf_token
-                }
+                },
+                follow_redirects=True
             )
             
             logger.info(f"Login response status: {response.status_code}")
-            logger.debug(f"Login response content: {response.text[:500]}")
             
             if "Invalid Login or password" in response.text:
                 logger.error("Invalid credentials")
@@ -81,80 +258,44 @@ class HuginnClient:
             self.csrf_token = self._get_csrf_token(response.text)
             logger.info("Successfully authenticated with Huginn")
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error during authentication: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
 
-    def create_rss_agent(self, channel_username: str) -> int:
-        logger.info(f"Creating RSS agent for channel: {channel_username}")
-        
-        payload = {
-            "agent": {
-                "type": "Agents::RssAgent",
-                "name": f"RSS Monitor - {channel_username}",
-                "schedule": "every_1m",
-                "options": {
-                    "expected_update_period_in_days": "2",
-                    "url": [f"http://rsshub:1200/telegram/channel/{channel_username}"],
-                    "mode": "on_change",
-                    "type": "json",
-                    "clean": "false"
-                }
-            }
-        }
-        
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'X-CSRF-Token': self.csrf_token
-        }
-        
-        response = self._make_authenticated_request(
-            "POST",
-            "/agents.json",
-            json=payload,
-            headers=headers
-        )
-        
-        try:
-            return response.json()['id']
-        except (KeyError, ValueError) as e:
-            logger.error(f"Failed to parse Huginn response: {e}")
-            logger.error(f"Response content: {response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create RSS agent: {str(e)}"
-            )
-
-    def _make_authenticated_request(
+    async def _make_authenticated_request(
         self, 
         method: str, 
         endpoint: str, 
         retry_auth: bool = True,
         **kwargs
-    ) -> requests.Response:
+    ) -> httpx.Response:
+        generation = await self._ensure_authenticated()
+
         url = f"{self.base_url}{endpoint}"
-        headers = kwargs.pop('headers', {})
+        headers = dict(kwargs.pop('headers', {}))
         headers['X-CSRF-Token'] = self.csrf_token
         
         logger.debug(f"Making {method} request to {url}")
-        logger.debug(f"Headers: {headers}")
-        logger.debug(f"Request params: {kwargs}")
         
-        response = self.session.request(method, url, headers=headers, **kwargs)
+        try:
+            # Редиректы не выполняем: 302 означает, что сессия истекла
+            response = await self.http_client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            logger.error(f"Request error while calling Huginn: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
         
         logger.debug(f"Response status: {response.status_code}")
-        logger.debug(f"Response headers: {dict(response.headers)}")
         logger.debug(f"Response content: {response.text[:500]}")  # Логируем только первые 500 символов
         
-        # Если получили редирект на страницу логина и это первая попытка
-        if response.status_code == 302 and retry_auth:
+        # Если получили редирект на страницу логина или 401 и это первая попытка
+        if self._session_expired(response) and retry_auth:
             logger.info("Session expired, re-authenticating...")
-            self._authenticate()
-            return self._make_authenticated_request(
+            await self._ensure_authenticated(expired_generation=generation)
+            return await self._make_authenticated_request(
                 method, 
                 endpoint, 
                 retry_auth=False,  # Предотвращаем бесконечную рекурсию
+                headers=headers,
                 **kwargs
             )
             
@@ -166,49 +307,25 @@ class HuginnClient:
             
         return response
 
-    def create_post_agent(self, channel_username: str) -> int:
-        """Create a Post agent that will send events to the webhook URL"""
-        logger.info(f"Creating Post agent for channel: {channel_username}")
-        
-        # Изменяем webhook_url чтобы использовать порт 8001
-        webhook_url = f"{settings.APP_HOST}/webhook/rss"
-        logger.info(f"Configuring Post agent to send webhooks to: {webhook_url}")
-        
-        payload = {
-            "agent": {
-                "type": "Agents::PostAgent",
-                "name": f"Post Agent - {channel_username}",
-                "payload_mode": "merge",
-                "options": {
-                    "post_url": webhook_url,  # Теперь будет использовать http://app:8001/webhook/rss
-                    "expected_receive_period_in_days": "2",
-                    "content_type": "json",
-                    "method": "post",
-                    "payload": {
-                        "title": "{{ title }}",
-                        "link": "{{ url }}",
-                        "guid": "{{ guid }}",
-                        "description": "{{ description }}",
-                        "published": "{{ published }}"
-                    },
-                    "headers": {
-                        "Content-Type": "application/json"
-                    }
-                }
-            }
-        }
-        
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'X-CSRF-Token': self.csrf_token
-        }
-        
-        response = self._make_authenticated_request(
+    @staticmethod
+    def _session_expired(response: httpx.Response) -> bool:
+        if response.status_code == 401:
+            return True
+        # Остальные редиректы (например, после импорта сценария) - обычный ответ
+        return (
+            response.status_code == 302
+            and "/users/sign_in" in response.headers.get("Location", "/users/sign_in")
+        )
+
+    async def _create_agent(self, payload: dict, agent_kind: str) -> int:
+        response = await self._make_authenticated_request(
             "POST",
             "/agents.json",
             json=payload,
-            headers=headers
+            headers={
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            }
         )
         
         try:
@@ -218,10 +335,39 @@ class HuginnClient:
             logger.error(f"Response content: {response.text}")
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to create post agent: {str(e)}"
+                detail=f"Failed to create {agent_kind} agent: {str(e)}"
             )
 
-    def link_agents(self, source_agent_id: int, target_agent_id: int) -> None:
+    async def create_rss_agent(self, channel_username: str, feed_channels: Optional[list[str]] = None) -> int:
+        logger.info(f"Creating RSS agent for channel: {channel_username}")
+        return await self._create_agent(build_rss_agent_payload(channel_username, feed_channels), "RSS")
+
+    async def update_rss_agent_feeds(self, agent_id: int, channel_usernames: list[str]) -> None:
+        """Replace feeds polled by an RSS agent"""
+        logger.info(f"Updating RSS agent {agent_id} with {len(channel_usernames)} feeds")
+
+        # Huginn заменяет options целиком, поэтому отправляем их полностью
+        options = build_rss_agent_payload(channel_usernames[0], channel_usernames)["agent"]["options"]
+        response = await self._make_authenticated_request(
+            "PUT",
+            f"/agents/{agent_id}.json",
+            json={"agent": {"options": options}},
+            headers={'Content-Type': 'application/json'}
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to update RSS agent feeds. Response: {response.text}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to update feeds of agent {agent_id}"
+            )
+
+    async def create_post_agent(self, channel_username: str) -> int:
+        """Create a Post agent that will send events to the webhook URL"""
+        logger.info(f"Creating Post agent for channel: {channel_username}")
+        return await self._create_agent(build_post_agent_payload(channel_username), "post")
+
+    async def link_agents(self, source_agent_id: int, target_agent_id: int) -> None:
         """Link two agents together so the source agent can send events to the target agent"""
         logger.info(f"Linking agents {source_agent_id} -> {target_agent_id}")
         
@@ -232,10 +378,9 @@ class HuginnClient:
             "commit": "Update"
         }
         
-        endpoint = f"/agents/{source_agent_id}.json"
-        response = self._make_authenticated_request(
+        response = await self._make_authenticated_request(
             "PUT",
-            endpoint,
+            f"/agents/{source_agent_id}.json",
             json=payload,
             headers={'Content-Type': 'application/json'}
         )
@@ -247,23 +392,57 @@ class HuginnClient:
                 detail=f"Failed to link agents {source_agent_id} and {target_agent_id}"
             )
 
-    def delete_agent(self, agent_id: int) -> None:
-        endpoint = f"/agents/{agent_id}.json"
-        response = self._make_authenticated_request("DELETE", endpoint)
+    async def enable_agent(self, agent_id: int) -> None:
+        """Enable a disabled Huginn agent"""
+        logger.info(f"Enabling agent {agent_id}")
+
+        response = await self._make_authenticated_request(
+            "PUT",
+            f"/agents/{agent_id}.json",
+            json={"agent": {"disabled": False}},
+            headers={'Content-Type': 'application/json'}
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to enable agent. Response: {response.text}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to enable agent {agent_id}"
+            )
+
+    async def update_agent_schedule(self, agent_id: int, schedule: str) -> None:
+        """Change how often Huginn runs an agent, e.g. every_5m"""
+        logger.info(f"Setting schedule of agent {agent_id} to {schedule}")
+
+        response = await self._make_authenticated_request(
+            "PUT",
+            f"/agents/{agent_id}.json",
+            json={"agent": {"schedule": schedule}},
+            headers={'Content-Type': 'application/json'}
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to update agent schedule. Response: {response.text}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to update schedule of agent {agent_id}"
+            )
+
+    async def delete_agent(self, agent_id: int) -> None:
+        response = await self._make_authenticated_request("DELETE", f"/agents/{agent_id}.json")
         if response.status_code not in [200, 204]:
             raise HTTPException(
                 status_code=response.status_code, 
                 detail=f"Failed to delete agent {agent_id} in Huginn"
-            ) 
+            )
 
-    def start_agent(self, agent_id: int) -> None:
+    async def start_agent(self, agent_id: int) -> None:
         """Start a Huginn agent by ID"""
         logger.info(f"Starting agent {agent_id}")
         
-        endpoint = f"/agents/{agent_id}/run"
-        response = self._make_authenticated_request(
+        response = await self._make_authenticated_request(
             "POST",
-            endpoint,
+            f"/agents/{agent_id}/run",
             headers={'Content-Type': 'application/json'}
         )
         
@@ -274,10 +453,9 @@ class HuginnClient:
                 detail=f"Failed to start agent {agent_id}"
             )
 
-    def get_agent_status(self, agent_id: int) -> dict:
+    async def get_agent_status(self, agent_id: int) -> dict:
         """Get status of a Huginn agent"""
-        endpoint = f"/agents/{agent_id}.json"
-        response = self._make_authenticated_request("GET", endpoint)
+        response = await self._make_authenticated_request("GET", f"/agents/{agent_id}.json")
         
         if response.status_code != 200:
             logger.error(f"Failed to get agent status. Response: {response.text}")
@@ -288,29 +466,135 @@ class HuginnClient:
         
         return response.json()
 
-    def get_agent_links(self, agent_id: int) -> list:
+    async def get_agent_links(self, agent_id: int) -> dict:
         """Get agent's links (sources and receivers)"""
-        endpoint = f"/agents/{agent_id}.json"
-        response = self._make_authenticated_request("GET", endpoint)
-        
-        if response.status_code != 200:
-            logger.error(f"Failed to get agent info. Response: {response.text}")
+        return agent_links(await self.get_agent_status(agent_id))
+
+    async def import_scenario(self, scenario: dict) -> int:
+        """Import agents and links of a scenario in one request, returns scenario ID"""
+        logger.info(f"Importing scenario {scenario['name']} with {len(scenario['agents'])} agents")
+
+        response = await self._make_authenticated_request(
+            "POST",
+            "/scenarios/import",
+            data={
+                "scenario_import[data]": json.dumps(scenario),
+                "scenario_import[do_import]": "1"
+            }
+        )
+
+        # При успехе Huginn перенаправляет на страницу сценария,
+        # при ошибке валидации заново отдаёт форму импорта
+        match = re.search(r"/scenarios/(\d+)", response.headers.get("Location", ""))
+        if response.status_code != 302 or not match:
+            logger.error(f"Failed to import scenario. Response: {response.text[:500]}")
             raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to get agent info for {agent_id}"
+                status_code=500,
+                detail="Failed to import Huginn scenario"
             )
-        
-        agent_data = response.json()
-        # В Huginn есть два типа связей:
-        # source_ids - агенты, от которых получаем события
-        # receiver_ids - агенты, которым отправляем события
-        sources = agent_data.get("source_ids", [])
-        receivers = agent_data.get("receiver_ids", [])
-        
-        logger.debug(f"Agent {agent_id} sources: {sources}")
-        logger.debug(f"Agent {agent_id} receivers: {receivers}")
-        
+        return int(match.group(1))
+
+    async def _get_agents_page(self, page: int) -> list[dict]:
+        response = await self._make_authenticated_request(
+            "GET",
+            "/agents.json",
+            params={"page": page},
+            headers={'Accept': 'application/json'}
+        )
+        return response.json()
+
+    async def _get_agents_pages(self, first_page: int, count: int) -> list[list[dict]]:
+        return await asyncio.gather(*(
+            self._get_agents_page(number) for number in range(first_page, first_page + count)
+        ))
+
+    async def list_agents(self, concurrency: int = 5) -> list[dict]:
+        """All agents of the Huginn user, pages are fetched several at a time"""
+        agents: dict[int, dict] = {}
+        page = 1
+        while True:
+            pages = await self._get_agents_pages(page, concurrency)
+            for agents_page in pages:
+                # Новый агент сдвигает страницы, повторы отбрасываем по id
+                agents.update((agent["id"], agent) for agent in agents_page)
+            if not all(pages):
+                return list(agents.values())
+            page += concurrency
+
+    async def get_agent_ids_by_guid(self, guids: set[str], concurrency: int = 5) -> dict[str, int]:
+        """Find agent IDs by guids, newest agents are listed first
+
+        Freshly imported agents are usually on the first page, so pages are
+        fetched one, two, four... at a time up to `concurrency`, until all
+        guids are found.
+        """
+        found: dict[str, int] = {}
+        page = 1
+        batch = 1
+        while len(found) < len(guids):
+            pages = await self._get_agents_pages(page, batch)
+            for agents_page in pages:
+                for agent in agents_page:
+                    if agent.get("guid") in guids:
+                        found[agent["guid"]] = agent["id"]
+            if not all(pages):
+                break
+            page += batch
+            batch = min(batch * 2, concurrency)
+
+        missing = guids - found.keys()
+        if missing:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Huginn agents not found after import: {sorted(missing)}"
+            )
+        return found
+
+    async def create_shared_post_agent(self, shard: int) -> int:
+        """Create the Post agent shared by channels of a shard, or find the existing one"""
+        key = shared_post_agent_key(shard)
+        # Импорт сценария, а не POST /agents.json: только так агент получает guid,
+        # по которому его найдут последующие импорты
+        await self.import_scenario(_scenario(
+            f"Timon shared Post agent {shard}",
+            "Post agent shared by Telegram channels",
+            [_scenario_agent("post", build_post_agent_payload(key), key)],
+            []
+        ))
+        guid = scenario_agent_guid("post", key)
+        agent_ids = await self.get_agent_ids_by_guid({guid})
+        return agent_ids[guid]
+
+    async def provision_channels(
+        self,
+        channel_usernames: list[str],
+        post_agent_shards: Optional[dict[str, int]] = None
+    ) -> dict[str, tuple[int, int]]:
+        """Create linked RSS and Post agents for many channels with one scenario import
+
+        Returns (rss_agent_id, post_agent_id) by channel name. With post_agent_shards
+        channels get shared Post agents of their shards.
+        """
+        await self.import_scenario(build_channels_scenario(channel_usernames, post_agent_shards))
+
+        post_keys = {
+            name: name if post_agent_shards is None else shared_post_agent_key(post_agent_shards[name])
+            for name in channel_usernames
+        }
+        guids = {scenario_agent_guid("rss", name) for name in channel_usernames}
+        guids |= {scenario_agent_guid("post", key) for key in post_keys.values()}
+        agent_ids = await self.get_agent_ids_by_guid(guids)
         return {
-            "sources": sources,
-            "receivers": receivers
-        }
\ No newline at end of file
+            name: (
+                agent_ids[scenario_agent_guid("rss", name)],
+                agent_ids[scenario_agent_guid("post", post_keys[name])]
+            )
+            for name in channel_usernames
+        }
+
+
+huginn_client = AsyncHuginnClient()
+
+
+def get_huginn_client() -> AsyncHuginnClient:
+    return huginn_client
@@ -0,0 +1,304 @@
+# app/services/monitoring_backends.py
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional, Protocol
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.models.channel import Channel
+from app.services.huginn_client import AsyncHuginnClient, agent_links
+from app.services.poll_scheduler import poll_scheduler
+from app.services.rss_poller import rss_poller
+
+if TYPE_CHECKING:
+    from app.services.channel_service import ChannelService
+
+logger = logging.getLogger(__name__)
+
+# Ссылки на фоновые проверки агентов, чтобы задачи не собрал GC
+_verification_tasks: set[asyncio.Task] = set()
+# Фоновые удаления агентов удалённых каналов
+_teardown_tasks: set[asyncio.Task] = set()
+AGENT_TEARDOWN_CONCURRENCY = 10
+
+
+class MonitoringBackend(Protocol):
+    """Polls feeds of monitored channels and hands new posts to WebhookService
+
+    start and stop run background work of the process from the app lifespan.
+    provision saves new channels and starts polling them, teardown stops
+    polling channels already deleted from the database.
+    """
+
+    # Каналы опрашиваются агентами Huginn, расхождения с ними исправляет сверка агентов
+    uses_huginn_agents: bool
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
+        ...
+
+    async def provision(self, service: "ChannelService", channels: list[Channel]) -> None:
+        """Save new channels and start polling their feeds
+
+        On failure nothing is left behind: neither the channels nor anything
+        created for polling them.
+        """
+        ...
+
+    async def teardown(self, service: "ChannelService", channels: list[Channel]) -> int:
+        """Stop polling deleted channels, returns the number of agents deleted in background"""
+        ...
+
+
+class HuginnBackend:
+    """Huginn RSS agents poll the feeds and post new items to /webhook/rss"""
+
+    uses_huginn_agents = True
+
+    async def start(self) -> None:
+        if settings.ADAPTIVE_POLLING_ENABLED:
+            await poll_scheduler.start()
+
+    async def stop(self) -> None:
+        if settings.ADAPTIVE_POLLING_ENABLED:
+            await poll_scheduler.stop()
+
+    async def provision(self, service: "ChannelService", channels: list[Channel]) -> None:
+        """Create agents of new channels with one scenario import and save them together
+
+        With RSS agent packs the channels are saved first and put into packs.
+        """
+        if service.rss_agent_packs.enabled:
+            await self._provision_packed(service, channels)
+            return
+
+        names = [channel.channel_name for channel in channels]
+        agent_ids, post_agent_shards = await self._create_agents(service, names)
+        for channel in channels:
+            channel.huginn_rss_agent_id, channel.huginn_post_agent_id = agent_ids[channel.channel_name]
+        try:
+            await self._save_shared_agents(service, agent_ids, post_agent_shards)
+            await service.channel_repository.create_many(channels)
+        except Exception as e:
+            logger.error(f"Failed to save provisioned channels: {e}")
+            await self._discard_agents(service, agent_ids, post_agent_shards)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to setup channel monitoring: {str(e)}"
+            )
+        self._verify_agents(service, agent_ids)
+
+    async def attach_agents(self, service: "ChannelService", channel_names: list[str]) -> None:
+        """Provision agents of channels already saved in the database, e.g. ones that lost them
+
+        Agents are created the same way as for new channels.
+        """
+        if service.rss_agent_packs.enabled:
+            await service.rss_agent_packs.add_channels(channel_names)
+            return
+
+        agent_ids, post_agent_shards = await self._create_agents(service, channel_names)
+        try:
+            await self._save_shared_agents(service, agent_ids, post_agent_shards)
+            await service.channel_repository.set_agent_ids_by_channel(agent_ids)
+        except Exception as e:
+            logger.error(f"Failed to save agents of channels: {e}")
+            await self._discard_agents(service, agent_ids, post_agent_shards)
+            raise
+        self._verify_agents(service, agent_ids)
+
+    async def _create_agents(
+        self,
+        service: "ChannelService",
+        channel_names: list[str]
+    ) -> tuple[dict[str, tuple[int, int]], Optional[dict[str, int]]]:
+        post_agent_shards = None
+        if service.shared_post_agents.enabled:
+            post_agent_shards = {name: service.shared_post_agents.shard(name) for name in channel_names}
+        agent_ids = await service.huginn_client.provision_channels(channel_names, post_agent_shards)
+        return agent_ids, post_agent_shards
+
+    async def _save_shared_agents(
+        self,
+        service: "ChannelService",
+        agent_ids: dict[str, tuple[int, int]],
+        post_agent_shards: Optional[dict[str, int]]
+    ) -> None:
+        if post_agent_shards is not None:
+            await service.shared_post_agents.repository.save({
+                post_agent_shards[name]: post_agent_id for name, (_, post_agent_id) in agent_ids.items()
+            })
+
+    async def _discard_agents(
+        self,
+        service: "ChannelService",
+        agent_ids: dict[str, tuple[int, int]],
+        post_agent_shards: Optional[dict[str, int]]
+    ) -> None:
+        await service.channel_repository.db.rollback()
+        # Агенты без каналов в БД никто не удалит, убираем их сразу.
+        # Общие Post агенты остаются: ими могут пользоваться другие каналы
+        owned_agent_ids = {rss_agent_id for rss_agent_id, _ in agent_ids.values()}
+        if post_agent_shards is None:
+            owned_agent_ids |= {post_agent_id for _, post_agent_id in agent_ids.values()}
+        await asyncio.gather(*(
+            service._delete_agent_quietly(agent_id) for agent_id in owned_agent_ids
+        ))
+
+    @staticmethod
+    def _verify_agents(service: "ChannelService", agent_ids: dict[str, tuple[int, int]]) -> None:
+        if not settings.HUGINN_VERIFY_AGENTS:
+            return
+        for rss_agent_id, post_agent_id in agent_ids.values():
+            task = asyncio.create_task(verify_agents(service.huginn_client, rss_agent_id, post_agent_id))
+            _verification_tasks.add(task)
+            task.add_done_callback(_verification_tasks.discard)
+
+    async def _provision_packed(self, service: "ChannelService", channels: list[Channel]) -> None:
+        await service.channel_repository.create_many(channels)
+        try:
+            await service.rss_agent_packs.add_channels([channel.channel_name for channel in channels])
+        except Exception as e:
+            logger.error(f"Failed to put channels into RSS agent packs: {e}")
+            for channel in channels:
+                await service.channel_repository.delete(channel)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to setup channel monitoring: {str(e)}"
+            )
+
+        for channel in channels:
+            await service.channel_repository.db.refresh(channel)
+        logger.info("Successfully packed channels", extra={"created_channels": len(channels)})
+
+    async def teardown(self, service: "ChannelService", channels: list[Channel]) -> int:
+        """Remove feeds of deleted channels from RSS agent packs and delete their own agents
+
+        Pack feeds are updated before returning, dedicated agents are deleted
+        concurrently in background. Shared Post agents are kept.
+        """
+        pack_agent_ids = await service.rss_agent_packs.repository.get_rss_agent_ids()
+        shared_agent_ids = await service.shared_post_agents.repository.get_agent_ids()
+
+        agent_ids = []
+        packs = {}
+        for channel in channels:
+            if channel.huginn_rss_agent_id in pack_agent_ids:
+                packs.setdefault(channel.huginn_rss_agent_id, channel)
+                continue
+            agent_ids.extend(
+                agent_id for agent_id in (channel.huginn_rss_agent_id, channel.huginn_post_agent_id)
+                if agent_id and agent_id not in shared_agent_ids
+            )
+
+        if agent_ids:
+            task = asyncio.create_task(delete_agents(service.huginn_client, agent_ids))
+            _teardown_tasks.add(task)
+            task.add_done_callback(_teardown_tasks.discard)
+
+        if packs:
+            # Каналы уже удалены, список фидов пака пересобирается без них
+            for channel in packs.values():
+                try:
+                    await service.rss_agent_packs.remove_channel(channel)
+                except Exception as e:
+                    logger.error(f"Failed to remove feeds from RSS agent pack: {e}")
+            try:
+                await service.rss_agent_packs.rebalance()
+            except Exception as e:
+                # Паки сольются при следующем удалении канала
+                logger.error(f"Failed to rebalance RSS agent packs: {e}")
+
+        return len(agent_ids)
+
+
+class NativeBackend:
+    """The in-process RssPoller polls the feeds, channels need no Huginn agents"""
+
+    uses_huginn_agents = False
+
+    async def start(self) -> None:
+        await rss_poller.start()
+
+    async def stop(self) -> None:
+        await rss_poller.stop()
+
+    async def provision(self, service: "ChannelService", channels: list[Channel]) -> None:
+        """Save new channels and poll them right away
+
+        Channels of other poller shards are picked up by their processes
+        on the next refresh.
+        """
+        await service.channel_repository.create_many(channels)
+        for channel in channels:
+            rss_poller.schedule(channel.channel_name)
+
+    async def teardown(self, service: "ChannelService", channels: list[Channel]) -> int:
+        # Другие процессы забудут канал при следующем обновлении списка
+        for channel in channels:
+            rss_poller.forget(channel.channel_name)
+        return 0
+
+
+huginn_backend = HuginnBackend()
+native_backend = NativeBackend()
+
+
+def get_monitoring_backend() -> MonitoringBackend:
+    """Backend selected by RSS_POLLING_BACKEND"""
+    if settings.RSS_POLLING_BACKEND == "native":
+        return native_backend
+    return huginn_backend
+
+
+async def delete_agents(huginn_client: AsyncHuginnClient, agent_ids: list[int]) -> None:
+    """Delete Huginn agents concurrently
+
+    Agents left after a failure are removed by the agent reconciler.
+    """
+    semaphore = asyncio.Semaphore(AGENT_TEARDOWN_CONCURRENCY)
+
+    async def delete_agent(agent_id: int) -> bool:
+        async with semaphore:
+            try:
+                await huginn_client.delete_agent(agent_id)
+                return True
+            except Exception as e:
+                logger.error(f"Failed to delete Huginn agent {agent_id}: {e}")
+                return False
+
+    deleted = sum(await asyncio.gather(*(delete_agent(agent_id) for agent_id in agent_ids)))
+    logger.info("Deleted Huginn agents", extra={"deleted_agents": deleted, "failed_agents": len(agent_ids) - deleted})
+
+
+async def verify_agents(
+    huginn_client: AsyncHuginnClient,
+    rss_agent_id: int,
+    post_agent_id: int
+) -> None:
+    """Check links and status of freshly provisioned agents
+
+    Each agent document is fetched once, links are derived from it.
+    """
+    try:
+        rss_agent, post_agent = await asyncio.gather(
+            huginn_client.get_agent_status(rss_agent_id),
+            huginn_client.get_agent_status(post_agent_id)
+        )
+    except Exception as e:
+        logger.error(f"Failed to verify Huginn agents {rss_agent_id}, {post_agent_id}: {e}")
+        return
+
+    logger.info(f"RSS Agent status: {rss_agent}")
+    logger.info(f"Post Agent status: {post_agent}")
+
+    # RSS agent should send events to Post agent
+    if post_agent_id not in agent_links(rss_agent)["receivers"]:
+        logger.warning(f"Post agent {post_agent_id} not found in RSS agent receivers!")
+
+    # Post agent should receive events from RSS
+    if rss_agent_id not in agent_links(post_agent)["sources"]:
+        logger.warning(f"RSS agent {rss_agent_id} not found in Post agent sources!")
@@ -0,0 +1,249 @@
+# app/services/outbox_worker.py
+
+import asyncio
+import logging
+from typing import Callable
+
+import httpx
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.db.session import AsyncSessionLocal
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.webhook_service import (
+    callback_circuit_breakers,
+    callback_host,
+    callback_limiter,
+)
+from app.utils.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+DEFERRED_ERROR = "Deferred after failed delivery of an earlier message"
+
+
+class OutboxWorkerPool:
+    """
+    Pool of async workers delivering callbacks stored in the outbox table.
+    Each worker claims a batch of due rows, sends them concurrently and
+    records the outcome, so deliveries survive restarts and scale with the
+    number of workers and app replicas.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.OUTBOX_WORKERS,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        http_client_factory: Callable[[], httpx.AsyncClient] = get_http_client
+    ):
+        self.workers = workers
+        self.session_factory = session_factory
+        self.http_client_factory = http_client_factory
+        self.limiter = callback_limiter
+        self.circuit_breakers = callback_circuit_breakers
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._run_worker(worker_id), name=f"outbox-worker-{worker_id}")
+            for worker_id in range(self.workers)
+        ]
+        if settings.OUTBOX_RETENTION_SECONDS > 0:
+            self._tasks.append(asyncio.create_task(self._run_cleanup(), name="outbox-cleanup"))
+        logger.info(f"Started {self.workers} outbox workers")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped outbox workers")
+
+    async def _run_worker(self, worker_id: int) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                logger.error(
+                    "Outbox worker failed to process batch",
+                    extra={"worker_id": worker_id, "error": str(e)},
+                    exc_info=True
+                )
+                processed = 0
+
+            # Пока есть работа, сразу берем следующую пачку
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_cleanup(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.error(f"Failed to clean up outbox: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.OUTBOX_CLEANUP_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def cleanup(self) -> int:
+        """Delete delivered and failed messages older than the retention period"""
+        deleted = 0
+        async with self.session_factory() as db:
+            repository = OutboxRepository(db)
+            # Удаляем пачками, чтобы не держать долгую транзакцию и блокировки
+            while True:
+                batch = await repository.delete_finished(
+                    older_than=settings.OUTBOX_RETENTION_SECONDS,
+                    limit=settings.OUTBOX_CLEANUP_BATCH_SIZE
+                )
+                deleted += batch
+                if batch < settings.OUTBOX_CLEANUP_BATCH_SIZE:
+                    break
+        if deleted:
+            logger.info(f"Deleted {deleted} finished outbox messages")
+        return deleted
+
+    async def _claim_batch(self) -> list[Row]:
+        async with self.session_factory() as db:
+            return await OutboxRepository(db).claim_batch(
+                limit=settings.OUTBOX_BATCH_SIZE,
+                lease_seconds=settings.OUTBOX_LEASE_SECONDS
+            )
+
+    async def process_batch(self) -> int:
+        """Claim and deliver one batch of due messages, returns the batch size"""
+        messages = await self._claim_batch()
+        if not messages:
+            return 0
+
+        # Сообщения одного подписчика отправляем по порядку, разных подписчиков параллельно
+        queues: dict[int, list[Row]] = {}
+        for message in messages:
+            queues.setdefault(message.subscription_id, []).append(message)
+        results = await asyncio.gather(*(self._deliver_in_order(queue) for queue in queues.values()))
+
+        errors_by_id = {}
+        for queue_errors in results:
+            errors_by_id.update(queue_errors)
+        await self._record_outcomes(messages, [errors_by_id[message.id] for message in messages])
+        return len(messages)
+
+    async def _deliver_in_order(self, messages: list[Row]) -> dict[int, str | CircuitOpenError | None]:
+        """
+        Deliver messages of one subscriber sequentially. After a failure the rest
+        are not sent, so a retried message is not overtaken by later posts.
+        """
+        errors = {}
+        failed = False
+        for message in messages:
+            if failed:
+                errors[message.id] = DEFERRED_ERROR
+                continue
+            errors[message.id] = await self._deliver(message)
+            failed = errors[message.id] is not None
+        return errors
+
+    async def _deliver(self, message: Row) -> str | CircuitOpenError | None:
+        """
+        Send one stored payload, returns error description on failure
+        or CircuitOpenError if the host was not called at all
+        """
+        breaker = self.circuit_breakers.get(callback_host(message.callback_url))
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            return e
+
+        try:
+            async with self.limiter.limit(message.callback_url):
+                response = await self.http_client_factory().post(
+                    url=message.callback_url,
+                    content=message.payload,
+                    headers={"Content-Type": "application/json"}
+                )
+        except Exception as e:
+            breaker.record_failure()
+            return f"{type(e).__name__}: {e}"
+
+        # 4xx означает, что хост жив: это ошибка подписчика, а не хоста
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if response.status_code >= 400:
+            return f"HTTP {response.status_code}"
+        return None
+
+    def _retry_delay(self, attempts: int) -> float | None:
+        if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            return None
+        return settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+
+    async def _record_outcomes(
+        self,
+        messages: list[Row],
+        errors: list[str | CircuitOpenError | None]
+    ) -> None:
+        async with self.session_factory() as db:
+            repository = OutboxRepository(db)
+            # Отложенные сообщения повторяем не раньше упавшего перед ними
+            blocked_retry_in: dict[int, float] = {}
+            for message, error in zip(messages, errors):
+                if error == DEFERRED_ERROR:
+                    await repository.defer(
+                        message.id,
+                        error,
+                        blocked_retry_in.get(message.subscription_id) or 0.0
+                    )
+                    continue
+
+                if isinstance(error, CircuitOpenError):
+                    # Хост не вызывался: попытка не тратится, повтор после cooldown.
+                    # Не раньше интервала опроса, иначе полуоткрытый хост крутит воркер вхолостую
+                    retry_in = max(error.retry_after, settings.OUTBOX_POLL_INTERVAL)
+                    blocked_retry_in[message.subscription_id] = retry_in
+                    await repository.defer(message.id, str(error), retry_in)
+                    continue
+
+                if error is None:
+                    await repository.mark_delivered(message.id)
+                    logger.info(
+                        "Successfully delivered outbox message",
+                        extra={
+                            "outbox_id": message.id,
+                            "subscription_id": message.subscription_id,
+                            "callback_url": message.callback_url,
+                            "post_guid": message.post_guid
+                        }
+                    )
+                    continue
+
+                retry_in = self._retry_delay(message.attempts)
+                blocked_retry_in[message.subscription_id] = retry_in
+                await repository.mark_failed(message.id, error, retry_in)
+                logger.error(
+                    "Failed to deliver outbox message",
+                    extra={
+                        "outbox_id": message.id,
+                        "subscription_id": message.subscription_id,
+                        "callback_url": message.callback_url,
+                        "post_guid": message.post_guid,
+                        "attempts": message.attempts,
+                        "retry_in": retry_in,
+                        "error": error
+                    }
+                )
+
+
+outbox_worker_pool = OutboxWorkerPool()
@@ -0,0 +1,143 @@
+# app/services/poll_scheduler.py
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.channel import Channel
+from app.repositories.channel_repository import ChannelRepository
+from app.services.huginn_client import AsyncHuginnClient, get_huginn_client
+
+logger = logging.getLogger(__name__)
+
+# Расписание RSS агента и минимальный средний интервал между постами для него (секунды)
+SCHEDULE_TIERS: tuple[tuple[str, float], ...] = (
+    ("every_1m", 0.0),
+    ("every_5m", 60 * 60.0),
+    ("every_30m", 12 * 60 * 60.0),
+    ("every_1h", 48 * 60 * 60.0),
+)
+DEFAULT_SCHEDULE = "every_1m"
+_SCHEDULES = [schedule for schedule, _ in SCHEDULE_TIERS]
+
+
+def _tier_of(schedule: str | None) -> int:
+    # Агенты создаются с DEFAULT_SCHEDULE, неизвестное расписание считаем им же
+    return _SCHEDULES.index(schedule) if schedule in _SCHEDULES else _SCHEDULES.index(DEFAULT_SCHEDULE)
+
+
+def observed_interval(channel: Channel, now: datetime) -> float | None:
+    """Mean interval between channel posts, a long silence counts as a longer interval"""
+    since = channel.last_post_at or channel.created_at
+    if since is None:
+        return channel.post_interval_ewma
+    silence = (now - since).total_seconds()
+    if channel.post_interval_ewma is None:
+        return silence
+    return max(channel.post_interval_ewma, silence)
+
+
+def schedule_tier(interval: float | None, current: int, hysteresis: float) -> int:
+    """
+    Tier for the observed interval. A channel moves to a slower tier only when
+    the interval clearly exceeds its threshold and back to a faster one only
+    when the interval clearly drops below the threshold of the current tier.
+    """
+    lowest = _SCHEDULES.index(settings.ADAPTIVE_POLLING_MIN_SCHEDULE)
+    highest = _SCHEDULES.index(settings.ADAPTIVE_POLLING_MAX_SCHEDULE)
+    if interval is None:
+        return min(max(current, lowest), highest)
+
+    target = max(i for i, (_, threshold) in enumerate(SCHEDULE_TIERS) if interval >= threshold)
+    if target > current:
+        while target > current and interval < SCHEDULE_TIERS[target][1] * (1 + hysteresis):
+            target -= 1
+    elif target < current and interval >= SCHEDULE_TIERS[current][1] * (1 - hysteresis):
+        target = current
+    return min(max(target, lowest), highest)
+
+
+class PollScheduler:
+    """
+    Periodic job moving RSS agents between schedule tiers. An agent polling
+    several channels gets the fastest tier any of them needs.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        huginn_client_factory: Callable[[], AsyncHuginnClient] = get_huginn_client
+    ):
+        self.session_factory = session_factory
+        self.huginn_client_factory = huginn_client_factory
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run(), name="poll-scheduler")
+        logger.info("Started adaptive polling scheduler")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        logger.info("Stopped adaptive polling scheduler")
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Failed to update polling schedules: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.ADAPTIVE_POLLING_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> dict[int, str]:
+        """Update schedules of RSS agents, returns new schedules by agent ID"""
+        now = datetime.now(timezone.utc)
+        huginn_client = self.huginn_client_factory()
+        changed = {}
+        async with self.session_factory() as db:
+            repository = ChannelRepository(db)
+            agents: dict[int, list[Channel]] = {}
+            for channel in await repository.get_polled():
+                agents.setdefault(channel.huginn_rss_agent_id, []).append(channel)
+
+            updates = []
+            for agent_id, channels in agents.items():
+                current = _tier_of(channels[0].poll_schedule)
+                target = min(
+                    schedule_tier(
+                        observed_interval(channel, now),
+                        current,
+                        settings.ADAPTIVE_POLLING_HYSTERESIS
+                    )
+                    for channel in channels
+                )
+                if target != current:
+                    updates.append((agent_id, _SCHEDULES[target]))
+
+            for agent_id, schedule in updates:
+                try:
+                    await huginn_client.update_agent_schedule(agent_id, schedule)
+                except Exception as e:
+                    logger.error(f"Failed to set schedule of agent {agent_id}: {e}")
+                    continue
+                await repository.set_poll_schedule(agent_id, schedule)
+                changed[agent_id] = schedule
+
+        if changed:
+            logger.info("Updated polling schedules", extra={"agents": len(changed)})
+        return changed
+
+
+poll_scheduler = PollScheduler()
@@ -0,0 +1,134 @@
+# app/services/routing_cache.py
+
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.repositories.channel_repository import ChannelRepository
+from app.repositories.subscription_repository import SubscriptionRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SubscriberRoute:
+    id: int
+    callback_url: str
+
+
+@dataclass(frozen=True)
+class ChannelRoute:
+    channel_id: int
+    channel_name: str
+    subscriptions: tuple[SubscriberRoute, ...]
+    loaded_at: float
+
+
+class RoutingCache:
+    """
+    In-memory map from channel name to its active subscribers.
+
+    Routes are replaced on every subscribe/unsubscribe in this process and
+    expire after `ttl` seconds, so changes made by other replicas are
+    picked up eventually.
+
+    Every invalidation bumps the cache generation and stamps the channel
+    with it. A route loaded from the database is stored only if the
+    generation read before the load is not older than the channel stamp,
+    so a load racing with an invalidation cannot bring the old subscribers
+    back. Stamps are forgotten `ttl` seconds after the invalidation; loads
+    started before a forgotten stamp are not cached at all.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._routes: dict[str, ChannelRoute] = {}
+        self._generation = 0
+        # Поколение и время последней инвалидации канала, в порядке инвалидаций
+        self._invalidated: dict[str, tuple[int, float]] = {}
+        # Старшее из забытых поколений: более ранние загрузки уже не кэшируем
+        self._forgotten_generation = 0
+
+    def get(self, channel_name: str) -> ChannelRoute | None:
+        route = self._routes.get(channel_name)
+        if route is None:
+            return None
+        if time.monotonic() - route.loaded_at > self.ttl:
+            self._routes.pop(channel_name, None)
+            return None
+        return route
+
+    def generation(self) -> int:
+        """Read before loading routes from the database and pass to put()"""
+        return self._generation
+
+    def _is_current(self, channel_name: str, generation: int) -> bool:
+        invalidated_generation, _ = self._invalidated.get(channel_name, (0, 0.0))
+        return generation >= max(invalidated_generation, self._forgotten_generation)
+
+    def put(
+        self,
+        channel_name: str,
+        channel_id: int,
+        subscriptions: list,
+        generation: int | None = None
+    ) -> ChannelRoute:
+        """Build a route and cache it unless the channel was invalidated since `generation`"""
+        route = ChannelRoute(
+            channel_id=channel_id,
+            channel_name=channel_name,
+            subscriptions=tuple(
+                SubscriberRoute(id=subscription.id, callback_url=subscription.callback_url)
+                for subscription in subscriptions
+            ),
+            loaded_at=time.monotonic()
+        )
+        # Маршрут устарел ещё до записи: отдаём его вызывающему, но не кэшируем
+        if generation is None or self._is_current(channel_name, generation):
+            self._routes[channel_name] = route
+        return route
+
+    def invalidate(self, channel_name: str) -> None:
+        now = time.monotonic()
+        self._routes.pop(channel_name, None)
+        self._generation += 1
+        # Переставляем канал в конец, чтобы словарь шел по времени инвалидации
+        self._invalidated.pop(channel_name, None)
+        self._invalidated[channel_name] = (self._generation, now)
+        self._forget_invalidations(now)
+
+    def _forget_invalidations(self, now: float) -> None:
+        # Через ttl все маршруты, загруженные до инвалидации, уже истекли бы сами
+        while self._invalidated:
+            channel_name, (generation, invalidated_at) = next(iter(self._invalidated.items()))
+            if now - invalidated_at <= self.ttl:
+                return
+            del self._invalidated[channel_name]
+            self._forgotten_generation = generation
+
+    def clear(self) -> None:
+        self._routes.clear()
+
+    async def warm(self, db: AsyncSession) -> int:
+        """Load routes of all channels with two queries, returns the number of channels"""
+        generation = self.generation()
+        subscriptions_by_channel: dict[int, list] = {}
+        for subscription in await SubscriptionRepository(db).get_all_active():
+            subscriptions_by_channel.setdefault(subscription.channel_id, []).append(subscription)
+
+        channels = await ChannelRepository(db).get_all()
+        for channel in channels:
+            self.put(
+                channel.channel_name,
+                channel.id,
+                subscriptions_by_channel.get(channel.id, []),
+                generation=generation
+            )
+        logger.info(f"Warmed routing cache with {len(channels)} channels")
+        return len(channels)
+
+
+routing_cache = RoutingCache(ttl=settings.ROUTING_CACHE_TTL)
@@ -0,0 +1,288 @@
+# app/services/rss_agent_packs.py
+import asyncio
+import logging
+import math
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.channel import Channel
+from app.models.rss_agent_pack import RssAgentPack
+from app.repositories.channel_repository import ChannelRepository
+from app.repositories.rss_agent_pack_repository import RssAgentPackRepository
+from app.services.huginn_client import AsyncHuginnClient
+from app.services.shared_post_agents import SharedPostAgents
+
+logger = logging.getLogger(__name__)
+
+# Состав паков меняется по одному: список фидов агента строится из БД
+# и при гонке в другом процессе исправится следующим изменением пака
+_pack_lock = asyncio.Lock()
+PACK_PAGE_SIZE = 500
+
+
+class RssAgentPacks:
+    """RSS agents polling feeds of up to HUGINN_RSS_FEEDS_PER_AGENT channels
+
+    New channels fill the fullest pack with free slots, so draining packs
+    can be merged into others and removed. Every RSS agent of a pack is linked
+    to a Post agent of the pack, or to a shared one when they are enabled.
+    A feed moved to another agent may produce already seen posts again,
+    they are dropped by post deduplication.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        huginn_client: AsyncHuginnClient,
+        shared_post_agents: SharedPostAgents
+    ):
+        self.repository = RssAgentPackRepository(db)
+        self.channel_repository = ChannelRepository(db)
+        self.huginn_client = huginn_client
+        self.shared_post_agents = shared_post_agents
+
+    @property
+    def capacity(self) -> int:
+        return settings.HUGINN_RSS_FEEDS_PER_AGENT
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 1
+
+    async def is_pack(self, rss_agent_id: int) -> bool:
+        return await self.repository.get_by_rss_agent_id(rss_agent_id) is not None
+
+    async def add_channels(self, channel_names: list[str]) -> dict[str, tuple[int, int]]:
+        """Put channels into packs, returns (rss_agent_id, post_agent_id) by channel name
+
+        Channels must already exist in the database. On failure the packs
+        are left as they were: new packs are deleted, feeds of existing ones restored.
+        """
+        async with _pack_lock:
+            packs, sizes = await self._load_packs()
+            remaining = list(channel_names)
+
+            # Сначала заполняем самые полные паки, чтобы пустеющие можно было слить
+            assignments: list[tuple[RssAgentPack, list[str]]] = []
+            for pack in sorted(packs, key=lambda p: sizes[p.id], reverse=True):
+                free = self.capacity - sizes[pack.id]
+                if free > 0 and remaining:
+                    assignments.append((pack, remaining[:free]))
+                    remaining = remaining[free:]
+
+            # Новые паки создаём первыми: это самый ненадёжный шаг
+            chunks = [remaining[i:i + self.capacity] for i in range(0, len(remaining), self.capacity)]
+            new_packs = await self._create_packs(chunks)
+            groups = [
+                (names, pack.huginn_rss_agent_id, pack.huginn_post_agent_id)
+                for pack, names in assignments + list(zip(new_packs, chunks))
+            ]
+
+            # Прежние фиды паков, которые успели (или могли успеть) обновить
+            previous_feeds: dict[int, list[str]] = {}
+            try:
+                for pack, names in assignments:
+                    members = await self.channel_repository.get_names_by_rss_agent_id(pack.huginn_rss_agent_id)
+                    previous_feeds[pack.huginn_rss_agent_id] = members
+                    await self.huginn_client.update_rss_agent_feeds(pack.huginn_rss_agent_id, members + names)
+
+                # Каналы переводятся на паки одной транзакцией, после отказа их агенты не меняются
+                await self.channel_repository.set_agent_ids_by_group(groups)
+            except Exception:
+                await self._revert_packs(
+                    [rss_agent_id for _, rss_agent_id, _ in groups[len(assignments):]],
+                    previous_feeds
+                )
+                raise
+
+            return {
+                name: (rss_agent_id, post_agent_id)
+                for names, rss_agent_id, post_agent_id in groups
+                for name in names
+            }
+
+    async def remove_channel(self, channel: Channel) -> None:
+        """Remove channel feed from its pack, an empty pack is deleted"""
+        async with _pack_lock:
+            pack = await self.repository.get_by_rss_agent_id(channel.huginn_rss_agent_id)
+            if not pack:
+                return
+            members = [
+                name for name in await self.channel_repository.get_names_by_rss_agent_id(
+                    pack.huginn_rss_agent_id
+                )
+                if name != channel.channel_name
+            ]
+            if members:
+                await self.huginn_client.update_rss_agent_feeds(pack.huginn_rss_agent_id, members)
+            else:
+                await self._delete_pack(pack)
+
+    async def rebalance(self) -> int:
+        """Merge draining packs into others while fewer packs can hold all feeds
+
+        Returns the number of removed packs.
+        """
+        removed = 0
+        async with _pack_lock:
+            while True:
+                packs, sizes = await self._load_packs()
+                if len(packs) <= math.ceil(sum(sizes.values()) / self.capacity):
+                    return removed
+
+                # Свободных мест в остальных паках всегда хватает на самый маленький
+                source = min(packs, key=lambda p: sizes[p.id])
+                members = await self.channel_repository.get_names_by_rss_agent_id(
+                    source.huginn_rss_agent_id
+                )
+                targets = sorted(
+                    (p for p in packs if p.id != source.id),
+                    key=lambda p: sizes[p.id],
+                    reverse=True
+                )
+                for target in targets:
+                    free = self.capacity - sizes[target.id]
+                    if free <= 0 or not members:
+                        continue
+                    moved, members = members[:free], members[free:]
+                    target_members = await self.channel_repository.get_names_by_rss_agent_id(
+                        target.huginn_rss_agent_id
+                    )
+                    await self.huginn_client.update_rss_agent_feeds(
+                        target.huginn_rss_agent_id, target_members + moved
+                    )
+                    await self.channel_repository.set_agent_ids(
+                        moved, target.huginn_rss_agent_id, target.huginn_post_agent_id
+                    )
+
+                await self._delete_pack(source)
+                removed += 1
+                logger.info(f"Merged RSS agent pack {source.huginn_rss_agent_id} into other packs")
+
+    async def pack_dedicated_channels(self) -> dict:
+        """Move channels with their own RSS agents into packs and delete those agents"""
+        summary = {"packed_channels": 0, "deleted_agents": 0}
+        after_id = None
+        while True:
+            # Каналы переносятся страницами, перенесенные выпадают из выборки
+            channels = await self.channel_repository.list_page(
+                PACK_PAGE_SIZE, after_id=after_id, has_dedicated_rss_agent=True
+            )
+            if not channels:
+                break
+            after_id = channels[-1]["id"]
+
+            await self.add_channels([channel["channel_name"] for channel in channels])
+            summary["packed_channels"] += len(channels)
+
+            for channel in channels:
+                post_agent_id = channel["huginn_post_agent_id"]
+                agent_ids = [channel["huginn_rss_agent_id"]]
+                if post_agent_id and not await self.shared_post_agents.is_shared(post_agent_id):
+                    agent_ids.append(post_agent_id)
+                for agent_id in agent_ids:
+                    try:
+                        await self.huginn_client.delete_agent(agent_id)
+                        summary["deleted_agents"] += 1
+                    except Exception as e:
+                        logger.error(f"Failed to delete Huginn agent {agent_id}: {e}")
+
+        logger.info("Moved dedicated RSS agents into packs", extra=summary)
+        return summary
+
+    async def _load_packs(self) -> tuple[list[RssAgentPack], dict[int, int]]:
+        packs = await self.repository.get_all()
+        counts = await self.channel_repository.count_by_rss_agent_ids(
+            [pack.huginn_rss_agent_id for pack in packs]
+        )
+        return packs, {pack.id: counts.get(pack.huginn_rss_agent_id, 0) for pack in packs}
+
+    async def _create_packs(self, chunks: list[list[str]]) -> list[RssAgentPack]:
+        """Create a pack for every chunk of channel names"""
+        shared = self.shared_post_agents.enabled
+        pack_keys = [f"pack-{uuid.uuid4().hex[:8]}" for _ in chunks]
+        # Общие Post агенты берутся из БД, сессию нельзя использовать параллельно
+        shared_post_agent_ids = [
+            await self.shared_post_agents.get_agent_id(pack_key) if shared else None
+            for pack_key in pack_keys
+        ]
+
+        # Агенты Huginn разных паков создаём параллельно
+        results = await asyncio.gather(
+            *(
+                self._create_pack_agents(pack_key, names, post_agent_id)
+                for pack_key, names, post_agent_id in zip(pack_keys, chunks, shared_post_agent_ids)
+            ),
+            return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if failures:
+            for result in results:
+                if not isinstance(result, BaseException):
+                    await self._delete_agent_quietly(result[0])
+                    if not shared:
+                        await self._delete_agent_quietly(result[1])
+            raise failures[0]
+
+        packs = []
+        for rss_agent_id, post_agent_id in results:
+            packs.append(await self.repository.create(RssAgentPack(
+                huginn_rss_agent_id=rss_agent_id,
+                huginn_post_agent_id=post_agent_id
+            )))
+        return packs
+
+    async def _create_pack_agents(
+        self,
+        pack_key: str,
+        channel_names: list[str],
+        post_agent_id: int | None
+    ) -> tuple[int, int]:
+        """Create, link and start agents of a pack, post_agent_id is a shared Post agent"""
+        owned = []
+        try:
+            if post_agent_id is None:
+                post_agent_id = await self.huginn_client.create_post_agent(pack_key)
+                owned.append(post_agent_id)
+            rss_agent_id = await self.huginn_client.create_rss_agent(pack_key, channel_names)
+            owned.append(rss_agent_id)
+            await self.huginn_client.link_agents(rss_agent_id, post_agent_id)
+            await self.huginn_client.start_agent(rss_agent_id)
+        except Exception:
+            for agent_id in owned:
+                await self._delete_agent_quietly(agent_id)
+            raise
+
+        logger.info(f"Created RSS agent pack {rss_agent_id} with {len(channel_names)} feeds")
+        return rss_agent_id, post_agent_id
+
+    async def _revert_packs(self, new_rss_agent_ids: list[int], previous_feeds: dict[int, list[str]]) -> None:
+        """Undo a failed add_channels: delete packs it created and restore feeds of updated ones"""
+        await self.channel_repository.db.rollback()
+        for rss_agent_id, members in previous_feeds.items():
+            try:
+                await self.huginn_client.update_rss_agent_feeds(rss_agent_id, members)
+            except Exception as e:
+                logger.error(f"Failed to restore feeds of RSS agent pack {rss_agent_id}: {e}")
+        for rss_agent_id in new_rss_agent_ids:
+            try:
+                # После rollback объекты паков истекли, перечитываем их
+                pack = await self.repository.get_by_rss_agent_id(rss_agent_id)
+                if pack:
+                    await self._delete_pack(pack)
+            except Exception as e:
+                logger.error(f"Failed to delete RSS agent pack {rss_agent_id}: {e}")
+
+    async def _delete_pack(self, pack: RssAgentPack) -> None:
+        await self.huginn_client.delete_agent(pack.huginn_rss_agent_id)
+        if not await self.shared_post_agents.is_shared(pack.huginn_post_agent_id):
+            await self.huginn_client.delete_agent(pack.huginn_post_agent_id)
+        await self.repository.delete(pack)
+
+    async def _delete_agent_quietly(self, agent_id: int) -> None:
+        try:
+            await self.huginn_client.delete_agent(agent_id)
+        except Exception as e:
+            logger.error(f"Failed to delete Huginn agent {agent_id}: {e}")
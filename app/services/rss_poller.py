@@ -0,0 +1,238 @@
+# app/services/rss_poller.py
+import asyncio
+import heapq
+import logging
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from xml.etree import ElementTree as ET
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.db.session import AsyncSessionLocal
+from app.repositories.channel_repository import ChannelRepository
+from app.schemas.post import PostWebhook
+from app.services.huginn_client import rss_feed_url
+from app.services.webhook_service import WebhookService
+
+logger = logging.getLogger(__name__)
+
+# Задержка опроса после ошибок растёт до interval * 2 ** MAX_BACKOFF_EXPONENT
+MAX_BACKOFF_EXPONENT = 5
+
+
+def poller_shard(channel_name: str, shards: int) -> int:
+    # crc32 одинаков во всех процессах, в отличие от hash()
+    return zlib.crc32(channel_name.encode()) % shards
+
+
+def parse_feed_items(content: bytes) -> list[PostWebhook]:
+    """Items of an RSSHub feed as events in the format of the Huginn RSS agent"""
+    posts = []
+    for item in ET.fromstring(content).iterfind("channel/item"):
+        link = item.findtext("link", "")
+        try:
+            published_at = parsedate_to_datetime(item.findtext("pubDate"))
+        except (TypeError, ValueError):
+            published_at = datetime.now(timezone.utc)
+        date_published = published_at.isoformat()
+        # RSSHub кладёт HTML поста в description, как и Huginn в content
+        description = item.findtext("description", "")
+        posts.append(PostWebhook(
+            id=item.findtext("guid") or link,
+            url=link,
+            title=item.findtext("title", ""),
+            description=description,
+            content=description,
+            date_published=date_published,
+            last_updated=date_published
+        ))
+    return posts
+
+
+@dataclass
+class FeedState:
+    """Conditional GET validators and guids of the last response of a channel feed
+
+    Validators are also saved on the channel and survive a restart, guids are
+    kept only in memory: after a restart already processed posts of a changed
+    feed are dropped by post deduplication.
+    """
+    due: float = 0.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    seen_guids: set[str] = field(default_factory=set)
+    failures: int = 0
+
+
+class RssPoller:
+    """
+    In-process RSSHub poller, an alternative to Huginn agents.
+
+    Every monitored channel has a due time in a priority queue. Due feeds are
+    fetched with conditional GETs under a concurrency limit, items not seen in
+    the previous response go straight to WebhookService.process_batch. The set
+    of channels is reloaded from the database every NATIVE_POLLER_REFRESH_INTERVAL.
+    A process polls only the channels of its NATIVE_POLLER_SHARD, so several
+    replicas do not fetch the same feeds.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        http_client_factory: Callable[[], httpx.AsyncClient] = get_http_client
+    ):
+        self.session_factory = session_factory
+        self.http_client_factory = http_client_factory
+        self._feeds: dict[str, FeedState] = {}
+        self._queue: list[tuple[float, str]] = []
+        self._polls: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run(), name="rss-poller")
+        logger.info("Started native RSS poller")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        tasks = [task for task in (self._task, *self._polls) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._polls.clear()
+        logger.info("Stopped native RSS poller")
+
+    @staticmethod
+    def owns(channel_name: str) -> bool:
+        """Whether the channel is polled by this process"""
+        return poller_shard(channel_name, settings.NATIVE_POLLER_SHARDS) == settings.NATIVE_POLLER_SHARD
+
+    def schedule(self, channel_name: str, state: Optional[FeedState] = None) -> None:
+        """Poll a channel as soon as possible, e.g. right after it is created
+
+        Channels of other shards are left to their processes.
+        """
+        if not self.owns(channel_name):
+            return
+        state = self._feeds.setdefault(channel_name, state or FeedState())
+        self._push(channel_name, state, asyncio.get_running_loop().time())
+        self._wakeup.set()
+
+    def forget(self, channel_name: str) -> None:
+        """Stop polling a deleted channel"""
+        # Запись очереди отбросится при извлечении: состояния канала больше нет
+        self._feeds.pop(channel_name, None)
+
+    def _push(self, channel_name: str, state: FeedState, due: float) -> None:
+        # Старые записи очереди не удаляем, они отбрасываются по несовпадению due
+        state.due = due
+        heapq.heappush(self._queue, (due, channel_name))
+
+    async def refresh_channels(self) -> None:
+        """Start polling new monitored channels and forget removed ones"""
+        async with self.session_factory() as db:
+            feeds = {
+                feed.channel_name: feed
+                for feed in await ChannelRepository(db).get_monitored_feeds()
+                if self.owns(feed.channel_name)
+            }
+        for channel_name in feeds.keys() - self._feeds.keys():
+            feed = feeds[channel_name]
+            self.schedule(channel_name, FeedState(etag=feed.feed_etag, last_modified=feed.feed_last_modified))
+        for channel_name in self._feeds.keys() - feeds.keys():
+            del self._feeds[channel_name]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(settings.NATIVE_POLLER_CONCURRENCY)
+        refresh_at = 0.0
+        while not self._stopping.is_set():
+            if loop.time() >= refresh_at:
+                try:
+                    await self.refresh_channels()
+                except Exception as e:
+                    logger.error(f"Failed to load monitored channels: {e}", exc_info=True)
+                refresh_at = loop.time() + settings.NATIVE_POLLER_REFRESH_INTERVAL
+
+            while self._queue and self._queue[0][0] <= loop.time():
+                due, channel_name = heapq.heappop(self._queue)
+                state = self._feeds.get(channel_name)
+                if state is None or state.due != due:
+                    continue
+                # Ждём свободный слот: не больше NATIVE_POLLER_CONCURRENCY запросов сразу
+                await semaphore.acquire()
+                task = asyncio.create_task(self._poll(channel_name, state))
+                self._polls.add(task)
+                task.add_done_callback(self._polls.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+
+            next_at = min(refresh_at, self._queue[0][0]) if self._queue else refresh_at
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(next_at - loop.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, channel_name: str, state: FeedState) -> None:
+        try:
+            await self.poll_channel(channel_name, state)
+            state.failures = 0
+        except Exception as e:
+            state.failures += 1
+            logger.error(
+                "Failed to poll channel feed",
+                extra={"channel_name": channel_name, "failures": state.failures, "error": str(e)}
+            )
+        delay = settings.NATIVE_POLLER_INTERVAL * 2 ** min(state.failures, MAX_BACKOFF_EXPONENT)
+        if self._feeds.get(channel_name) is state:
+            self._push(channel_name, state, asyncio.get_running_loop().time() + delay)
+            self._wakeup.set()
+
+    async def poll_channel(self, channel_name: str, state: FeedState) -> int:
+        """Fetch a channel feed and process its new items, returns the number of new items"""
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        http_client = self.http_client_factory()
+        response = await http_client.get(rss_feed_url(channel_name), headers=headers)
+        if response.status_code == 304:
+            return 0
+        response.raise_for_status()
+
+        posts = parse_feed_items(response.content)
+        new_posts = [post for post in posts if post.guid not in state.seen_guids]
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        validators_changed = (etag, last_modified) != (state.etag, state.last_modified)
+        if new_posts or validators_changed:
+            async with self.session_factory() as db:
+                if new_posts:
+                    async with WebhookService(db, http_client=http_client) as webhook_service:
+                        for i in range(0, len(new_posts), settings.WEBHOOK_BATCH_MAX_SIZE):
+                            await webhook_service.process_batch(
+                                new_posts[i:i + settings.WEBHOOK_BATCH_MAX_SIZE]
+                            )
+                # Валидаторы и guid сохраняем только после успешной обработки,
+                # иначе следующий опрос получит те же посты ещё раз
+                if validators_changed:
+                    await ChannelRepository(db).set_feed_validators(channel_name, etag, last_modified)
+
+        state.etag = etag
+        state.last_modified = last_modified
+        state.seen_guids = {post.guid for post in posts}
+        return len(new_posts)
+
+
+rss_poller = RssPoller()
@@ -0,0 +1,116 @@
+# app/services/shared_post_agents.py
+import asyncio
+import logging
+import zlib
+
+from sqlalchemy import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.repositories.channel_repository import ChannelRepository
+from app.repositories.shared_post_agent_repository import SharedPostAgentRepository
+from app.services.huginn_client import AsyncHuginnClient
+
+logger = logging.getLogger(__name__)
+
+# Не создаём в одном процессе два агента для одного шарда
+_create_lock = asyncio.Lock()
+RELINK_PAGE_SIZE = 500
+
+
+def post_agent_shard(channel_name: str, shards: int) -> int:
+    # crc32 одинаков во всех процессах, в отличие от hash()
+    return zlib.crc32(channel_name.encode()) % shards
+
+
+class SharedPostAgents:
+    """Post agents shared by channels instead of one Post agent per channel
+
+    Every shared agent posts to the same /webhook/rss with the same payload
+    template, the channel is taken from the post link. Channels are spread
+    over HUGINN_SHARED_POST_AGENTS agents by channel name.
+    """
+
+    def __init__(self, db: AsyncSession, huginn_client: AsyncHuginnClient):
+        self.repository = SharedPostAgentRepository(db)
+        self.channel_repository = ChannelRepository(db)
+        self.huginn_client = huginn_client
+
+    @property
+    def enabled(self) -> bool:
+        return settings.HUGINN_SHARED_POST_AGENTS > 0
+
+    def shard(self, channel_name: str) -> int:
+        return post_agent_shard(channel_name, settings.HUGINN_SHARED_POST_AGENTS)
+
+    async def get_agent_id(self, channel_name: str) -> int:
+        """Shared Post agent of a channel, created on first use"""
+        shard = self.shard(channel_name)
+        agent_id = await self.repository.get_agent_id(shard)
+        if agent_id is not None:
+            return agent_id
+
+        async with _create_lock:
+            agent_id = await self.repository.get_agent_id(shard)
+            if agent_id is None:
+                logger.info(f"Creating shared Post agent for shard {shard}")
+                created_id = await self.huginn_client.create_shared_post_agent(shard)
+                await self.repository.save({shard: created_id})
+                # Другой процесс мог сохранить шард раньше нас: блокировка только локальная
+                agent_id = await self.repository.get_agent_id(shard)
+                if agent_id != created_id:
+                    logger.info(f"Shared Post agent of shard {shard} was created concurrently, deleting ours")
+                    try:
+                        await self.huginn_client.delete_agent(created_id)
+                    except Exception as e:
+                        # Лишний агент без связей ничего не публикует, его уберет сверка агентов
+                        logger.error(f"Failed to delete duplicate shared Post agent {created_id}: {e}")
+        return agent_id
+
+    async def is_shared(self, agent_id: int) -> bool:
+        return agent_id in await self.repository.get_agent_ids()
+
+    async def relink_channels(self) -> dict:
+        """Move existing channels to shared Post agents
+
+        Each channel is relinked and saved before its own Post agent is deleted,
+        so an interrupted run can simply be started again.
+        """
+        summary = {"relinked_channels": 0, "deleted_post_agents": 0, "failed_channels": 0}
+        after_id = None
+        while True:
+            # Каналы паков делят RSS агента, его Post агентом управляет пак.
+            # Страницы по id читаются значениями, после rollback ничего не истекает
+            channels = await self.channel_repository.list_page(
+                RELINK_PAGE_SIZE, after_id=after_id, has_dedicated_rss_agent=True
+            )
+            if not channels:
+                break
+            after_id = channels[-1]["id"]
+            for channel in channels:
+                await self._relink_channel(channel, summary)
+
+        logger.info("Relinked channels to shared Post agents", extra=summary)
+        return summary
+
+    async def _relink_channel(self, channel: RowMapping, summary: dict) -> None:
+        channel_name = channel["channel_name"]
+        old_agent_id = channel["huginn_post_agent_id"]
+        try:
+            agent_id = await self.get_agent_id(channel_name)
+            if old_agent_id == agent_id:
+                return
+
+            # PUT receiver_ids заменяет связи RSS агента целиком
+            await self.huginn_client.link_agents(channel["huginn_rss_agent_id"], agent_id)
+            await self.channel_repository.set_post_agent_id(channel["id"], agent_id)
+            summary["relinked_channels"] += 1
+
+            # Общий агент другого шарда (после смены числа шардов) не удаляем
+            if old_agent_id and not await self.is_shared(old_agent_id):
+                await self.huginn_client.delete_agent(old_agent_id)
+                summary["deleted_post_agents"] += 1
+        except Exception as e:
+            logger.error(f"Failed to relink channel {channel_name}: {e}")
+            await self.channel_repository.db.rollback()
+            summary["failed_channels"] += 1
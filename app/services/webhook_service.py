@@ -1,34 +1,84 @@
 # app/services/webhook_service.py
 
+import asyncio
 import logging
 import time
-from datetime import datetime
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
 from typing import Optional
 from urllib.parse import urlparse
 
 import httpx
-from bs4 import BeautifulSoup
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.exceptions.http_exceptions import ChannelNotFound
+from app.core.config import settings
+from app.core.process_pool import html_parse_pool
+from app.core.exceptions.http_exceptions import (
+    CallbackRequestFailed,
+    CallbackServerError,
+    ChannelNotFound,
+)
+from app.models.outbox import OutboxMessage
 from app.repositories.channel_repository import ChannelRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.post_repository import PostRepository
 from app.repositories.subscription_repository import SubscriptionRepository
 from app.schemas.post import ParsedPost, PostWebhook
+from app.services.routing_cache import ChannelRoute, routing_cache
+from app.utils.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from app.utils.concurrency import HostConcurrencyLimiter
+from app.utils.html_extractor import extract_post_content
+from app.utils.recent_keys import RecentKeys
 from app.utils.retry import async_retry
+from app.utils.serialization import json_dumps
 
 logger = logging.getLogger(__name__)
 
+# Общий для процесса лимитер: ограничивает рассылку по всем запросам сразу
+callback_limiter = HostConcurrencyLimiter(
+    max_concurrency=settings.CALLBACK_MAX_CONCURRENCY,
+    max_per_host=settings.CALLBACK_MAX_CONCURRENCY_PER_HOST
+)
+
+# Circuit breaker на каждый хост callback: не тратим ретраи на лежащие хосты
+callback_circuit_breakers = CircuitBreakerRegistry(
+    failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+    minimum_calls=settings.CIRCUIT_BREAKER_MINIMUM_CALLS,
+    window_size=settings.CIRCUIT_BREAKER_WINDOW_SIZE,
+    cooldown=settings.CIRCUIT_BREAKER_COOLDOWN
+)
+
+# Недавно принятые (channel_id, guid): повторы от Huginn отсекаются без запроса к БД
+recent_post_guids = RecentKeys(maxsize=settings.RECENT_POST_GUIDS_CACHE_SIZE)
+
+
+def callback_host(url: str) -> str:
+    return urlparse(url).netloc
+
+
 class WebhookService:
-    def __init__(self, db):
+    def __init__(self, db: AsyncSession, http_client: Optional[httpx.AsyncClient] = None):
+        self.db = db
         self.repository = ChannelRepository(db)
         self.subscription_repository = SubscriptionRepository(db)
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.outbox_repository = OutboxRepository(db)
+        self.post_repository = PostRepository(db)
+        self.recent_post_guids = recent_post_guids
+        self.routing_cache = routing_cache
+        self.use_outbox = settings.OUTBOX_ENABLED
+        # Общий клиент из пула не закрываем, закрываем только собственный
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(timeout=30.0)
+        self.limiter = callback_limiter
+        self.parse_pool = html_parse_pool
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.http_client.aclose()
+        if self._owns_http_client:
+            await self.http_client.aclose()
 
     def _extract_channel_name(self, url: str) -> str:
         """Extract channel name from Telegram post URL"""
@@ -38,35 +88,154 @@ class WebhookService:
 
     def _parse_html_content(self, html: str) -> tuple[str, list[str], list[str], list[str]]:
         """Parse HTML content to extract text, links, images and videos"""
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Extract text (remove all scripts and styles first)
-        for script in soup(["script", "style"]):
-            script.decompose()
-        text = soup.get_text(separator=' ').strip()
-        
-        # Extract links (excluding media links)
-        links = []
-        for a in soup.find_all('a', href=True):
-            href = a.get('href')
-            if not any(ext in href.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.mp4']):
-                links.append(href)
-        
-        # Extract images
-        images = []
-        for img in soup.find_all('img', src=True):
-            src = img.get('src')
-            if src and any(ext in src.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif']):
-                images.append(src)
-        
-        # Extract videos
-        videos = []
-        for video in soup.find_all('video', src=True):
-            src = video.get('src')
-            if src and '.mp4' in src.lower():
-                videos.append(src)
-        
-        return text, links, images, videos
+        # Однопроходный парсер без построения дерева, результат как у BeautifulSoup
+        return extract_post_content(html)
+
+    async def _parse_post_content(self, html: str) -> tuple[str, list[str], list[str], list[str]]:
+        """Parse small posts inline, large ones in the process pool off the event loop"""
+        if not self.parse_pool.enabled or len(html) < settings.HTML_PARSE_OFFLOAD_THRESHOLD:
+            return self._parse_html_content(html)
+
+        try:
+            return await self.parse_pool.run(extract_post_content, html)
+        except BrokenProcessPool as e:
+            logger.error(
+                "HTML parse pool is broken, parsing inline",
+                extra={"content_length": len(html), "error": str(e)}
+            )
+            return self._parse_html_content(html)
+
+    async def _get_route(self, channel_name: str) -> ChannelRoute:
+        """Channel id and active subscribers, from the routing cache when possible"""
+        route = self.routing_cache.get(channel_name)
+        if route is not None:
+            return route
+
+        generation = self.routing_cache.generation()
+        channel = await self.repository.get_by_channel_name(channel_name)
+        if not channel:
+            logger.error(
+                "Channel not found",
+                extra={"channel_name": channel_name}
+            )
+            raise HTTPException(status_code=404, detail="Channel not found")
+
+        # Get all active subscriptions
+        active_subs = await self.subscription_repository.get_active_by_channel_id(channel.id)
+        return self.routing_cache.put(channel_name, channel.id, active_subs, generation=generation)
+
+    async def _get_routes(self, channel_names: list[str]) -> dict[str, ChannelRoute]:
+        """Routes of several channels, channels missing in the cache are loaded with one query"""
+        routes = {}
+        missing = []
+        for channel_name in channel_names:
+            route = self.routing_cache.get(channel_name)
+            if route is not None:
+                routes[channel_name] = route
+            else:
+                missing.append(channel_name)
+        if not missing:
+            return routes
+
+        generation = self.routing_cache.generation()
+        channels = {}
+        subscriptions_by_channel: dict[str, list] = {}
+        for channel, subscription in await self.repository.get_with_active_subscriptions(missing):
+            channels[channel.channel_name] = channel
+            channel_subs = subscriptions_by_channel.setdefault(channel.channel_name, [])
+            if subscription is not None:
+                channel_subs.append(subscription)
+
+        for channel_name, channel in channels.items():
+            routes[channel_name] = self.routing_cache.put(
+                channel_name,
+                channel.id,
+                subscriptions_by_channel[channel_name],
+                generation=generation
+            )
+        return routes
+
+    async def _claim_posts(self, channel_id: int, posts: list[PostWebhook]) -> list[PostWebhook]:
+        """
+        Record guids of several posts of a channel in the current transaction,
+        returns posts that were not ingested before
+        """
+        candidates = {}
+        for post in posts:
+            if (channel_id, post.guid) not in self.recent_post_guids:
+                candidates.setdefault(post.guid, post)
+        if not candidates:
+            return []
+
+        inserted = await self.post_repository.insert_many_if_absent(
+            channel_id,
+            [
+                {"guid": post.guid, "title": post.title, "link": post.url}
+                for post in candidates.values()
+            ]
+        )
+        # Дубликаты уже зафиксированы в БД, новые guid попадут в кэш после коммита
+        for guid in candidates.keys() - inserted:
+            self.recent_post_guids.add((channel_id, guid))
+        return [post for guid, post in candidates.items() if guid in inserted]
+
+    async def _claim_post(self, channel_id: int, post: PostWebhook) -> bool:
+        """Record the post guid in the current transaction, returns False if the post was already ingested"""
+        key = (channel_id, post.guid)
+        if key in self.recent_post_guids:
+            return False
+
+        is_new = await self.post_repository.insert_if_absent(
+            channel_id=channel_id,
+            guid=post.guid,
+            title=post.title,
+            link=post.url
+        )
+        if not is_new:
+            self.recent_post_guids.add(key)
+        return is_new
+
+    async def _commit_claims(self, keys: list[tuple[int, str]]) -> None:
+        """Commit claimed guids together with their outbox deliveries"""
+        await self.db.commit()
+        for key in keys:
+            self.recent_post_guids.add(key)
+
+    async def _release_claims(self) -> None:
+        # Откат снимает незафиксированные guid, повтор от Huginn будет обработан
+        try:
+            await self.db.rollback()
+        except Exception as e:
+            logger.error(f"Failed to roll back post ingestion: {e}")
+
+    async def _record_activity(self, channel_id: int, posts: list[PostWebhook]) -> None:
+        """
+        Feed new posts into the channel posting rate used by adaptive polling.
+        The update is committed together with the post guids.
+        """
+        if not settings.ADAPTIVE_POLLING_ENABLED or not posts:
+            return
+        try:
+            # Точка сохранения: ошибка статистики не откатывает guid и доставки
+            async with self.db.begin_nested():
+                for posted_at in sorted(self._posted_at(post) for post in posts):
+                    await self.repository.record_post(
+                        channel_id, posted_at, settings.POST_INTERVAL_EWMA_ALPHA
+                    )
+        except Exception as e:
+            # Статистика опроса не должна мешать доставке поста
+            logger.error(f"Failed to record channel activity: {e}")
+
+    @staticmethod
+    def _posted_at(post: PostWebhook) -> datetime:
+        # Время публикации, а не прихода: догрузка пачкой не должна выглядеть как всплеск
+        try:
+            posted_at = datetime.fromisoformat(post.date_published.replace('Z', '+00:00'))
+        except ValueError:
+            return datetime.now(timezone.utc)
+        if posted_at.tzinfo is None:
+            posted_at = posted_at.replace(tzinfo=timezone.utc)
+        return posted_at
 
     def _parse_rfc822_date(self, date_str: str) -> datetime:
         """Convert ISO format date string to datetime"""
@@ -77,22 +246,48 @@ class WebhookService:
             logger.error(f"Error parsing date {date_str}: {e}")
             return datetime.utcnow()
 
-    @async_retry(retries=3, delay=1.0, backoff=2.0, exceptions=(httpx.HTTPError,))
-    async def _send_to_callback(self, callback_url: str, post: dict) -> None:
-        """Send parsed post to callback URL"""
+    def _build_post_data(self, post: ParsedPost) -> dict:
+        """Build callback payload from parsed post"""
+        # Конвертируем Pydantic модель в dict и преобразуем HttpUrl в строки
+        return {
+            "title": post.title,
+            "link": str(post.link),
+            "guid": post.guid,
+            "published_at": post.published_at.isoformat(),
+            "text": post.text,
+            "links": [str(link) for link in post.links],
+            "images": [str(image) for image in post.images],
+            "videos": [str(video) for video in post.videos],
+            "raw_content": post.raw_content
+        }
+
+    def _serialize_post(self, post: ParsedPost) -> bytes:
+        """Encode callback payload to JSON bytes"""
+        return json_dumps(self._build_post_data(post))
+
+    @async_retry(
+        retries=3,
+        delay=1.0,
+        backoff=2.0,
+        exceptions=(httpx.HTTPError,),
+        circuit_breakers=callback_circuit_breakers,
+        circuit_key=lambda self, callback_url, *args, **kwargs: callback_host(callback_url),
+        circuit_failures=(httpx.HTTPError, CallbackServerError)
+    )
+    async def _send_to_callback(
+        self,
+        callback_url: str,
+        post: ParsedPost,
+        payload: Optional[bytes] = None
+    ) -> None:
+        """
+        Send parsed post to callback URL.
+        `payload` is the post already encoded by `_serialize_post`, it is shared
+        between all subscribers of the post.
+        """
         try:
-            # Конвертируем Pydantic модель в dict и преобразуем HttpUrl в строки
-            post_data = {
-                "title": post.title,
-                "link": str(post.link),
-                "guid": post.guid,
-                "published_at": post.published_at.isoformat(),
-                "text": post.text,
-                "links": [str(link) for link in post.links],
-                "images": [str(image) for image in post.images],
-                "videos": [str(video) for video in post.videos],
-                "raw_content": post.raw_content
-            }
+            if payload is None:
+                payload = self._serialize_post(post)
 
             # Логируем данные перед отправкой
             logger.info(
@@ -100,50 +295,26 @@ class WebhookService:
                 extra={
                     "callback_url": callback_url,
                     "post_data": {
-                        "title": post_data["title"],
-                        "link": post_data["link"],
-                        "guid": post_data["guid"],
-                        "published_at": post_data["published_at"],
-                        "text_length": len(post_data["text"]),
-                        "links_count": len(post_data["links"]),
-                        "images_count": len(post_data["images"]),
-                        "videos_count": len(post_data["videos"]),
-                        "raw_content_length": len(post_data["raw_content"])
+                        "title": post.title,
+                        "link": post.link,
+                        "guid": post.guid,
+                        "text_length": len(post.text),
+                        "links_count": len(post.links),
+                        "images_count": len(post.images),
+                        "videos_count": len(post.videos),
+                        "raw_content_length": len(post.raw_content),
+                        "payload_size": len(payload)
                     }
                 }
             )
 
-            # Детальное логирование первых элементов массивов
-            if post_data["links"]:
-                logger.debug(
-                    "Sample links",
-                    extra={
-                        "first_links": post_data["links"][:3],
-                        "total_links": len(post_data["links"])
-                    }
+            # Слоты берем на каждую попытку, паузы между ретраями их не держат
+            async with self.limiter.limit(callback_url):
+                response = await self.http_client.post(
+                    url=callback_url,
+                    content=payload,
+                    headers={"Content-Type": "application/json"}
                 )
-            if post_data["images"]:
-                logger.debug(
-                    "Sample images",
-                    extra={
-                        "first_images": post_data["images"][:3],
-                        "total_images": len(post_data["images"])
-                    }
-                )
-            if post_data["videos"]:
-                logger.debug(
-                    "Sample videos",
-                    extra={
-                        "first_videos": post_data["videos"][:3],
-                        "total_videos": len(post_data["videos"])
-                    }
-                )
-
-            response = await self.http_client.post(
-                url=callback_url,
-                json=post_data,
-                headers={"Content-Type": "application/json"}
-            )
             
             if response.status_code < 400:
                 logger.info(
@@ -165,11 +336,15 @@ class WebhookService:
                     "response_content": response.text,
                     "request_headers": dict(response.request.headers),
                     "response_headers": dict(response.headers),
-                    "post_guid": post_data["guid"]
+                    "post_guid": post.guid
                 }
             )
-            return
+            if response.status_code >= 500:
+                raise CallbackServerError(response.status_code)
+            raise CallbackRequestFailed(response.status_code)
 
+        except CallbackRequestFailed:
+            raise
         except (httpx.ConnectError, httpx.ReadTimeout, httpx.HTTPError) as e:
             logger.error(
                 "Connection error while sending callback",
@@ -177,10 +352,10 @@ class WebhookService:
                     "callback_url": callback_url,
                     "error": str(e),
                     "error_type": type(e).__name__,
-                    "post_guid": post_data["guid"]
+                    "post_guid": post.guid
                 }
             )
-            return
+            raise
         except Exception as e:
             logger.error(
                 "Unexpected error while sending callback",
@@ -188,14 +363,159 @@ class WebhookService:
                     "callback_url": callback_url,
                     "error": str(e),
                     "error_type": type(e).__name__,
-                    "post_guid": post_data["guid"]
+                    "post_guid": post.guid
                 }
             )
-            return
+            raise
+
+    async def _deliver(self, subscription, post: ParsedPost, payload: bytes) -> bool:
+        """Send post to a single subscriber, returns True on success"""
+        try:
+            logger.info(
+                "Sending post to subscriber",
+                extra={
+                    "subscription_id": subscription.id,
+                    "callback_url": subscription.callback_url
+                }
+            )
+            await self._send_to_callback(subscription.callback_url, post, payload)
+            return True
+        except CircuitOpenError as e:
+            logger.warning(
+                "Skipping callback, circuit is open",
+                extra={
+                    "subscription_id": subscription.id,
+                    "callback_url": subscription.callback_url,
+                    "retry_after": e.retry_after
+                }
+            )
+            return False
+        except Exception as e:
+            logger.error(
+                "Failed to send to callback",
+                extra={
+                    "subscription_id": subscription.id,
+                    "callback_url": subscription.callback_url,
+                    "error": str(e)
+                }
+            )
+            return False
 
-    async def process_post(self, post: PostWebhook) -> None:
-        """Process incoming post from Huginn"""
+    async def _fan_out(self, post: ParsedPost, payload: bytes, subscriptions: list) -> dict:
+        """Send post to all subscriptions concurrently"""
+        results = await asyncio.gather(
+            *(self._deliver(subscription, post, payload) for subscription in subscriptions)
+        )
+        successful_deliveries = sum(results)
+        return {
+            "successful_deliveries": successful_deliveries,
+            "failed_deliveries": len(results) - successful_deliveries
+        }
+
+    async def _fan_out_in_order(self, deliveries: list[tuple[ParsedPost, bytes, tuple]]) -> dict:
+        """
+        Send several posts to their subscribers. Deliveries to one callback host
+        run sequentially over one keep-alive connection, so every subscriber
+        receives posts in order; different hosts are served concurrently.
+        """
+        streams: dict[str, list] = {}
+        for post, payload, subscriptions in deliveries:
+            for subscription in subscriptions:
+                streams.setdefault(callback_host(subscription.callback_url), []).append(
+                    (subscription, post, payload)
+                )
+
+        async def deliver_stream(stream: list) -> list[bool]:
+            return [
+                await self._deliver(subscription, post, payload)
+                for subscription, post, payload in stream
+            ]
+
+        results = [
+            result
+            for stream_results in await asyncio.gather(
+                *(deliver_stream(stream) for stream in streams.values())
+            )
+            for result in stream_results
+        ]
+        successful_deliveries = sum(results)
+        return {
+            "successful_deliveries": successful_deliveries,
+            "failed_deliveries": len(results) - successful_deliveries
+        }
+
+    async def _enqueue_deliveries(self, post: ParsedPost, payload: bytes, subscriptions: list) -> int:
+        """Add one outbox delivery per subscription to the current transaction"""
+        return await self._enqueue_batch([(post, payload, subscriptions)])
+
+    async def _enqueue_batch(self, deliveries: list[tuple[ParsedPost, bytes, tuple]]) -> int:
+        """Add deliveries of several posts to the current transaction, in delivery order"""
+        messages = []
+        channel_by_subscription = {}
+        for post, payload, subscriptions in deliveries:
+            for subscription in subscriptions:
+                messages.append(OutboxMessage(
+                    subscription_id=subscription.id,
+                    callback_url=subscription.callback_url,
+                    post_guid=post.guid,
+                    payload=payload
+                ))
+                channel_by_subscription[subscription.id] = post.channel_name
+        if not messages:
+            return 0
+
+        enqueued = await self.outbox_repository.enqueue(messages)
+        # Подписку удалили в другом процессе, а маршрут еще в кэше: перечитаем его
+        deleted_ids = channel_by_subscription.keys() - {message.subscription_id for message in enqueued}
+        for channel_name in {channel_by_subscription[subscription_id] for subscription_id in deleted_ids}:
+            logger.warning(
+                "Dropping deliveries of deleted subscriptions",
+                extra={"channel_name": channel_name}
+            )
+            self.routing_cache.invalidate(channel_name)
+        return len(enqueued)
+
+    async def _build_parsed_post(self, post: PostWebhook, channel_name: str) -> ParsedPost:
+        logger.debug("Parsing post content")
+        
+        # Parse post content
+        text, links, images, videos = await self._parse_post_content(post.content)
+        
+        # Get published date
+        published_at = datetime.fromisoformat(post.date_published.replace('Z', '+00:00'))
+        
+        # Prepare parsed post data
+        parsed_post = ParsedPost(
+            title=post.title,
+            link=post.url,
+            guid=post.guid,
+            published_at=published_at,
+            text=text,
+            links=links,
+            images=images,
+            videos=videos,
+            channel_name=channel_name,
+            raw_content=post.content
+        )
+
+        logger.debug(
+            "Parsed post content",
+            extra={
+                "text_length": len(text),
+                "links_count": len(links),
+                "images_count": len(images),
+                "videos_count": len(videos),
+                "first_links": links[:3],
+                "first_images": images[:3],
+                "first_videos": videos[:3]
+            }
+        )
+        return parsed_post
+
+    async def process_post(self, post: PostWebhook) -> bool:
+        """Process incoming post from Huginn, returns True if deliveries were queued to the outbox"""
         start_time = time.time()
+        claimed = False
         
         logger.info(
             "Processing new post from webhook",
@@ -215,22 +535,28 @@ class WebhookService:
                 )
                 raise HTTPException(status_code=400, detail="Invalid post URL")
 
-            channel = self.repository.get_by_channel_name(channel_name)
-            if not channel:
-                logger.error(
-                    "Channel not found",
-                    extra={"channel_name": channel_name}
+            route = await self._get_route(channel_name)
+
+            if not await self._claim_post(route.channel_id, post):
+                logger.info(
+                    "Skipping duplicate post",
+                    extra={
+                        "guid": post.guid,
+                        "channel_name": channel_name
+                    }
                 )
-                raise HTTPException(status_code=404, detail="Channel not found")
+                return False
+            claimed = True
 
-            # Get all active subscriptions
-            active_subs = self.subscription_repository.get_active_by_channel_id(channel.id)
+            active_subs = route.subscriptions
             if not active_subs:
                 logger.warning(
                     "No active subscriptions found",
                     extra={"channel_name": channel_name}
                 )
-                return
+                await self._record_activity(route.channel_id, [post])
+                await self._commit_claims([(route.channel_id, post.guid)])
+                return False
 
             logger.info(
                 "Found active subscriptions",
@@ -240,66 +566,28 @@ class WebhookService:
                 }
             )
 
-            logger.debug("Parsing post content")
-            
-            # Parse post content
-            text, links, images, videos = self._parse_html_content(post.content)
-            
-            # Get published date
-            published_at = datetime.fromisoformat(post.date_published.replace('Z', '+00:00'))
-            
-            # Prepare parsed post data
-            parsed_post = ParsedPost(
-                title=post.title,
-                link=post.url,
-                guid=post.guid,
-                published_at=published_at,
-                text=text,
-                links=links,
-                images=images,
-                videos=videos,
-                channel_name=channel_name,
-                raw_content=post.content
-            )
+            parsed_post = await self._build_parsed_post(post, channel_name)
 
-            logger.debug(
-                "Parsed post content",
-                extra={
-                    "text_length": len(text),
-                    "links_count": len(links),
-                    "images_count": len(images),
-                    "videos_count": len(videos)
+            # Кодируем пост один раз, один и тот же буфер уходит всем подписчикам
+            payload = self._serialize_post(parsed_post)
+
+            if self.use_outbox:
+                # Доставку выполняют воркеры outbox, здесь только сохраняем ее в БД
+                summary = {
+                    "enqueued_deliveries": await self._enqueue_deliveries(parsed_post, payload, active_subs)
                 }
-            )
 
-            # Send to all active subscriptions
-            successful_deliveries = 0
-            failed_deliveries = 0
-
-            for subscription in active_subs:
-                try:
-                    logger.info(
-                        "Sending post to subscriber",
-                        extra={
-                            "subscription_id": subscription.id,
-                            "callback_url": subscription.callback_url
-                        }
-                    )
-                    await self._send_to_callback(subscription.callback_url, parsed_post)
-                    successful_deliveries += 1
-                except Exception as e:
-                    # Здесь мы уже не должны получать исключения из _send_to_callback,
-                    # но на всякий случай обрабатываем их
-                    failed_deliveries += 1
-                    logger.error(
-                        "Failed to send to callback",
-                        extra={
-                            "subscription_id": subscription.id,
-                            "callback_url": subscription.callback_url,
-                            "error": str(e)
-                        }
-                    )
-                    continue  # Продолжаем с следующей подпиской
+            # Строку канала блокируем только перед коммитом, не на время рассылки
+            await self._record_activity(route.channel_id, [post])
+            # guid фиксируется одной транзакцией с доставками: если процесс упадет
+            # до коммита, повтор от Huginn не будет отброшен как дубликат
+            await self._commit_claims([(route.channel_id, post.guid)])
+            claimed = False
+
+            if not self.use_outbox:
+                # Рассылка идет после коммита: блокировка строки поста и соединение
+                # пула не удерживаются на время HTTP запросов и повторов
+                summary = await self._fan_out(parsed_post, payload, active_subs)
 
             processing_time = time.time() - start_time
             logger.info(
@@ -307,14 +595,17 @@ class WebhookService:
                 extra={
                     "guid": post.guid,
                     "processing_time": processing_time,
-                    "successful_deliveries": successful_deliveries,
-                    "failed_deliveries": failed_deliveries
+                    **summary
                 }
             )
+            return self.use_outbox
 
         except HTTPException:
             raise
         except Exception as e:
+            if claimed:
+                # Освобождаем guid, чтобы повторная отправка от Huginn была обработана
+                await self._release_claims()
             logger.error(
                 "Unexpected error processing post",
                 extra={
@@ -327,4 +618,110 @@ class WebhookService:
             raise HTTPException(
                 status_code=500,
                 detail="Internal server error while processing post"
-            )
\ No newline at end of file
+            )
+
+    async def process_batch(self, posts: list[PostWebhook]) -> dict:
+        """
+        Process several posts from Huginn at once.
+        Posts are grouped by channel, routes and guids are resolved with one
+        query per step, and each subscriber gets the posts in publication order.
+        """
+        start_time = time.time()
+        if len(posts) > settings.WEBHOOK_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch is too large, maximum is {settings.WEBHOOK_BATCH_MAX_SIZE} posts"
+            )
+
+        posts_by_channel: dict[str, list[PostWebhook]] = {}
+        invalid_posts = 0
+        for post in posts:
+            channel_name = self._extract_channel_name(post.url)
+            if not channel_name:
+                invalid_posts += 1
+                continue
+            posts_by_channel.setdefault(channel_name, []).append(post)
+
+        summary = {
+            "received_posts": len(posts),
+            "invalid_posts": invalid_posts,
+            "unknown_channel_posts": 0,
+            "duplicate_posts": 0,
+            "accepted_posts": 0
+        }
+        claimed: dict[int, list[PostWebhook]] = {}
+
+        try:
+            routes = await self._get_routes(list(posts_by_channel))
+
+            deliveries = []
+            for channel_name, channel_posts in posts_by_channel.items():
+                route = routes.get(channel_name)
+                if route is None:
+                    logger.error(
+                        "Channel not found",
+                        extra={"channel_name": channel_name, "posts_count": len(channel_posts)}
+                    )
+                    summary["unknown_channel_posts"] += len(channel_posts)
+                    continue
+
+                new_posts = await self._claim_posts(route.channel_id, channel_posts)
+                claimed[route.channel_id] = new_posts
+                summary["duplicate_posts"] += len(channel_posts) - len(new_posts)
+                summary["accepted_posts"] += len(new_posts)
+                if not route.subscriptions:
+                    continue
+
+                parsed_posts = [
+                    await self._build_parsed_post(post, channel_name)
+                    for post in new_posts
+                ]
+                parsed_posts.sort(key=lambda parsed_post: parsed_post.published_at)
+                deliveries.extend(
+                    (parsed_post, self._serialize_post(parsed_post), route.subscriptions)
+                    for parsed_post in parsed_posts
+                )
+
+            if self.use_outbox:
+                summary["enqueued_deliveries"] = await self._enqueue_batch(deliveries)
+
+            for channel_id, new_posts in claimed.items():
+                await self._record_activity(channel_id, new_posts)
+            await self._commit_claims([
+                (channel_id, post.guid)
+                for channel_id, new_posts in claimed.items()
+                for post in new_posts
+            ])
+            claimed = {}
+
+            if not self.use_outbox:
+                # Как и для одного поста, HTTP рассылка идет вне транзакции
+                summary.update(await self._fan_out_in_order(deliveries))
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            if claimed:
+                await self._release_claims()
+            logger.error(
+                "Unexpected error processing post batch",
+                extra={
+                    "posts_count": len(posts),
+                    "error": str(e),
+                    "error_type": type(e).__name__
+                },
+                exc_info=True
+            )
+            raise HTTPException(
+                status_code=500,
+                detail="Internal server error while processing post batch"
+            )
+
+        logger.info(
+            "Finished processing post batch",
+            extra={
+                "processing_time": time.time() - start_time,
+                **summary
+            }
+        )
+        return summary
@@ -0,0 +1,169 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a target whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker based on the failure rate over the last calls
+
+    Args:
+        name: Name of the protected target, e.g. callback host
+        failure_rate: Share of failed calls in the window that opens the circuit
+        minimum_calls: Minimum number of calls in the window before the rate is evaluated
+        window_size: Number of last calls taken into account
+        cooldown: Seconds the circuit stays open before a trial call is allowed
+        half_open_max_calls: Number of concurrent trial calls in half-open state
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        minimum_calls: int = 5,
+        window_size: int = 20,
+        cooldown: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.cooldown = cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self._retry_after() <= 0:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def _retry_after(self) -> float:
+        return self._opened_at + self.cooldown - time.monotonic()
+
+    def _current_failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _transition(self, state: CircuitState) -> None:
+        logger.warning(
+            f"Circuit for {self.name} changed state: {self._state.value} -> {state.value}"
+        )
+        self._state = state
+        self._half_open_calls = 0
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        if state == CircuitState.CLOSED:
+            self._outcomes.clear()
+
+    @property
+    def is_idle(self) -> bool:
+        """Closed and without failures in the window, nothing is lost when it is dropped"""
+        return self.state == CircuitState.CLOSED and False not in self._outcomes
+
+    def before_call(self) -> None:
+        """Reserve a call or raise CircuitOpenError if the target must not be called"""
+        state = self.state
+        if state == CircuitState.OPEN:
+            raise CircuitOpenError(self.name, self._retry_after())
+        if state == CircuitState.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(self.name, 0.0)
+            self._half_open_calls += 1
+
+    def release(self) -> None:
+        """Give back a reserved call whose outcome should not be counted"""
+        if self._state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        if self._state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.CLOSED)
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        if self._state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.OPEN)
+            return
+        self._outcomes.append(False)
+        if (
+            self._state == CircuitState.CLOSED
+            and len(self._outcomes) >= self.minimum_calls
+            and self._current_failure_rate() >= self.failure_rate
+        ):
+            self._transition(CircuitState.OPEN)
+
+    def snapshot(self) -> dict:
+        """Current state for monitoring"""
+        state = self.state
+        return {
+            "state": state.value,
+            "failure_rate": round(self._current_failure_rate(), 3),
+            "calls_in_window": len(self._outcomes),
+            "retry_after": max(self._retry_after(), 0.0) if state == CircuitState.OPEN else 0.0
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    Lazily creates one circuit breaker per key (e.g. per host) with shared settings
+
+    Args:
+        max_keys: Number of breakers kept in memory; the least recently used
+            idle ones are evicted above it, open and half-open ones are always kept
+        **breaker_options: Options of every CircuitBreaker
+    """
+
+    def __init__(self, max_keys: int = 1024, **breaker_options):
+        self.max_keys = max_keys
+        self.breaker_options = breaker_options
+        self._breakers: OrderedDict[str, CircuitBreaker] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._breakers)
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, **self.breaker_options)
+            self._breakers[key] = breaker
+            self._evict_idle_breakers()
+        self._breakers.move_to_end(key)
+        return breaker
+
+    def _evict_idle_breakers(self) -> None:
+        if len(self._breakers) <= self.max_keys:
+            return
+        # Последний ключ только что создан, его не трогаем
+        idle = [key for key, breaker in list(self._breakers.items())[:-1] if breaker.is_idle]
+        for key in idle[:len(self._breakers) - self.max_keys]:
+            del self._breakers[key]
+
+    def snapshot(self) -> dict[str, dict]:
+        return {key: breaker.snapshot() for key, breaker in self._breakers.items()}
+
+    def reset(self) -> None:
+        self._breakers.clear()
@@ -0,0 +1,67 @@
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+from urllib.parse import urlparse
+
+
+@dataclass
+class _HostSlots:
+    semaphore: asyncio.Semaphore
+    # Операции, которые держат или ждут слот хоста
+    users: int = 0
+
+
+class HostConcurrencyLimiter:
+    """
+    Limits the number of concurrent operations globally and per target host
+
+    Args:
+        max_concurrency: Maximum number of operations running at once
+        max_per_host: Maximum number of operations running at once against one host
+        max_hosts: Number of host semaphores kept in memory; the least recently
+            used idle ones are evicted above it
+    """
+
+    def __init__(self, max_concurrency: int, max_per_host: int, max_hosts: int = 1024):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.max_hosts = max_hosts
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts: OrderedDict[str, _HostSlots] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def _get_host_slots(self, host: str) -> _HostSlots:
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = _HostSlots(asyncio.Semaphore(self.max_per_host))
+            self._hosts[host] = slots
+        self._hosts.move_to_end(host)
+        return slots
+
+    def _evict_idle_hosts(self) -> None:
+        # Семафор без держателей и ожидающих полностью свободен, его можно создать заново
+        if len(self._hosts) <= self.max_hosts:
+            return
+        idle = [host for host, slots in self._hosts.items() if slots.users == 0]
+        for host in idle[:len(self._hosts) - self.max_hosts]:
+            del self._hosts[host]
+
+    @asynccontextmanager
+    async def limit(self, url: str) -> AsyncIterator[None]:
+        """Hold a global slot and a slot for the host of the given URL"""
+        host = urlparse(url).netloc
+        slots = self._get_host_slots(host)
+        slots.users += 1
+        try:
+            # Ждем слот хоста до глобального слота, чтобы медленный хост
+            # не занимал глобальные слоты своей очередью
+            async with slots.semaphore:
+                async with self._global:
+                    yield
+        finally:
+            slots.users -= 1
+            self._evict_idle_hosts()
@@ -0,0 +1,65 @@
+from typing import AsyncIterator, Optional
+from xml.etree import ElementTree as ET
+
+# Пути элементов заголовка RSS фида без корня <rss>
+TITLE_PATH = ("channel", "title")
+IMAGE_URL_PATH = ("channel", "image", "url")
+ITEM_PATH = ("channel", "item")
+
+
+class FeedTooLarge(ValueError):
+    """Feed header was not found within the byte limit"""
+
+
+async def read_prefix(chunks: AsyncIterator[bytes], max_bytes: int) -> bytes:
+    """First max_bytes of a response body, the rest is not read"""
+    body = b""
+    async for chunk in chunks:
+        body += chunk
+        if len(body) >= max_bytes:
+            break
+    return body[:max_bytes]
+
+
+async def parse_feed_header(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Title and image URL of an RSS feed read incrementally from its byte stream.
+
+    Reading stops as soon as both are found or the first <item> starts,
+    so the posts embedded in the feed are not downloaded. Raises FeedTooLarge
+    if the header does not end within max_bytes.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    path: list[str] = []
+    title = photo_url = None
+    received = 0
+
+    async for chunk in chunks:
+        received += len(chunk)
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                path.append(element.tag)
+                if tuple(path[1:]) == ITEM_PATH:
+                    return title, photo_url
+                continue
+
+            current = tuple(path[1:])
+            if current == TITLE_PATH:
+                title = element.text
+            elif current == IMAGE_URL_PATH:
+                photo_url = element.text
+            elif current == ("channel",):
+                return title, photo_url
+            path.pop()
+            if title is not None and photo_url is not None:
+                return title, photo_url
+
+        if received > max_bytes:
+            raise FeedTooLarge(f"Feed header is larger than {max_bytes} bytes")
+
+    parser.close()
+    return title, photo_url
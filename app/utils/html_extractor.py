@@ -0,0 +1,191 @@
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Ссылки на медиа не считаются ссылками поста
+MEDIA_LINK_RE = re.compile(r"\.(?:jpg|jpeg|png|gif|mp4)")
+IMAGE_RE = re.compile(r"\.(?:jpg|jpeg|png|gif)")
+VIDEO_RE = re.compile(r"\.mp4")
+
+# Tags without closing tag, their end is implied right after the start tag
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+    'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+])
+# Text inside these tags is not part of the post text
+NON_TEXT_ELEMENTS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+# Whitespace inside these tags is kept as is
+PRESERVE_WHITESPACE_ELEMENTS = frozenset(['pre', 'textarea'])
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def _build_entities() -> dict[str, str]:
+    entities = {}
+    for name, character in sorted(html5.items()):
+        entities.setdefault(name.rstrip(';'), character)
+    return entities
+
+
+ENTITIES = _build_entities()
+
+
+def _get_attr(attrs: list[tuple[str, str | None]], name: str) -> str | None:
+    """Last value of the attribute, '' for attributes without value"""
+    value = None
+    for key, attr_value in attrs:
+        if key == name:
+            value = attr_value or ''
+    return value
+
+
+class PostContentParser(HTMLParser):
+    """
+    Single-pass extractor of text, links, images and videos from post HTML.
+
+    Produces the same result as building a BeautifulSoup tree with
+    'html.parser' and calling get_text(separator=' ') and find_all()
+    on it, without building the tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.strings: list[str] = []
+        self.links: list[str] = []
+        self.images: list[str] = []
+        self.videos: list[str] = []
+        self._data: list[str] = []
+        self._open_tags: list[str] = []
+        self._already_closed: list[str] = []
+        self._non_text_depth = 0
+        self._preserve_whitespace_depth = 0
+
+    def _flush(self, is_cdata: bool = False) -> None:
+        """End current text segment, adjacent text chunks form one string"""
+        if not self._data:
+            return
+        data = ''.join(self._data)
+        self._data = []
+
+        if not self._preserve_whitespace_depth and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        # CDATA всегда считается текстом, даже внутри script/template
+        if is_cdata or not self._non_text_depth:
+            self.strings.append(data)
+
+    def _push(self, tag: str) -> None:
+        self._open_tags.append(tag)
+        if tag in NON_TEXT_ELEMENTS:
+            self._non_text_depth += 1
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_whitespace_depth += 1
+
+    def _pop_to(self, tag: str) -> None:
+        """Close the most recently opened tag with this name and all tags inside it"""
+        if tag not in self._open_tags:
+            return
+        while self._open_tags:
+            closed = self._open_tags.pop()
+            if closed in NON_TEXT_ELEMENTS:
+                self._non_text_depth -= 1
+            if closed in PRESERVE_WHITESPACE_ELEMENTS:
+                self._preserve_whitespace_depth -= 1
+            if closed == tag:
+                return
+
+    def _collect(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == 'a':
+            href = _get_attr(attrs, 'href')
+            if href is not None and not MEDIA_LINK_RE.search(href.lower()):
+                self.links.append(href)
+        elif tag == 'img':
+            src = _get_attr(attrs, 'src')
+            if src and IMAGE_RE.search(src.lower()):
+                self.images.append(src)
+        elif tag == 'video':
+            src = _get_attr(attrs, 'src')
+            if src and VIDEO_RE.search(src.lower()):
+                self.videos.append(src)
+
+    def _end_tag(self, tag: str, check_already_closed: bool = True) -> None:
+        # Явный закрывающий тег у уже закрытого пустого элемента игнорируется
+        if check_already_closed and tag in self._already_closed:
+            self._already_closed.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def _start_tag(self, tag: str, attrs: list, handle_void_element: bool) -> None:
+        self._flush()
+        self._collect(tag, attrs)
+        self._push(tag)
+        if handle_void_element and tag in VOID_ELEMENTS:
+            self._end_tag(tag, check_already_closed=False)
+            self._already_closed.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        self._start_tag(tag, attrs, handle_void_element=True)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start_tag(tag, attrs, handle_void_element=False)
+        self._end_tag(tag)
+
+    def handle_endtag(self, tag):
+        self._end_tag(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        if name[0] in 'xX':
+            codepoint = int(name[1:], 16)
+        else:
+            codepoint = int(name)
+
+        data = None
+        if codepoint < 256:
+            # Ссылки вида &#147; обычно подразумевают Windows-1252
+            try:
+                data = bytes([codepoint]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self._data.append(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = ENTITIES.get(name)
+        self._data.append(character if character is not None else f"&{name}")
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith('CDATA['):
+            self._data.append(data[len('CDATA['):])
+            self._flush(is_cdata=True)
+
+    # Comments, declarations and processing instructions end the current
+    # text segment but are not part of the text
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_post_content(html: str) -> tuple[str, list[str], list[str], list[str]]:
+    """Extract text, links, images and videos from post HTML in one pass"""
+    parser = PostContentParser()
+    parser.feed(html)
+    parser.close()
+    text = ' '.join(parser.strings).strip()
+    return text, parser.links, parser.images, parser.videos
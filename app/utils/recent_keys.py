@@ -0,0 +1,36 @@
+from collections import OrderedDict
+from typing import Hashable
+
+
+class RecentKeys:
+    """
+    Bounded set of recently seen keys, the least recently seen key is evicted first
+
+    Args:
+        maxsize: Maximum number of keys kept in memory
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._keys: OrderedDict[Hashable, None] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key not in self._keys:
+            return False
+        self._keys.move_to_end(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        self._keys.pop(key, None)
+
+    def clear(self) -> None:
+        self._keys.clear()
@@ -1,7 +1,9 @@
 import asyncio
 import logging
 from functools import wraps
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Optional, TypeVar
+
+from app.utils.circuit_breaker import CircuitBreakerRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +13,10 @@ def async_retry(
     retries: int = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+    circuit_key: Optional[Callable[..., str]] = None,
+    circuit_failures: Optional[tuple] = None
 ) -> Callable:
     """
     Decorator for async functions to implement retry logic with exponential backoff
@@ -21,17 +26,38 @@ def async_retry(
         delay: Initial delay between retries in seconds
         backoff: Multiplier for delay after each retry
         exceptions: Tuple of exceptions to catch
+        circuit_breakers: Registry of circuit breakers; while the circuit is open
+            calls fail fast with CircuitOpenError and are not retried
+        circuit_key: Function receiving the call arguments and returning the
+            circuit breaker key (e.g. target host)
+        circuit_failures: Exceptions counted as failures by the circuit breaker,
+            defaults to `exceptions`
     """
+    failures = circuit_failures or exceptions
+    handled = exceptions + failures
+
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
             current_delay = delay
             last_exception = None
+            breaker = (
+                circuit_breakers.get(circuit_key(*args, **kwargs))
+                if circuit_breakers is not None
+                else None
+            )
             
             for attempt in range(retries + 1):
+                if breaker is not None:
+                    breaker.before_call()
+
                 try:
-                    return await func(*args, **kwargs)
-                except exceptions as e:
+                    result = await func(*args, **kwargs)
+                except handled as e:
+                    if breaker is not None and isinstance(e, failures):
+                        breaker.record_failure()
+                    if not isinstance(e, exceptions):
+                        raise
                     last_exception = e
                     if attempt == retries:
                         logger.error(
@@ -46,6 +72,16 @@ def async_retry(
                     
                     await asyncio.sleep(current_delay)
                     current_delay *= backoff
+                    continue
+                except BaseException:
+                    # Прочие ошибки не считаются ни успехом, ни отказом
+                    if breaker is not None:
+                        breaker.release()
+                    raise
+
+                if breaker is not None:
+                    breaker.record_success()
+                return result
             
             raise last_exception
         return wrapper
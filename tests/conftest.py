@@ -1,41 +1,80 @@
 # ./tests/conftest.py
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 from app.db.base import Base
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.main import app
 from app.repositories.channel_repository import ChannelRepository
 from app.services.channel_service import ChannelService
-from app.services.huginn_client import HuginnClient
-from app.services.webhook_service import WebhookService
+from app.services.channel_metadata_cache import channel_metadata_cache
+from app.services.huginn_client import AsyncHuginnClient
+from app.services.routing_cache import routing_cache
+from app.services.webhook_service import (
+    WebhookService,
+    callback_circuit_breakers,
+    recent_post_guids,
+)
 from tests.factories.post import create_test_html_content, create_test_post_webhook
 
 
 @pytest.fixture(autouse=True)
 def mock_huginn_client(monkeypatch):
     """
-    Мокирование HuginnClient для избежания реальных HTTP-запросов к Huginn.
+    Мокирование AsyncHuginnClient для избежания реальных HTTP-запросов к Huginn.
     """
-    mock = MagicMock(spec=HuginnClient)
+    mock = AsyncMock(spec=AsyncHuginnClient)
 
-    # Настройка возвращаемых значений для методов HuginnClient
+    # Настройка возвращаемых значений для методов AsyncHuginnClient
     mock.create_rss_agent.return_value = 1
     mock.create_post_agent.return_value = 2
     mock.link_agents.return_value = None
     mock.delete_agent.return_value = None
     mock.get_agent_status.return_value = {"status": "ok"}
 
-    # Патчинг HuginnClient в модуле, где он используется
-    monkeypatch.setattr('app.services.channel_service.HuginnClient', lambda: mock)
+    # Подмена общего AsyncHuginnClient в модуле, где он используется
+    monkeypatch.setattr('app.services.channel_service.get_huginn_client', lambda: mock)
 
     return mock
 
 
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Состояние circuit breaker не должно переходить между тестами"""
+    callback_circuit_breakers.reset()
+    yield
+    callback_circuit_breakers.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_recent_post_guids():
+    """Кэш принятых guid не должен переходить между тестами"""
+    recent_post_guids.clear()
+    yield
+    recent_post_guids.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_routing_cache():
+    routing_cache.clear()
+    yield
+    routing_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_channel_metadata_cache():
+    channel_metadata_cache.clear()
+    yield
+    channel_metadata_cache.clear()
+
+
 @pytest.fixture(scope="session")
 def engine():
     from app.db.session import engine
@@ -57,29 +96,43 @@ def db_session(engine) -> Session:
 
 
 @pytest.fixture
-def client(db_session: Session) -> TestClient:
+def async_session_factory(db_session: Session) -> async_sessionmaker[AsyncSession]:
+    """
+    Фабрика асинхронных сессий для тестов.
+    NullPool: соединения asyncpg нельзя переиспользовать между event loop разных тестов.
+    """
+    async_engine = create_async_engine(settings.get_async_database_url, poolclass=NullPool)
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def async_db_session(async_session_factory) -> AsyncSession:
+    async with async_session_factory() as db:
+        yield db
+
+
+@pytest.fixture
+def client(async_session_factory) -> TestClient:
     """
     Фикстура для тестового клиента FastAPI с переопределенными зависимостями.
     """
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
 
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
 
 @pytest.fixture
-def channel_repository(db_session: Session) -> ChannelRepository:
-    return ChannelRepository(db_session)
+def channel_repository(async_db_session: AsyncSession) -> ChannelRepository:
+    return ChannelRepository(async_db_session)
 
 
 @pytest.fixture
-def channel_service(db_session: Session) -> ChannelService:
-    return ChannelService(db_session)
+def channel_service(async_db_session: AsyncSession) -> ChannelService:
+    return ChannelService(async_db_session)
 
 
 @pytest.fixture
@@ -94,9 +147,9 @@ def mock_http_client() -> MagicMock:
 
 
 @pytest.fixture
-def webhook_service(db_session: Session, mock_http_client: MagicMock) -> WebhookService:
+def webhook_service(async_db_session: AsyncSession, mock_http_client: MagicMock) -> WebhookService:
     """Create WebhookService instance with mocked HTTP client for testing."""
-    service = WebhookService(db_session)
+    service = WebhookService(async_db_session)
     service.http_client = mock_http_client
     return service
 
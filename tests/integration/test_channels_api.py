@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.models.subscription import Subscription
+
+
+def test_create_channels_batch(client: TestClient, db_session: Session, mock_huginn_client):
+    db_session.add(Channel(channel_name="existing", is_monitored=True))
+    db_session.commit()
+    mock_huginn_client.provision_channels.return_value = {"first": (1, 2), "second": (3, 4)}
+
+    response = client.post("/channels/batch", json={"channel_urls": [
+        "https://t.me/first",
+        "https://t.me/second",
+        "https://t.me/existing"
+    ]})
+
+    assert response.status_code == 201
+    data = response.json()
+    assert [(c["channel_name"], c["huginn_rss_agent_id"], c["huginn_post_agent_id"]) for c in data["created"]] == [
+        ("first", 1, 2), ("second", 3, 4)
+    ]
+    assert [c["channel_name"] for c in data["existing"]] == ["existing"]
+    assert mock_huginn_client.provision_channels.await_count == 1
+    assert db_session.query(Channel).filter(Channel.huginn_rss_agent_id.isnot(None)).count() == 2
+
+
+def test_list_channels_pages(client: TestClient, db_session: Session):
+    channels = [Channel(channel_name=f"channel{i}", is_monitored=i != 1) for i in range(4)]
+    db_session.add_all(channels)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channels[2].id, callback_url="https://example.com/webhook"))
+    db_session.commit()
+
+    first = client.get("/channels/", params={"limit": 2, "is_monitored": True}).json()
+    assert [item["channel_name"] for item in first["items"]] == ["channel0", "channel2"]
+    second = client.get("/channels/", params={"limit": 2, "is_monitored": True, "after": first["next_cursor"]}).json()
+    assert [item["channel_name"] for item in second["items"]] == ["channel3"]
+    assert second["next_cursor"] is None
+
+    subscribed = client.get("/channels/", params={"callback_url": "https://example.com/webhook"}).json()
+    assert [item["channel_name"] for item in subscribed["items"]] == ["channel2"]
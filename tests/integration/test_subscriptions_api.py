@@ -0,0 +1,134 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.http_client import get_http_client
+from app.main import app
+from app.models.channel import Channel
+from app.models.subscription import Subscription
+
+CALLBACK_URL = "https://example.com/webhook"
+
+
+def _feed(title: str) -> bytes:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <rss version="2.0"><channel><title>{title} - Telegram Channel</title></channel></rss>""".encode()
+
+
+@pytest.fixture
+def rsshub_requests(client: TestClient):
+    """RSSHub отдаёт фид для всех каналов, кроме private"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        channel_name = request.url.path.rsplit("/", 1)[-1]
+        if channel_name == "private":
+            return httpx.Response(503, content=b"Unable to fetch message feed")
+        return httpx.Response(200, content=_feed(channel_name.title()))
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_http_client] = lambda: http_client
+    return requests
+
+
+def test_create_subscriptions_batch(
+    client: TestClient, rsshub_requests: list, db_session: Session, mock_huginn_client
+):
+    existing = Channel(channel_name="existing", is_monitored=True)
+    inactive = Channel(channel_name="inactive", is_monitored=True)
+    db_session.add_all([existing, inactive])
+    db_session.flush()
+    db_session.add_all([
+        Subscription(channel_id=existing.id, callback_url=CALLBACK_URL, is_active=True),
+        Subscription(channel_id=inactive.id, callback_url=CALLBACK_URL, is_active=False)
+    ])
+    db_session.commit()
+    mock_huginn_client.provision_channels.return_value = {"first": (1, 2)}
+
+    response = client.post("/subscriptions/batch", json={
+        "channel_urls": [
+            "https://t.me/first",
+            "https://t.me/existing",
+            "https://t.me/private",
+            "https://t.me/inactive",
+            "https://t.me/first"
+        ],
+        "callback_url": CALLBACK_URL
+    })
+
+    assert response.status_code == 200
+    results = {item["channel_name"]: item for item in response.json()["results"]}
+    assert list(results) == ["first", "existing", "private", "inactive"]
+    assert {name: item["status"] for name, item in results.items()} == {
+        "first": "created", "existing": "exists", "private": "failed", "inactive": "reactivated"
+    }
+    assert results["first"]["subscription"]["channel_title"] == "First"
+    assert results["first"]["subscription"]["created_at"]
+    assert results["private"]["error"] == "This channel is private or doesn't exist"
+    assert len(rsshub_requests) == 4
+    mock_huginn_client.provision_channels.assert_awaited_once_with(["first"], None)
+
+    db_session.expire_all()
+    assert db_session.query(Subscription).filter(Subscription.is_active.is_(True)).count() == 3
+    assert db_session.query(Channel).filter(Channel.channel_name == "first").one().title == "First"
+
+
+def test_create_subscriptions_batch_reports_provisioning_failure(
+    client: TestClient, rsshub_requests: list, db_session: Session, mock_huginn_client
+):
+    mock_huginn_client.provision_channels.side_effect = Exception("Huginn is down")
+
+    response = client.post("/subscriptions/batch", json={
+        "channel_urls": ["https://t.me/first"],
+        "callback_url": CALLBACK_URL
+    })
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["status"] == "failed"
+    assert db_session.query(Subscription).count() == 0
+
+
+def test_delete_subscriptions_batch(client: TestClient, db_session: Session):
+    channel = Channel(channel_name="test", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channel.id, callback_url=CALLBACK_URL, is_active=True))
+    db_session.commit()
+
+    response = client.post("/subscriptions/batch/delete", json={"callback_url": CALLBACK_URL})
+
+    assert response.status_code == 200
+    assert response.json() == {"deleted_subscriptions": 1, "released_channels": 1, "deleting_agents": 0}
+    assert db_session.query(Channel).count() == 0
+
+
+def test_list_subscriptions_pages(client: TestClient, db_session: Session):
+    channels = [Channel(channel_name=f"channel{i}", is_monitored=True) for i in range(2)]
+    db_session.add_all(channels)
+    db_session.flush()
+    db_session.add_all([
+        Subscription(channel_id=channels[i % 2].id, callback_url=CALLBACK_URL, is_active=i != 4)
+        for i in range(5)
+    ] + [Subscription(channel_id=channels[0].id, callback_url="https://other.com/webhook", is_active=True)])
+    db_session.commit()
+
+    ids = []
+    cursor = None
+    while True:
+        params = {"callback_url": CALLBACK_URL, "is_active": True, "limit": 2}
+        if cursor is not None:
+            params["after"] = cursor
+        page = client.get("/subscriptions/", params=params).json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(ids) == 4
+    assert ids == sorted(ids)
+
+    page = client.get("/subscriptions/", params={"channel_name": "channel1"}).json()
+    assert [item["channel_name"] for item in page["items"]] == ["channel1", "channel1"]
+    assert page["next_cursor"] is None
@@ -5,6 +5,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.models.channel import Channel
+from app.models.outbox import OutboxMessage
 from app.models.subscription import Subscription
 from tests.factories.post import create_test_post_webhook
 
@@ -41,11 +42,42 @@ def test_process_webhook(client: TestClient, db_session: Session):
 
         response = client.post("/webhook/rss", json=post_data.model_dump())
         
+        assert response.status_code == 202
+        assert response.json() == {"status": "accepted"}
+        
+        # Доставка выполняется воркерами outbox, а не в запросе
+        mock_post.assert_not_called()
+
+    outbox = db_session.query(OutboxMessage).all()
+    assert len(outbox) == 1
+    assert outbox[0].subscription_id == subscription.id
+    assert outbox[0].callback_url == "http://callback.com/webhook"
+
+
+def test_process_webhook_without_outbox(client: TestClient, db_session: Session, monkeypatch):
+    """Without the outbox the post is delivered in the request and answered with 200"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", False)
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channel.id, callback_url="http://callback.com/webhook"))
+    db_session.commit()
+
+    post_data = create_test_post_webhook(url="https://t.me/test_channel/1234")
+
+    with patch('httpx.AsyncClient.post') as mock_post:
+        mock_post.return_value = AsyncMock(status_code=200)
+
+        response = client.post("/webhook/rss", json=post_data.model_dump())
+
         assert response.status_code == 200
         assert response.json() == {"status": "success"}
-        
         mock_post.assert_called_once()
 
+    assert db_session.query(OutboxMessage).count() == 0
+
 
 def test_process_webhook_invalid_data(client: TestClient):
     """Test webhook processing with invalid data"""
@@ -66,4 +98,61 @@ def test_process_webhook_channel_not_found(client: TestClient):
     
     response = client.post("/webhook/rss", json=post_data.model_dump())
     assert response.status_code == 404
-    assert "Channel not found" in response.json()["detail"]
\ No newline at end of file
+    assert "Channel not found" in response.json()["detail"]
+
+def test_process_webhook_batch(client: TestClient, db_session: Session):
+    """Batch is grouped by channel, deduplicated and enqueued in publication order"""
+    first = Channel(channel_name="first_channel", is_monitored=True)
+    second = Channel(channel_name="second_channel", is_monitored=True)
+    db_session.add_all([first, second])
+    db_session.flush()
+    db_session.add_all([
+        Subscription(channel_id=first.id, callback_url="http://callback.com/first"),
+        Subscription(channel_id=second.id, callback_url="http://callback.com/second")
+    ])
+    db_session.commit()
+
+    posts = [
+        create_test_post_webhook(id="first_2", url="https://t.me/first_channel/2",
+                                 date_published="2024-03-14T12:02:00+00:00"),
+        create_test_post_webhook(id="first_1", url="https://t.me/first_channel/1",
+                                 date_published="2024-03-14T12:01:00+00:00"),
+        create_test_post_webhook(id="first_1", url="https://t.me/first_channel/1",
+                                 date_published="2024-03-14T12:01:00+00:00"),
+        create_test_post_webhook(id="second_1", url="https://t.me/second_channel/1"),
+        create_test_post_webhook(id="unknown_1", url="https://t.me/unknown_channel/1")
+    ]
+
+    response = client.post("/webhook/rss/batch", json=[post.model_dump() for post in posts])
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "status": "accepted",
+        "received_posts": 5,
+        "invalid_posts": 0,
+        "unknown_channel_posts": 1,
+        "duplicate_posts": 1,
+        "accepted_posts": 3,
+        "enqueued_deliveries": 3
+    }
+
+    outbox = db_session.query(OutboxMessage).order_by(OutboxMessage.id).all()
+    first_channel_guids = [m.post_guid for m in outbox if m.callback_url == "http://callback.com/first"]
+    assert first_channel_guids == ["first_1", "first_2"]
+    assert [m.post_guid for m in outbox if m.callback_url == "http://callback.com/second"] == ["second_1"]
+
+    # Повторная отправка той же пачки ничего не ставит в очередь
+    response = client.post("/webhook/rss/batch", json=[post.model_dump() for post in posts])
+    assert response.json()["duplicate_posts"] == 4
+    assert db_session.query(OutboxMessage).count() == 3
+
+
+def test_process_webhook_batch_too_large(client: TestClient, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_SIZE", 1)
+    posts = [create_test_post_webhook(id=f"guid_{i}").model_dump() for i in range(2)]
+
+    response = client.post("/webhook/rss/batch", json=posts)
+
+    assert response.status_code == 413
@@ -0,0 +1,166 @@
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.models.rss_agent_pack import RssAgentPack
+from app.services.agent_reconciler import AgentReconciler
+from app.services.channel_service import ChannelService
+
+
+def _agent(agent_id: int, name: str, disabled: bool = False, created_at: str = "2024-01-01T00:00:00Z") -> dict:
+    agent_type = "Agents::RssAgent" if name.startswith("RSS") else "Agents::PostAgent"
+    return {"id": agent_id, "name": name, "type": agent_type, "disabled": disabled, "created_at": created_at}
+
+
+@pytest.fixture
+def reconciler(channel_service: ChannelService, mock_huginn_client: MagicMock) -> AgentReconciler:
+    # Агентов, которых нет в списке, нет и в Huginn
+    mock_huginn_client.get_agent_status.side_effect = HTTPException(status_code=404, detail="Not Found")
+    return AgentReconciler(channel_service)
+
+
+@pytest.mark.asyncio
+async def test_dry_run_reports_drift(
+    reconciler: AgentReconciler, mock_huginn_client: MagicMock, db_session: Session
+):
+    db_session.add_all([
+        Channel(channel_name="healthy", huginn_rss_agent_id=10, huginn_post_agent_id=11),
+        Channel(channel_name="broken", huginn_rss_agent_id=12, huginn_post_agent_id=13),
+        Channel(channel_name="stopped", is_monitored=False)
+    ])
+    db_session.commit()
+    mock_huginn_client.list_agents.return_value = [
+        _agent(10, "RSS Monitor - healthy", disabled=True),
+        _agent(11, "Post Agent - healthy"),
+        _agent(13, "Post Agent - broken"),
+        _agent(20, "RSS Monitor - gone"),
+        _agent(21, "Website Agent - not ours"),
+        _agent(22, "RSS Monitor - just created", created_at="2999-01-01T00:00:00Z")
+    ]
+
+    report = await reconciler.run(dry_run=True)
+
+    assert report["orphaned_agents"] == [20]
+    assert report["broken_channels"] == ["broken"]
+    assert report["disabled_agents"] == [10]
+    assert report["deleted_agents"] == report["reprovisioned_channels"] == 0
+    mock_huginn_client.delete_agent.assert_not_called()
+    mock_huginn_client.enable_agent.assert_not_called()
+    mock_huginn_client.provision_channels.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_fixes_drift(
+    reconciler: AgentReconciler, mock_huginn_client: MagicMock, db_session: Session
+):
+    db_session.add_all([
+        Channel(channel_name="healthy", huginn_rss_agent_id=10, huginn_post_agent_id=11),
+        Channel(channel_name="broken", huginn_rss_agent_id=12, huginn_post_agent_id=13),
+        Channel(channel_name="unprovisioned")
+    ])
+    db_session.commit()
+    mock_huginn_client.list_agents.return_value = [
+        _agent(10, "RSS Monitor - healthy", disabled=True),
+        _agent(11, "Post Agent - healthy"),
+        _agent(13, "Post Agent - broken"),
+        _agent(20, "RSS Monitor - gone")
+    ]
+    mock_huginn_client.provision_channels.return_value = {"broken": (30, 31), "unprovisioned": (32, 33)}
+
+    report = await reconciler.run()
+
+    assert report["broken_channels"] == ["broken", "unprovisioned"]
+    assert report["deleted_agents"] == 1
+    assert report["restarted_agents"] == 1
+    assert report["reprovisioned_channels"] == 2
+    assert report["errors"] == []
+    deleted = sorted(call.args[0] for call in mock_huginn_client.delete_agent.await_args_list)
+    # Осиротевший агент и уцелевший Post агент сломанного канала
+    assert deleted == [13, 20]
+    mock_huginn_client.enable_agent.assert_awaited_once_with(10)
+    mock_huginn_client.start_agent.assert_awaited_once_with(10)
+    # Каналы получают агентов одним импортом сценария, как новые каналы
+    mock_huginn_client.provision_channels.assert_awaited_once_with(["broken", "unprovisioned"], None)
+
+    db_session.expire_all()
+    agents = {
+        channel.channel_name: (channel.huginn_rss_agent_id, channel.huginn_post_agent_id)
+        for channel in db_session.query(Channel)
+    }
+    assert agents == {"healthy": (10, 11), "broken": (30, 31), "unprovisioned": (32, 33)}
+
+
+@pytest.mark.asyncio
+async def test_run_keeps_agents_skipped_by_listing(
+    reconciler: AgentReconciler, mock_huginn_client: MagicMock, db_session: Session
+):
+    """An agent the paged listing missed is found by id, its channel is not reprovisioned"""
+    db_session.add_all([
+        Channel(channel_name="skipped", huginn_rss_agent_id=10, huginn_post_agent_id=11),
+        Channel(channel_name="unchecked", huginn_rss_agent_id=12, huginn_post_agent_id=13)
+    ])
+    db_session.commit()
+    mock_huginn_client.list_agents.return_value = [
+        _agent(11, "Post Agent - skipped"),
+        _agent(13, "Post Agent - unchecked"),
+        _agent(20, "Website Agent - not ours")
+    ]
+
+    async def get_agent_status(agent_id):
+        if agent_id == 10:
+            return _agent(10, "RSS Monitor - skipped")
+        raise HTTPException(status_code=500, detail="Huginn is down")
+
+    mock_huginn_client.get_agent_status.side_effect = get_agent_status
+
+    report = await reconciler.run()
+
+    assert report["broken_channels"] == []
+    assert report["errors"] == ["agent 12: Huginn is down"]
+    mock_huginn_client.delete_agent.assert_not_called()
+    mock_huginn_client.provision_channels.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_skips_agents_created_after_listing(
+    reconciler: AgentReconciler, mock_huginn_client: MagicMock, db_session: Session
+):
+    db_session.add(Channel(channel_name="new", huginn_rss_agent_id=50, huginn_post_agent_id=51))
+    db_session.commit()
+    mock_huginn_client.list_agents.return_value = [_agent(10, "Website Agent - not ours")]
+
+    report = await reconciler.run()
+
+    assert report["broken_channels"] == []
+    mock_huginn_client.delete_agent.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_replaces_broken_pack(
+    reconciler: AgentReconciler, mock_huginn_client: MagicMock, db_session: Session, monkeypatch
+):
+    monkeypatch.setattr('app.services.rss_agent_packs.settings.HUGINN_RSS_FEEDS_PER_AGENT', 3)
+    db_session.add(RssAgentPack(huginn_rss_agent_id=10, huginn_post_agent_id=11))
+    db_session.add_all([
+        Channel(channel_name=name, huginn_rss_agent_id=10, huginn_post_agent_id=11)
+        for name in ("a", "b")
+    ])
+    db_session.commit()
+    mock_huginn_client.list_agents.return_value = [
+        _agent(11, "Post Agent - pack-1"),
+        _agent(12, "Website Agent - not ours")
+    ]
+    mock_huginn_client.create_rss_agent.return_value = 20
+    mock_huginn_client.create_post_agent.return_value = 21
+
+    report = await reconciler.run()
+
+    assert report["broken_channels"] == ["a", "b"]
+    assert report["reprovisioned_channels"] == 2
+    mock_huginn_client.delete_agent.assert_awaited_once_with(11)
+    assert mock_huginn_client.create_rss_agent.await_args.args[1] == ["a", "b"]
+    db_session.expire_all()
+    assert [(p.huginn_rss_agent_id, p.huginn_post_agent_id) for p in db_session.query(RssAgentPack)] == [(20, 21)]
@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.exceptions.http_exceptions import ChannelUnavailable
+from app.models.channel import Channel
+from app.services.channel_metadata_cache import ChannelMetadata, ChannelMetadataCache
+from app.services.channel_service import ChannelService
+
+FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+    <title>Test - Telegram Channel</title>
+    <image><url>https://example.com/photo.jpg</url></image>
+</channel></rss>"""
+
+
+@pytest.mark.asyncio
+async def test_lookup_collapses_concurrent_requests():
+    cache = ChannelMetadataCache(ttl=60, negative_ttl=10)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "Test", "https://example.com/photo.jpg"
+
+    results = await asyncio.gather(*(cache.lookup("test", fetch) for _ in range(5)))
+
+    assert calls == 1
+    assert {(r.title, r.photo_url) for r in results} == {("Test", "https://example.com/photo.jpg")}
+    await cache.lookup("test", fetch)
+    assert calls == 1
+
+
+def test_cache_evicts_least_recently_used_channel():
+    cache = ChannelMetadataCache(ttl=60, negative_ttl=10, maxsize=2)
+    now = datetime.now(timezone.utc)
+    cache.put("first", ChannelMetadata("First", None, now))
+    cache.put("second", ChannelMetadata(None, None, now, "This channel is private or doesn't exist"))
+    cache.get("first")
+
+    cache.put("third", ChannelMetadata("Third", None, now))
+
+    assert len(cache) == 2
+    assert cache.get("second") is None
+    assert cache.get("first").title == "First"
+    assert cache.get("third").title == "Third"
+
+
+@pytest.mark.asyncio
+async def test_lookup_caches_unavailable_channels():
+    cache = ChannelMetadataCache(ttl=60, negative_ttl=10)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        raise ChannelUnavailable("This channel is private or doesn't exist")
+
+    for _ in range(2):
+        with pytest.raises(ChannelUnavailable):
+            await cache.lookup("private", fetch)
+    assert calls == 1
+
+    # Отрицательный результат живёт меньше положительного
+    entry = cache.get("private")
+    cache.put("private", ChannelMetadata(None, None, entry.checked_at - timedelta(seconds=11), entry.error))
+    assert cache.get("private") is None
+
+
+@pytest.mark.asyncio
+async def test_lookup_does_not_cache_transient_errors():
+    cache = ChannelMetadataCache(ttl=60, negative_ttl=10)
+
+    async def fetch():
+        raise HTTPException(status_code=400, detail="Timeout while checking channel availability")
+
+    with pytest.raises(HTTPException):
+        await cache.lookup("slow", fetch)
+    assert cache.get("slow") is None
+
+
+@pytest.fixture
+def rsshub_requests() -> list:
+    return []
+
+
+@pytest.fixture
+def rsshub_client(rsshub_requests: list) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        rsshub_requests.append(request)
+        return httpx.Response(200, content=FEED)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_get_channel_metadata_uses_fresh_channel_columns(
+    async_db_session, rsshub_client, rsshub_requests: list, db_session: Session
+):
+    channel = Channel(
+        channel_name="test", title="Cached", photo_url=None,
+        metadata_checked_at=datetime.now(timezone.utc)
+    )
+    db_session.add(channel)
+    db_session.commit()
+    service = ChannelService(async_db_session, http_client=rsshub_client)
+
+    stored = await service.channel_repository.get_by_channel_name("test")
+    metadata = await service._get_channel_metadata("test", stored)
+
+    assert metadata.title == "Cached"
+    assert rsshub_requests == []
+
+
+@pytest.mark.asyncio
+async def test_get_channel_metadata_refreshes_stale_channel(
+    async_db_session, rsshub_client, rsshub_requests: list, db_session: Session
+):
+    channel = Channel(
+        channel_name="test", title="Old",
+        metadata_checked_at=datetime.now(timezone.utc) - timedelta(days=1)
+    )
+    db_session.add(channel)
+    db_session.commit()
+    service = ChannelService(async_db_session, http_client=rsshub_client)
+
+    stored = await service.channel_repository.get_by_channel_name("test")
+    metadata = await service._get_channel_metadata("test", stored)
+
+    assert (metadata.title, metadata.photo_url) == ("Test", "https://example.com/photo.jpg")
+    assert len(rsshub_requests) == 1
+    db_session.refresh(channel)
+    assert channel.title == "Test"
+    assert channel.metadata_checked_at == metadata.checked_at
+
+
+@pytest.mark.asyncio
+async def test_check_channel_availability_private_channel(async_db_session):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503, content=b"Error: Unable to fetch message feed")
+
+    service = ChannelService(
+        async_db_session, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    with pytest.raises(ChannelUnavailable) as error:
+        await service._check_channel_availability("private")
+    assert error.value.detail == "This channel is private or doesn't exist"
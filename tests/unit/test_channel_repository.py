@@ -1,24 +1,48 @@
+import pytest
+
 from app.repositories.channel_repository import ChannelRepository
 from tests.factories.channel import create_test_channel
 
 
 class TestChannelRepository:
-    def test_create_channel(self, channel_repository: ChannelRepository):
+    @pytest.mark.asyncio
+    async def test_create_channel(self, channel_repository: ChannelRepository):
         channel = create_test_channel()
-        saved_channel = channel_repository.create(channel)
+        saved_channel = await channel_repository.create(channel)
         assert saved_channel.id is not None
         assert saved_channel.channel_name == "test_channel"
         assert saved_channel.is_monitored is True
 
-    def test_get_by_channel_name(self, channel_repository: ChannelRepository):
+    @pytest.mark.asyncio
+    async def test_get_by_channel_name(self, channel_repository: ChannelRepository):
         channel = create_test_channel()
-        channel_repository.create(channel)
+        await channel_repository.create(channel)
         
-        found_channel = channel_repository.get_by_channel_name("test_channel")
+        found_channel = await channel_repository.get_by_channel_name("test_channel")
         assert found_channel is not None
         assert found_channel.channel_name == "test_channel"
         assert found_channel.is_monitored is True
 
-    def test_get_by_channel_name_not_found(self, channel_repository: ChannelRepository):
-        found_channel = channel_repository.get_by_channel_name("nonexistent")
-        assert found_channel is None 
\ No newline at end of file
+    @pytest.mark.asyncio
+    async def test_get_by_channel_name_not_found(self, channel_repository: ChannelRepository):
+        found_channel = await channel_repository.get_by_channel_name("nonexistent")
+        assert found_channel is None
+
+    @pytest.mark.asyncio
+    async def test_list_page_with_dedicated_rss_agent(self, channel_repository: ChannelRepository, db_session):
+        from app.models.channel import Channel
+        from app.models.rss_agent_pack import RssAgentPack
+
+        db_session.add_all([
+            Channel(channel_name="dedicated", huginn_rss_agent_id=1, huginn_post_agent_id=2),
+            Channel(channel_name="packed", huginn_rss_agent_id=3, huginn_post_agent_id=4),
+            Channel(channel_name="no_agents"),
+            RssAgentPack(huginn_rss_agent_id=3, huginn_post_agent_id=4)
+        ])
+        db_session.commit()
+
+        dedicated = await channel_repository.list_page(10, has_dedicated_rss_agent=True)
+        others = await channel_repository.list_page(10, has_dedicated_rss_agent=False)
+
+        assert [row["channel_name"] for row in dedicated] == ["dedicated"]
+        assert [row["channel_name"] for row in others] == ["packed", "no_agents"]
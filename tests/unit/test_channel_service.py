@@ -1,4 +1,5 @@
 # tests/unit/test_channel_service.py
+import asyncio
 from unittest.mock import MagicMock
 
 import pytest
@@ -6,10 +7,12 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from app.models.channel import Channel
+from app.models.rss_agent_pack import RssAgentPack
+from app.models.shared_post_agent import SharedPostAgent
 from app.models.subscription import Subscription
 from app.schemas.channel import ChannelCreate
 from app.services.channel_service import ChannelService
-from app.services.huginn_client import HuginnClient
+from app.services.monitoring_backends import _teardown_tasks, _verification_tasks, verify_agents
 from tests.factories.channel import create_test_channel
 
 
@@ -19,7 +22,8 @@ class TestChannelService:
         channel_name = channel_service._extract_channel_name_from_url(url)
         assert channel_name == "test_channel"
 
-    def test_create_duplicate_channel(
+    @pytest.mark.asyncio
+    async def test_create_duplicate_channel(
         self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
     ):
         # Создаем первый канал через фабрику
@@ -34,11 +38,12 @@ class TestChannelService:
         )
         
         with pytest.raises(HTTPException) as exc:
-            channel_service.create_channel(new_channel_data)
+            await channel_service.create_channel(new_channel_data)
         assert exc.value.status_code == 400
         assert "Channel already exists" in str(exc.value.detail)
 
-    def test_delete_channel_calls_huginn_client(
+    @pytest.mark.asyncio
+    async def test_delete_channel_calls_huginn_client(
         self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
     ):
         # Создаем канал
@@ -59,14 +64,16 @@ class TestChannelService:
         db_session.add(subscription)
         db_session.commit()
 
-        channel_service.delete_channel(channel.id)
+        await channel_service.delete_channel(channel.id)
+        await asyncio.gather(*_teardown_tasks)
 
         mock_huginn_client.delete_agent.assert_any_call(1)
         mock_huginn_client.delete_agent.assert_any_call(2)
         assert mock_huginn_client.delete_agent.call_count == 2
 
-    def test_delete_channel_huginn_failure(
-        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
+    @pytest.mark.asyncio
+    async def test_delete_channel_huginn_failure(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session, caplog
     ):
         # Создаем канал с существующими агентами
         channel = Channel(
@@ -88,6 +95,256 @@ class TestChannelService:
 
         mock_huginn_client.delete_agent.side_effect = Exception("Huginn deletion error")
 
-        with pytest.raises(Exception) as exc:
-            channel_service.delete_channel(channel.id)
-        assert str(exc.value) == "Huginn deletion error" 
\ No newline at end of file
+        await channel_service.delete_channel(channel.id)
+        await asyncio.gather(*_teardown_tasks)
+
+        # Оставшихся агентов удалит сверка агентов
+        assert "Huginn deletion error" in caplog.text
+        assert db_session.query(Channel).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_delete_subscription_invalidates_route(
+        self, channel_service: ChannelService, db_session: Session
+    ):
+        channel = create_test_channel(channel_name="test_channel")
+        db_session.add(channel)
+        db_session.flush()
+        subscriptions = [
+            Subscription(channel_id=channel.id, callback_url="https://a.example.com/webhook"),
+            Subscription(channel_id=channel.id, callback_url="https://b.example.com/webhook")
+        ]
+        db_session.add_all(subscriptions)
+        db_session.commit()
+        channel_service.routing_cache.put("test_channel", channel.id, subscriptions)
+
+        await channel_service.delete_subscription(subscriptions[0].id)
+
+        assert channel_service.routing_cache.get("test_channel") is None
+
+    @pytest.mark.asyncio
+    async def test_create_channels_schedules_verification(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, monkeypatch
+    ):
+        monkeypatch.setattr('app.services.monitoring_backends.settings.HUGINN_VERIFY_AGENTS', True)
+        mock_huginn_client.provision_channels.return_value = {"test_channel": (1, 2)}
+
+        await channel_service.create_channels(["https://t.me/test_channel"])
+        await asyncio.gather(*_verification_tasks)
+
+        assert mock_huginn_client.get_agent_status.await_count == 2
+        mock_huginn_client.get_agent_links.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_verify_agents_reports_missing_links(self, mock_huginn_client: MagicMock, caplog):
+        documents = {
+            1: {"id": 1, "receiver_ids": [2], "source_ids": []},
+            2: {"id": 2, "receiver_ids": [], "source_ids": []}
+        }
+        mock_huginn_client.get_agent_status.side_effect = lambda agent_id: documents[agent_id]
+
+        await verify_agents(mock_huginn_client, 1, 2)
+
+        assert mock_huginn_client.get_agent_status.await_count == 2
+        assert "RSS agent 1 not found in Post agent sources" in caplog.text
+        assert "Post agent 2 not found" not in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_create_channels(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
+    ):
+        db_session.add(create_test_channel(channel_name="existing"))
+        db_session.commit()
+        mock_huginn_client.provision_channels.return_value = {"first": (1, 2), "second": (3, 4)}
+
+        created, existing = await channel_service.create_channels([
+            "https://t.me/first", "https://t.me/existing", "https://t.me/second", "https://t.me/first"
+        ])
+
+        mock_huginn_client.provision_channels.assert_awaited_once_with(["first", "second"], None)
+        assert [(c.channel_name, c.huginn_rss_agent_id, c.huginn_post_agent_id) for c in created] == [
+            ("first", 1, 2), ("second", 3, 4)
+        ]
+        assert [c.channel_name for c in existing] == ["existing"]
+        assert db_session.query(Channel).count() == 3
+
+    @pytest.mark.asyncio
+    async def test_create_channels_too_large(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, monkeypatch
+    ):
+        monkeypatch.setattr('app.services.channel_service.settings.CHANNEL_BATCH_MAX_SIZE', 1)
+
+        with pytest.raises(HTTPException) as exc:
+            await channel_service.create_channels(["https://t.me/first", "https://t.me/second"])
+        assert exc.value.status_code == 413
+        mock_huginn_client.provision_channels.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_channels_deletes_agents_when_save_fails(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, monkeypatch
+    ):
+        mock_huginn_client.provision_channels.return_value = {"first": (1, 2)}
+
+        async def fail(channels):
+            raise RuntimeError("db is down")
+
+        monkeypatch.setattr(channel_service.channel_repository, "create_many", fail)
+
+        with pytest.raises(HTTPException) as exc:
+            await channel_service.create_channels(["https://t.me/first"])
+        assert exc.value.status_code == 500
+        assert sorted(c.args[0] for c in mock_huginn_client.delete_agent.await_args_list) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_delete_subscription_keeps_shared_post_agent(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
+    ):
+        channel = Channel(
+            channel_name="test_channel",
+            is_monitored=True,
+            huginn_rss_agent_id=1,
+            huginn_post_agent_id=100
+        )
+        db_session.add_all([channel, SharedPostAgent(shard=0, huginn_agent_id=100)])
+        db_session.flush()
+        subscription = Subscription(channel_id=channel.id, callback_url="https://example.com/webhook")
+        db_session.add(subscription)
+        db_session.commit()
+
+        await channel_service.delete_subscription(subscription.id)
+        await asyncio.gather(*_teardown_tasks)
+
+        mock_huginn_client.delete_agent.assert_awaited_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_create_channels_with_shared_post_agents(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock,
+        db_session: Session, monkeypatch
+    ):
+        monkeypatch.setattr('app.services.channel_service.settings.HUGINN_SHARED_POST_AGENTS', 1)
+        mock_huginn_client.provision_channels.return_value = {"first": (1, 100), "second": (3, 100)}
+
+        created, _ = await channel_service.create_channels(["https://t.me/first", "https://t.me/second"])
+
+        mock_huginn_client.provision_channels.assert_awaited_once_with(
+            ["first", "second"], {"first": 0, "second": 0}
+        )
+        assert [c.huginn_post_agent_id for c in created] == [100, 100]
+        assert [(a.shard, a.huginn_agent_id) for a in db_session.query(SharedPostAgent)] == [(0, 100)]
+
+    @pytest.mark.asyncio
+    async def test_delete_subscription_removes_feed_from_pack(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
+    ):
+        db_session.add(RssAgentPack(huginn_rss_agent_id=1, huginn_post_agent_id=2))
+        channels = [
+            Channel(channel_name=name, huginn_rss_agent_id=1, huginn_post_agent_id=2)
+            for name in ("first", "second")
+        ]
+        db_session.add_all(channels)
+        db_session.flush()
+        subscription = Subscription(channel_id=channels[0].id, callback_url="https://example.com/webhook")
+        db_session.add(subscription)
+        db_session.commit()
+
+        await channel_service.delete_subscription(subscription.id)
+
+        mock_huginn_client.update_rss_agent_feeds.assert_awaited_once_with(1, ["second"])
+        mock_huginn_client.delete_agent.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_channels_with_native_poller(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, monkeypatch
+    ):
+        monkeypatch.setattr('app.services.channel_service.settings.RSS_POLLING_BACKEND', "native")
+        scheduled = []
+        monkeypatch.setattr('app.services.monitoring_backends.rss_poller.schedule', scheduled.append)
+
+        created, _ = await channel_service.create_channels(["https://t.me/first", "https://t.me/second"])
+
+        mock_huginn_client.provision_channels.assert_not_called()
+        assert [(c.channel_name, c.huginn_rss_agent_id) for c in created] == [("first", None), ("second", None)]
+        assert scheduled == ["first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_delete_subscriptions_by_callback_url(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
+    ):
+        db_session.add_all([
+            SharedPostAgent(shard=0, huginn_agent_id=9),
+            RssAgentPack(huginn_rss_agent_id=20, huginn_post_agent_id=21)
+        ])
+        shared = Channel(channel_name="shared", huginn_rss_agent_id=1, huginn_post_agent_id=2)
+        dedicated = Channel(channel_name="dedicated", huginn_rss_agent_id=3, huginn_post_agent_id=9)
+        packed = Channel(channel_name="packed", huginn_rss_agent_id=20, huginn_post_agent_id=21)
+        neighbour = Channel(channel_name="neighbour", huginn_rss_agent_id=20, huginn_post_agent_id=21)
+        db_session.add_all([shared, dedicated, packed, neighbour])
+        db_session.flush()
+        churned = "https://churned.com/webhook"
+        db_session.add_all([
+            Subscription(channel_id=shared.id, callback_url=churned),
+            Subscription(channel_id=shared.id, callback_url="https://other.com/webhook"),
+            Subscription(channel_id=dedicated.id, callback_url=churned),
+            Subscription(channel_id=packed.id, callback_url=churned),
+            Subscription(channel_id=neighbour.id, callback_url="https://other.com/webhook")
+        ])
+        db_session.commit()
+
+        summary = await channel_service.delete_subscriptions(callback_url=churned)
+        await asyncio.gather(*_teardown_tasks)
+
+        assert summary == {"deleted_subscriptions": 3, "released_channels": 2, "deleting_agents": 1}
+        # Общий Post агент остаётся, у пака убирается только фид канала
+        mock_huginn_client.delete_agent.assert_awaited_once_with(3)
+        mock_huginn_client.update_rss_agent_feeds.assert_awaited_once_with(20, ["neighbour"])
+        db_session.expire_all()
+        assert sorted(c.channel_name for c in db_session.query(Channel)) == ["neighbour", "shared"]
+        assert db_session.query(Subscription).count() == 2
+
+    @pytest.mark.asyncio
+    async def test_delete_subscriptions_by_ids(
+        self, channel_service: ChannelService, mock_huginn_client: MagicMock, db_session: Session
+    ):
+        channel = Channel(channel_name="test", huginn_rss_agent_id=1, huginn_post_agent_id=2)
+        db_session.add(channel)
+        db_session.flush()
+        subscriptions = [
+            Subscription(channel_id=channel.id, callback_url=f"https://example.com/{i}") for i in range(2)
+        ]
+        db_session.add_all(subscriptions)
+        db_session.commit()
+
+        summary = await channel_service.delete_subscriptions(subscription_ids=[subscriptions[0].id])
+
+        assert summary["released_channels"] == 0
+        assert not _teardown_tasks
+        assert db_session.query(Subscription).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_subscriptions_by_ids_and_callback_url(
+        self, channel_service: ChannelService, db_session: Session
+    ):
+        channel = Channel(channel_name="test")
+        db_session.add(channel)
+        db_session.flush()
+        own = Subscription(channel_id=channel.id, callback_url="https://own.com/webhook")
+        foreign = Subscription(channel_id=channel.id, callback_url="https://foreign.com/webhook")
+        kept = Subscription(channel_id=channel.id, callback_url="https://own.com/other")
+        db_session.add_all([own, foreign, kept])
+        db_session.commit()
+
+        # Фильтры пересекаются: чужая подписка из списка ID не удаляется
+        summary = await channel_service.delete_subscriptions(
+            subscription_ids=[own.id, foreign.id], callback_url="https://own.com/webhook"
+        )
+
+        assert summary["deleted_subscriptions"] == 1
+        db_session.expire_all()
+        assert sorted(s.callback_url for s in db_session.query(Subscription)) == [
+            "https://foreign.com/webhook", "https://own.com/other"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_delete_subscriptions_requires_filter(self, channel_service: ChannelService):
+        with pytest.raises(HTTPException) as error:
+            await channel_service.delete_subscriptions()
+        assert error.value.status_code == 400
@@ -0,0 +1,143 @@
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    CircuitState,
+)
+from app.utils.retry import async_retry
+
+
+def _fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_circuit_opens_when_failure_rate_exceeded():
+    breaker = CircuitBreaker("host", failure_rate=0.5, minimum_calls=4, cooldown=60)
+
+    breaker.before_call()
+    breaker.record_success()
+    _fail(breaker, 2)
+    assert breaker.state == CircuitState.CLOSED
+
+    _fail(breaker, 1)
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_circuit_half_open_after_cooldown(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.circuit_breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("host", minimum_calls=2, cooldown=30)
+    _fail(breaker, 2)
+    assert breaker.state == CircuitState.OPEN
+
+    now[0] += 31
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    # Только одна пробная попытка в полуоткрытом состоянии
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.snapshot()["calls_in_window"] == 0
+
+
+def test_failed_trial_call_reopens_circuit(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.circuit_breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("host", minimum_calls=2, cooldown=30)
+    _fail(breaker, 2)
+    now[0] += 31
+
+    _fail(breaker, 1)
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.snapshot()["retry_after"] == 30
+
+
+def test_registry_keeps_breaker_per_key():
+    registry = CircuitBreakerRegistry(minimum_calls=1)
+    _fail(registry.get("dead.example.com"), 1)
+
+    snapshot = registry.snapshot()
+    assert snapshot["dead.example.com"]["state"] == "open"
+    assert registry.get("alive.example.com").state == CircuitState.CLOSED
+
+
+def test_registry_evicts_idle_breakers():
+    """Above max_keys least recently used healthy breakers are dropped, open and failing ones are kept"""
+    registry = CircuitBreakerRegistry(max_keys=2, minimum_calls=1)
+    _fail(registry.get("dead.example.com"), 1)
+    registry.get("failing.example.com")._outcomes.append(False)
+    registry.get("alive.example.com").record_success()
+
+    registry.get("new.example.com")
+
+    assert set(registry.snapshot()) == {"dead.example.com", "failing.example.com", "new.example.com"}
+    assert registry.get("dead.example.com").state == CircuitState.OPEN
+
+
+@pytest.mark.asyncio
+async def test_async_retry_short_circuits_when_open():
+    """Once the circuit opens, remaining retries are skipped"""
+    registry = CircuitBreakerRegistry(minimum_calls=2, cooldown=60)
+    call = AsyncMock(side_effect=httpx.ConnectError("Connection refused"))
+
+    @async_retry(
+        retries=3,
+        delay=0,
+        exceptions=(httpx.HTTPError,),
+        circuit_breakers=registry,
+        circuit_key=lambda host: host
+    )
+    async def send(host: str):
+        return await call()
+
+    with pytest.raises(CircuitOpenError):
+        await send("dead.example.com")
+    assert call.call_count == 2
+
+    with pytest.raises(CircuitOpenError):
+        await send("dead.example.com")
+    assert call.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_send_to_callback_skipped_while_circuit_open(webhook_service, mock_http_client):
+    from app.services.webhook_service import callback_circuit_breakers
+    from tests.factories.post import create_test_parsed_post
+
+    webhook_service.http_client = mock_http_client
+    mock_http_client.post = AsyncMock()
+    breaker = callback_circuit_breakers.get("dead.example.com")
+    for _ in range(breaker.minimum_calls):
+        breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        await webhook_service._send_to_callback(
+            "http://dead.example.com/hook", create_test_parsed_post()
+        )
+    mock_http_client.post.assert_not_called()
+
+
+def test_monitoring_endpoint_exposes_circuit_state(client):
+    from app.services.webhook_service import callback_circuit_breakers
+
+    breaker = callback_circuit_breakers.get("dead.example.com")
+    for _ in range(breaker.minimum_calls):
+        breaker.record_failure()
+
+    response = client.get("/monitoring/circuit-breakers")
+
+    assert response.status_code == 200
+    assert response.json()["dead.example.com"]["state"] == "open"
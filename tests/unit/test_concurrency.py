@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.utils.concurrency import HostConcurrencyLimiter
+
+
+async def _track(limiter: HostConcurrencyLimiter, url: str, active: dict, peaks: dict):
+    async with limiter.limit(url):
+        active[url] = active.get(url, 0) + 1
+        active["total"] = active.get("total", 0) + 1
+        peaks[url] = max(peaks.get(url, 0), active[url])
+        peaks["total"] = max(peaks.get("total", 0), active["total"])
+        await asyncio.sleep(0.01)
+        active[url] -= 1
+        active["total"] -= 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_per_host_concurrency():
+    """Operations against one host never exceed the per-host limit"""
+    limiter = HostConcurrencyLimiter(max_concurrency=10, max_per_host=2)
+    active, peaks = {}, {}
+
+    await asyncio.gather(
+        *(_track(limiter, "http://slow.example.com/hook", active, peaks) for _ in range(6))
+    )
+
+    assert peaks["http://slow.example.com/hook"] == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_global_concurrency():
+    """Operations across hosts never exceed the global limit"""
+    limiter = HostConcurrencyLimiter(max_concurrency=3, max_per_host=2)
+    active, peaks = {}, {}
+
+    await asyncio.gather(
+        *(_track(limiter, f"http://host{i}.example.com/hook", active, peaks) for i in range(8))
+    )
+
+    assert peaks["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_evicts_idle_hosts():
+    """Only the configured number of host semaphores is kept once hosts are idle"""
+    limiter = HostConcurrencyLimiter(max_concurrency=10, max_per_host=2, max_hosts=3)
+    active, peaks = {}, {}
+
+    for i in range(10):
+        await _track(limiter, f"http://host{i}.example.com/hook", active, peaks)
+
+    assert len(limiter) == 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_keeps_busy_hosts():
+    """A host semaphore in use is not evicted, so its limit still holds"""
+    limiter = HostConcurrencyLimiter(max_concurrency=10, max_per_host=1, max_hosts=1)
+    active, peaks = {}, {}
+
+    await asyncio.gather(
+        *(_track(limiter, "http://slow.example.com/hook", active, peaks) for _ in range(3)),
+        *(_track(limiter, f"http://host{i}.example.com/hook", active, peaks) for i in range(5))
+    )
+
+    assert peaks["http://slow.example.com/hook"] == 1
+    assert len(limiter) == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from app.utils.feed_header import FeedTooLarge, parse_feed_header, read_prefix
+
+HEADER = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+    <title>Test - Telegram Channel</title>
+    <link>https://t.me/s/test</link>
+    <image><url>https://example.com/photo.jpg</url><title>Test</title></image>
+"""
+ITEM = b"<item><title>Post</title><description>" + b"x" * 1000 + b"</description></item>"
+
+
+async def _stream(data: bytes, chunk_size: int, consumed: list):
+    for i in range(0, len(data), chunk_size):
+        consumed.append(chunk_size)
+        yield data[i:i + chunk_size]
+
+
+@pytest.mark.asyncio
+async def test_parse_feed_header_stops_before_items():
+    feed = HEADER + ITEM * 100 + b"</channel></rss>"
+    consumed = []
+
+    title, photo_url = await parse_feed_header(_stream(feed, 64, consumed), max_bytes=len(feed))
+
+    assert title == "Test - Telegram Channel"
+    assert photo_url == "https://example.com/photo.jpg"
+    assert sum(consumed) < len(HEADER) + 64
+
+
+@pytest.mark.asyncio
+async def test_parse_feed_header_without_image():
+    feed = b"<rss><channel><title>Test</title>" + ITEM * 10 + b"</channel></rss>"
+
+    assert await parse_feed_header(_stream(feed, 64, []), max_bytes=len(feed)) == ("Test", None)
+
+
+@pytest.mark.asyncio
+async def test_parse_feed_header_byte_limit():
+    feed = b"<rss><channel><description>" + b"x" * 10000 + b"</description><title>Test</title></channel></rss>"
+
+    with pytest.raises(FeedTooLarge):
+        await parse_feed_header(_stream(feed, 512, []), max_bytes=1024)
+
+
+@pytest.mark.asyncio
+async def test_read_prefix():
+    assert await read_prefix(_stream(b"a" * 100, 30, []), max_bytes=50) == b"a" * 50
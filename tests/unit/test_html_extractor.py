@@ -0,0 +1,77 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from app.utils.html_extractor import extract_post_content
+
+
+def _reference_parse(html: str) -> tuple[str, list[str], list[str], list[str]]:
+    """Previous BeautifulSoup based implementation, kept to check compatibility"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text(separator=' ').strip()
+
+    links = []
+    for a in soup.find_all('a', href=True):
+        href = a.get('href')
+        if not any(ext in href.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.mp4']):
+            links.append(href)
+
+    images = []
+    for img in soup.find_all('img', src=True):
+        src = img.get('src')
+        if src and any(ext in src.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif']):
+            images.append(src)
+
+    videos = []
+    for video in soup.find_all('video', src=True):
+        src = video.get('src')
+        if src and '.mp4' in src.lower():
+            videos.append(src)
+
+    return text, links, images, videos
+
+
+TELEGRAM_POST = """
+<div class="tgme_widget_message_text">
+    <b>Новости</b> дня:<br/>
+    Читайте <a href="https://example.com/article?id=1&amp;ref=tg">статью</a>
+    и смотрите <a href="https://cdn.example.com/photo.JPG">фото</a>.<br>
+    <img src="https://cdn.example.com/image.png" alt="image"/>
+    <img src="https://cdn.example.com/icon.svg">
+    <video src="https://cdn.example.com/clip.mp4" controls></video>
+    <video src="https://cdn.example.com/clip.webm"></video>
+</div>
+"""
+
+
+@pytest.mark.parametrize("html", [
+    TELEGRAM_POST,
+    "",
+    "plain text without tags",
+    "<p>Hello <b>world</b></p><p>  </p>\n<p>again</p>",
+    "<p>a<script>var x = '<b>';</script>b<style>p {}</style>c</p>",
+    "<template><p>hidden</p></template><ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby>",
+    "<pre>  keep\n  spaces  </pre><textarea>   </textarea><p>   </p>",
+    "<p>&amp; &lt;tag&gt; &copy &notanentity; &#147;quoted&#148; &#x41;&#0;</p>",
+    "<!DOCTYPE html><!-- comment --><?php echo 1 ?><p>x<![CDATA[cdata]]>y</p>",
+    "<p>unclosed <b>bold <i>italic</p> tail</b></i> end",
+    "<br></br><img src='a.gif'></img><p>void</p></br>",
+    "<a>no href</a><a href>empty</a><a href='x' href='y.png'>dup</a>",
+    "<img src=''><img><video></video><video src='A.MP4'></video>",
+    "<A HREF='HTTP://EXAMPLE.COM/PAGE'>Upper</A><IMG SRC='PIC.JPEG'>",
+    "<p>a</p   ><p\n>b</p><div>\t\x0c</div>",
+])
+def test_extract_post_content_matches_beautifulsoup(html):
+    assert extract_post_content(html) == _reference_parse(html)
+
+
+def test_extract_post_content_result():
+    text, links, images, videos = extract_post_content(TELEGRAM_POST)
+
+    assert text.startswith("Новости")
+    assert "статью" in text
+    assert links == ["https://example.com/article?id=1&ref=tg"]
+    assert images == ["https://cdn.example.com/image.png"]
+    assert videos == ["https://cdn.example.com/clip.mp4"]
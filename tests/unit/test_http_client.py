@@ -0,0 +1,48 @@
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.http_client import HTTPClientPool
+from app.services.webhook_service import WebhookService
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_single_client():
+    """All callers get the same pooled client until the pool is closed"""
+    pool = HTTPClientPool()
+
+    client = pool.client
+    assert pool.client is client
+    assert client.timeout.read == settings.HTTP_TIMEOUT
+
+    await pool.close()
+    assert client.is_closed
+    assert pool.client is not client
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_mounts_dedicated_transport_per_host(monkeypatch):
+    """Hosts listed in HTTP_HOST_POOL_LIMITS get their own connection pool"""
+    monkeypatch.setattr(settings, "HTTP_HOST_POOL_LIMITS", {"callback.example.com": 5})
+    pool = HTTPClientPool()
+
+    client = pool.client
+    transport = client._transport_for_url(httpx.URL("https://callback.example.com/hook"))
+    default_transport = client._transport_for_url(httpx.URL("https://other.example.com/hook"))
+
+    assert transport is not default_transport
+    assert transport._pool._max_connections == 5
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_service_does_not_close_shared_client(db_session):
+    """Services must leave the shared client open for the next request"""
+    pool = HTTPClientPool()
+
+    async with WebhookService(db_session, http_client=pool.client) as service:
+        assert service.http_client is pool.client
+
+    assert not pool.client.is_closed
+    await pool.close()
@@ -1,240 +1,276 @@
 # ./tests/unit/test_huginn_client.py
-from unittest.mock import MagicMock, patch
+import json
 
+import httpx
 import pytest
-import requests
-from bs4 import BeautifulSoup
 
 from app.core.exceptions.http_exceptions import HTTPException
-from app.services.huginn_client import HuginnClient
+
+
+LOGIN_PAGE = '<html><meta name="csrf-token" content="fake-csrf-token"></html>'
 
 
 @pytest.fixture
-def mock_requests_session():
-    """
-    Фикстура для мокирования requests.Session.
-    Создает мок сессии с предустановленными успешными ответами для всех типов запросов.
-    Возвращает: MagicMock объект, имитирующий requests.Session
-    """
-    with patch('requests.Session') as mock:
-        session = MagicMock()
-        # Настраиваем успешные ответы по умолчанию
-        response = MagicMock()
-        response.status_code = 200
-        response.text = '<html><meta name="csrf-token" content="fake-csrf-token"></html>'
-        response.json.return_value = {"status": "ok"}
-        session.get.return_value = response
-        session.post.return_value = response
-        session.request.return_value = response
-        mock.return_value = session
-        yield session
+def huginn_requests():
+    """Запросы, полученные фейковым Huginn"""
+    return []
 
 
 @pytest.fixture
-def huginn_client(mock_requests_session):
+def async_huginn_client(huginn_requests, monkeypatch):
     """
-    Фикстура для создания тестового экземпляра HuginnClient.
-    Мокирует настройки и создает клиент с тестовыми параметрами.
-    Возвращает: Настроенный экземпляр HuginnClient
+    AsyncHuginnClient поверх httpx.MockTransport, имитирующего Huginn:
+    логин по CSRF-токену и JSON API агентов.
     """
-    with patch('app.services.huginn_client.settings') as mock_settings:
-        # Настраиваем тестовые настройки
-        mock_settings.HUGINN_URL = "http://test-huginn:3000"
-        mock_settings.HUGINN_ADMIN_USERNAME = "admin"
-        mock_settings.HUGINN_ADMIN_PASSWORD = "password"
-        
-        client = HuginnClient()
-        return client
-
-
-class TestHuginnClient:
-    def test_authenticate_success(self, mock_requests_session, huginn_client):
-        """
-        Тест успешной аутентификации в Huginn.
-        Проверяет:
-        - Корректный вызов GET и POST запросов
-        - Правильное извлечение и сохранение CSRF-токена
-        """
-        login_response = MagicMock()
-        login_response.status_code = 200
-        login_response.text = '<html><meta name="csrf-token" content="fake-csrf-token"></html>'
-        mock_requests_session.get.return_value = login_response
-        mock_requests_session.post.return_value = login_response
-
-        huginn_client._authenticate()
-        
-        assert mock_requests_session.get.called
-        assert mock_requests_session.post.called
-        assert huginn_client.csrf_token == "fake-csrf-token"
-
-    def test_authenticate_failed_login(self, mock_requests_session, huginn_client):
-        """
-        Тест неудачной аутентификации.
-        Проверяет:
-        - Корректную обработку ошибки аутентификации
-        - Генерацию правильного исключения с кодом 401
-        """
-        error_response = MagicMock()
-        error_response.status_code = 200
-        error_response.text = "Invalid Login or password"
-        mock_requests_session.post.return_value = error_response
+    from app.core.config import settings
+    from app.services.huginn_client import AsyncHuginnClient
+
+    monkeypatch.setattr(settings, "HUGINN_URL", "http://test-huginn:3000")
+    state = {"expired": False}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        huginn_requests.append(request)
+        if request.url.path == "/users/sign_in":
+            state["expired"] = False
+            return httpx.Response(200, text=LOGIN_PAGE)
+        if state["expired"]:
+            return httpx.Response(302, headers={"Location": "/users/sign_in"})
+        if request.url.path == "/agents.json":
+            return httpx.Response(201, json={"id": 1})
+        return httpx.Response(200, json={"id": 1, "source_ids": [3], "receiver_ids": [2]})
+
+    client = AsyncHuginnClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client.expire_session = lambda: state.update(expired=True)
+    return client
+
+
+class TestAsyncHuginnClient:
+    @pytest.mark.asyncio
+    async def test_authenticates_lazily(self, async_huginn_client, huginn_requests):
+        assert huginn_requests == []
+
+        agent_id = await async_huginn_client.create_rss_agent("test_channel")
+
+        assert agent_id == 1
+        assert [(r.method, r.url.path) for r in huginn_requests] == [
+            ("GET", "/users/sign_in"),
+            ("POST", "/users/sign_in"),
+            ("POST", "/agents.json")
+        ]
+        assert huginn_requests[-1].headers["X-CSRF-Token"] == "fake-csrf-token"
+        assert json.loads(huginn_requests[-1].content)["agent"]["type"] == "Agents::RssAgent"
+
+    @pytest.mark.asyncio
+    async def test_reauthenticates_on_redirect(self, async_huginn_client, huginn_requests):
+        await async_huginn_client.start_agent(1)
+        async_huginn_client.expire_session()
+        huginn_requests.clear()
+
+        links = await async_huginn_client.get_agent_links(1)
+
+        assert links == {"sources": [3], "receivers": [2]}
+        assert [(r.method, r.url.path) for r in huginn_requests] == [
+            ("GET", "/agents/1.json"),
+            ("GET", "/users/sign_in"),
+            ("POST", "/users/sign_in"),
+            ("GET", "/agents/1.json")
+        ]
+
+    @pytest.mark.asyncio
+    async def test_authenticate_failed_login(self, monkeypatch):
+        from app.core.config import settings
+        from app.services.huginn_client import AsyncHuginnClient
+
+        monkeypatch.setattr(settings, "HUGINN_URL", "http://test-huginn:3000")
+        client = AsyncHuginnClient(http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(
+                    200, text=LOGIN_PAGE if request.method == "GET" else "Invalid Login or password"
+                )
+            )
+        ))
 
         with pytest.raises(HTTPException) as exc:
-            huginn_client._authenticate()
+            await client.start_agent(1)
         assert exc.value.status_code == 401
 
-    def test_create_rss_agent_success(self, huginn_client, mock_requests_session):
-        """
-        Тест успешного создания RSS агента.
-        Проверяет:
-        - Корректное формирование POST запроса
-        - Правильные параметры создания агента
-        - Возврат ID созданного агента
-        """
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = {"id": 1}
-        mock_requests_session.request.return_value = response
-
-        agent_id = huginn_client.create_rss_agent("test_channel")
+    @pytest.mark.asyncio
+    async def test_create_post_agent(self, async_huginn_client, huginn_requests):
+        agent_id = await async_huginn_client.create_post_agent("test_channel")
 
         assert agent_id == 1
-        args, kwargs = mock_requests_session.request.call_args
-        assert args[0] == "POST"
-        assert "agents.json" in args[1]
-        assert kwargs['json']['agent']['type'] == "Agents::RssAgent"
-
-    def test_create_post_agent_success(self, huginn_client, mock_requests_session):
-        """
-        Тест успешного создания Post агента.
-        Проверяет:
-        - Корректное формирование POST запроса
-        - Правильные параметры создания агента
-        - Возврат ID созданного агента
-        """
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = {"id": 2}
-        mock_requests_session.request.return_value = response
-
-        agent_id = huginn_client.create_post_agent("test_channel")
-
-        assert agent_id == 2
-        args, kwargs = mock_requests_session.request.call_args
-        assert args[0] == "POST"
-        assert kwargs['json']['agent']['type'] == "Agents::PostAgent"
-
-    def test_link_agents_success(self, huginn_client, mock_requests_session):
-        """
-        Тест успешного связывания агентов.
-        Проверяет:
-        - Корректное формирование PUT запроса
-        - Правильные параметры связывания агентов
-        """
-        response = MagicMock()
-        response.status_code = 200
-        mock_requests_session.request.return_value = response
-
-        huginn_client.link_agents(1, 2)
-
-        args, kwargs = mock_requests_session.request.call_args
-        assert args[0] == "PUT"
-        assert "/agents/1.json" in args[1]
-        assert kwargs['json']['agent']['receiver_ids'] == [2]
-
-    def test_delete_agent_success(self, huginn_client, mock_requests_session):
-        """
-        Тест успешного удаления агента.
-        Проверяет:
-        - Корректное формирование DELETE запроса
-        - Правильный URL для удаления агента
-        """
-        response = MagicMock()
-        response.status_code = 200
-        mock_requests_session.request.return_value = response
-
-        huginn_client.delete_agent(1)
-
-        args, kwargs = mock_requests_session.request.call_args
-        assert args[0] == "DELETE"
-        assert "/agents/1.json" in args[1]
-
-    def test_get_agent_status_success(self, huginn_client, mock_requests_session):
-        """
-        Тест получения статуса агента.
-        Проверяет:
-        - Корректное формирование GET запроса
-        - Правильную обработку ответа
-        - Возврат статуса агента
-        """
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = {"status": "ok"}
-        mock_requests_session.request.return_value = response
-
-        status = huginn_client.get_agent_status(1)
-
-        assert status == {"status": "ok"}
-        args, kwargs = mock_requests_session.request.call_args
-        assert args[0] == "GET"
-        assert "/agents/1.json" in args[1]
-
-    def test_get_agent_links_success(self, huginn_client, mock_requests_session):
-        """
-        Тест получения связей агента.
-        Проверяет:
-        - Корректное формирование GET запроса
-        - Правильную обработку ответа с информацией о связях
-        - Возврат структурированных данных о связях
-        """
-        response = MagicMock()
-        response.status_code = 200
-        response.json.return_value = {
-            "source_ids": [1],
-            "receiver_ids": [2]
-        }
-        mock_requests_session.request.return_value = response
-
-        links = huginn_client.get_agent_links(1)
-
-        assert links == {"sources": [1], "receivers": [2]}
-        args, kwargs = mock_requests_session.request.call_args
-        assert args[0] == "GET"
-        assert "/agents/1.json" in args[1]
-
-    def test_make_authenticated_request_retry_auth(self, huginn_client, mock_requests_session):
-        """
-        Тест повторной аутентификации при истечении сессии.
-        Проверяет:
-        - Обработку 302 редиректа (признак истечения сессии)
-        - Повторную попытку запроса после реаутентификации
-        - Успешное выполнение запроса после повторной аутентификации
-        """
-        redirect_response = MagicMock()
-        redirect_response.status_code = 302
-        success_response = MagicMock()
-        success_response.status_code = 200
-        success_response.json.return_value = {"data": "success"}
-        
-        mock_requests_session.request.side_effect = [redirect_response, success_response]
-
-        response = huginn_client._make_authenticated_request("GET", "/test")
-
-        assert response.status_code == 200
-        assert mock_requests_session.request.call_count >= 2
-
-    def test_make_authenticated_request_error(self, huginn_client, mock_requests_session):
-        """
-        Тест обработки ошибок при выполнении запроса.
-        Проверяет:
-        - Корректную обработку ошибки сервера (500)
-        - Генерацию соответствующего исключения
-        """
-        error_response = MagicMock()
-        error_response.status_code = 500
-        error_response.text = "Internal Server Error"
-        mock_requests_session.request.return_value = error_response
+        request = huginn_requests[-1]
+        assert (request.method, request.url.path) == ("POST", "/agents.json")
+        assert json.loads(request.content)["agent"]["type"] == "Agents::PostAgent"
+
+    @pytest.mark.asyncio
+    async def test_delete_agent(self, async_huginn_client, huginn_requests):
+        await async_huginn_client.delete_agent(1)
+
+        request = huginn_requests[-1]
+        assert (request.method, request.url.path) == ("DELETE", "/agents/1.json")
+
+    @pytest.mark.asyncio
+    async def test_link_agents(self, async_huginn_client, huginn_requests):
+        await async_huginn_client.link_agents(1, 2)
+
+        request = huginn_requests[-1]
+        assert (request.method, request.url.path) == ("PUT", "/agents/1.json")
+        assert json.loads(request.content)["agent"]["receiver_ids"] == [2]
+
+    @pytest.mark.asyncio
+    async def test_request_error(self, async_huginn_client):
+        from app.services.huginn_client import AsyncHuginnClient
+
+        client = AsyncHuginnClient(http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(
+                    200 if request.url.path == "/users/sign_in" else 500,
+                    text=LOGIN_PAGE if request.url.path == "/users/sign_in" else "Internal Server Error"
+                )
+            )
+        ))
+
+        with pytest.raises(HTTPException) as exc:
+            await client.delete_agent(1)
+        assert exc.value.status_code == 500
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused_between_requests(self, async_huginn_client, huginn_requests):
+        await async_huginn_client.create_rss_agent("test_channel")
+        await async_huginn_client.create_post_agent("test_channel")
+        await async_huginn_client.start_agent(1)
+
+        logins = [r for r in huginn_requests if r.url.path == "/users/sign_in"]
+        assert len(logins) == 2  # GET и POST страницы входа один раз
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_login(self, async_huginn_client, huginn_requests):
+        import asyncio
+
+        await async_huginn_client.start_agent(1)
+        async_huginn_client.expire_session()
+        huginn_requests.clear()
+
+        results = await asyncio.gather(*(async_huginn_client.get_agent_status(1) for _ in range(10)))
+
+        assert all(result["id"] == 1 for result in results)
+        logins = [r for r in huginn_requests if r.url.path == "/users/sign_in"]
+        assert len(logins) == 2
+
+
+@pytest.fixture
+def scenario_huginn_client(huginn_requests, monkeypatch):
+    """
+    Фейковый Huginn с импортом сценариев: агенты получают id по порядку,
+    GET /agents.json отдаёт их постранично, новые первыми.
+    """
+    from app.core.config import settings
+    from app.services.huginn_client import AsyncHuginnClient
+
+    monkeypatch.setattr(settings, "HUGINN_URL", "http://test-huginn:3000")
+    agents = [{"id": 1, "guid": "unrelated-agent"}]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        huginn_requests.append(request)
+        if request.url.path == "/users/sign_in":
+            return httpx.Response(200, text=LOGIN_PAGE)
+        if request.url.path == "/scenarios/import":
+            form = dict(httpx.QueryParams(request.content.decode()))
+            scenario = json.loads(form["scenario_import[data]"])
+            for agent in scenario["agents"]:
+                agents.append({"id": len(agents) + 1, "guid": agent["guid"]})
+            return httpx.Response(302, headers={"Location": "http://test-huginn:3000/scenarios/7"})
+        if request.url.path == "/agents.json":
+            page = int(request.url.params["page"])
+            newest_first = agents[::-1]
+            return httpx.Response(200, json=newest_first[(page - 1) * 3:page * 3])
+        return httpx.Response(404)
+
+    return AsyncHuginnClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+class TestScenarioProvisioning:
+    def test_build_channels_scenario(self):
+        from app.services.huginn_client import build_channels_scenario
+
+        scenario = build_channels_scenario(["first", "second"])
+
+        assert [agent["type"] for agent in scenario["agents"]] == [
+            "Agents::RssAgent", "Agents::PostAgent", "Agents::RssAgent", "Agents::PostAgent"
+        ]
+        assert [agent["guid"] for agent in scenario["agents"]] == [
+            "timon-rss-first", "timon-post-first", "timon-rss-second", "timon-post-second"
+        ]
+        assert scenario["agents"][2]["options"]["url"] == ["http://rsshub:1200/telegram/channel/second"]
+        assert scenario["links"] == [{"source": 0, "receiver": 1}, {"source": 2, "receiver": 3}]
+
+    @pytest.mark.asyncio
+    async def test_provision_channels_with_one_import(self, scenario_huginn_client, huginn_requests):
+        agent_ids = await scenario_huginn_client.provision_channels(["first", "second"])
+
+        assert agent_ids == {"first": (2, 3), "second": (4, 5)}
+        imports = [r for r in huginn_requests if r.url.path == "/scenarios/import"]
+        assert len(imports) == 1
+        # Агентов 5, страница по 3: первая страница читается одна, затем сразу две
+        pages = sorted(r.url.params["page"] for r in huginn_requests if r.url.path == "/agents.json")
+        assert pages == ["1", "2", "3"]
+
+    @pytest.mark.asyncio
+    async def test_import_scenario_failure(self, monkeypatch):
+        from app.core.config import settings
+        from app.services.huginn_client import AsyncHuginnClient, build_channels_scenario
+
+        monkeypatch.setattr(settings, "HUGINN_URL", "http://test-huginn:3000")
+        # Ошибка валидации: Huginn заново отдаёт форму импорта
+        client = AsyncHuginnClient(http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, text=LOGIN_PAGE))
+        ))
 
         with pytest.raises(HTTPException) as exc:
-            huginn_client._make_authenticated_request("GET", "/test")
-        assert exc.value.status_code == 500
\ No newline at end of file
+            await client.import_scenario(build_channels_scenario(["first"]))
+        assert exc.value.status_code == 500
+
+    @pytest.mark.asyncio
+    async def test_provision_channels_with_shared_post_agents(self, scenario_huginn_client, huginn_requests):
+        from app.services.huginn_client import build_channels_scenario
+
+        scenario = build_channels_scenario(["first", "second", "third"], {"first": 0, "second": 1, "third": 0})
+        assert [agent["guid"] for agent in scenario["agents"]] == [
+            "timon-rss-first", "timon-post-shared-0", "timon-rss-second",
+            "timon-post-shared-1", "timon-rss-third"
+        ]
+        assert scenario["links"] == [
+            {"source": 0, "receiver": 1}, {"source": 2, "receiver": 3}, {"source": 4, "receiver": 1}
+        ]
+
+        agent_ids = await scenario_huginn_client.provision_channels(["first", "second"], {"first": 0, "second": 0})
+
+        assert agent_ids == {"first": (2, 3), "second": (4, 3)}
+
+    @pytest.mark.asyncio
+    async def test_get_agent_ids_by_guid_stops_when_all_found(self, scenario_huginn_client, huginn_requests):
+        from app.services.huginn_client import build_channels_scenario
+
+        await scenario_huginn_client.import_scenario(build_channels_scenario([f"channel_{i}" for i in range(10)]))
+        huginn_requests.clear()
+
+        # 21 агент по 3 на странице, самый старый из искомых на седьмой
+        agent_ids = await scenario_huginn_client.get_agent_ids_by_guid(
+            {"timon-rss-channel_0", "timon-post-channel_9"}, concurrency=4
+        )
+
+        assert agent_ids == {"timon-rss-channel_0": 2, "timon-post-channel_9": 21}
+        pages = sorted(int(r.url.params["page"]) for r in huginn_requests if r.url.path == "/agents.json")
+        assert pages == list(range(1, 8))
+
+    @pytest.mark.asyncio
+    async def test_list_agents_fetches_all_pages(self, scenario_huginn_client, huginn_requests):
+        await scenario_huginn_client.provision_channels(["first", "second", "third"])
+
+        agents = await scenario_huginn_client.list_agents(concurrency=2)
+
+        assert sorted(agent["id"] for agent in agents) == list(range(1, 8))
+        pages = [r.url.params["page"] for r in huginn_requests if r.url.path == "/agents.json"]
+        # 7 агентов по 3 на странице: третья страница неполная, четвёртая пустая
+        assert pages[-4:] == ["1", "2", "3", "4"]
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.channel import Channel
+from app.models.outbox import OutboxMessage, OutboxStatus
+from app.models.subscription import Subscription
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.outbox_worker import OutboxWorkerPool
+
+
+@pytest.fixture
+def subscription(db_session: Session) -> Subscription:
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    subscription = Subscription(channel_id=channel.id, callback_url="http://callback.com/webhook")
+    db_session.add(subscription)
+    db_session.commit()
+    return subscription
+
+
+@pytest.fixture
+def http_client() -> MagicMock:
+    client = MagicMock()
+    client.post = AsyncMock(return_value=MagicMock(status_code=200))
+    return client
+
+
+@pytest.fixture
+def worker_pool(async_session_factory, http_client) -> OutboxWorkerPool:
+    return OutboxWorkerPool(
+        workers=1,
+        session_factory=async_session_factory,
+        http_client_factory=lambda: http_client
+    )
+
+
+def _enqueue(db_session: Session, subscription: Subscription, count: int = 1) -> None:
+    db_session.add_all([
+        OutboxMessage(
+            subscription_id=subscription.id,
+            callback_url=subscription.callback_url,
+            post_guid=f"guid_{i}",
+            payload=b'{"guid": "guid"}'
+        )
+        for i in range(count)
+    ])
+    db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_claim_batch_skips_claimed_rows(
+    db_session: Session, subscription: Subscription, async_session_factory: async_sessionmaker[AsyncSession]
+):
+    """A claimed row is leased and not returned to another worker"""
+    _enqueue(db_session, subscription, count=3)
+
+    async with async_session_factory() as first_db, async_session_factory() as second_db:
+        first = await OutboxRepository(first_db).claim_batch(limit=2, lease_seconds=60)
+        second = await OutboxRepository(second_db).claim_batch(limit=2, lease_seconds=60)
+
+    assert len(first) == 2
+    assert len(second) == 1
+    assert {row.id for row in first}.isdisjoint({row.id for row in second})
+    assert all(row.attempts == 1 for row in first + second)
+
+
+@pytest.mark.asyncio
+async def test_claim_batch_skips_rows_locked_by_other_transaction(
+    db_session: Session, subscription: Subscription, engine,
+    async_session_factory: async_sessionmaker[AsyncSession]
+):
+    """Rows locked by a concurrent claim are skipped instead of waited for"""
+    _enqueue(db_session, subscription, count=1)
+
+    locking_session = Session(bind=engine)
+    locking_session.query(OutboxMessage).with_for_update().all()
+    try:
+        async with async_session_factory() as db:
+            rows = await OutboxRepository(db).claim_batch(limit=10, lease_seconds=60)
+        assert rows == []
+    finally:
+        locking_session.rollback()
+        locking_session.close()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_marks_delivered(
+    worker_pool: OutboxWorkerPool, http_client: MagicMock, db_session: Session, subscription
+):
+    _enqueue(db_session, subscription)
+
+    processed = await worker_pool.process_batch()
+
+    assert processed == 1
+    http_client.post.assert_called_once()
+    assert http_client.post.call_args[1]["content"] == b'{"guid": "guid"}'
+    message = db_session.query(OutboxMessage).one()
+    db_session.refresh(message)
+    assert message.status == OutboxStatus.DELIVERED
+    assert message.delivered_at is not None
+
+
+@pytest.mark.asyncio
+async def test_process_batch_schedules_retry_on_failure(
+    worker_pool: OutboxWorkerPool, http_client: MagicMock, db_session: Session, subscription
+):
+    http_client.post.return_value = MagicMock(status_code=500)
+    _enqueue(db_session, subscription)
+
+    await worker_pool.process_batch()
+
+    message = db_session.query(OutboxMessage).one()
+    db_session.refresh(message)
+    assert message.status == OutboxStatus.PENDING
+    assert message.attempts == 1
+    assert message.last_error == "HTTP 500"
+    assert message.next_attempt_at > datetime.now(timezone.utc)
+    # Повторная попытка еще не наступила
+    assert await worker_pool.process_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_process_batch_gives_up_after_max_attempts(
+    worker_pool: OutboxWorkerPool, http_client: MagicMock, db_session: Session, subscription, monkeypatch
+):
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 1)
+    http_client.post.side_effect = httpx.ConnectError("Connection refused")
+    _enqueue(db_session, subscription)
+
+    await worker_pool.process_batch()
+
+    message = db_session.query(OutboxMessage).one()
+    db_session.refresh(message)
+    assert message.status == OutboxStatus.FAILED
+    assert "ConnectError" in message.last_error
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_claimed_again(
+    worker_pool: OutboxWorkerPool, http_client: MagicMock, db_session: Session, subscription,
+    async_session_factory: async_sessionmaker[AsyncSession]
+):
+    """Messages claimed by a crashed worker are delivered after the lease expires"""
+    _enqueue(db_session, subscription)
+    async with async_session_factory() as db:
+        await OutboxRepository(db).claim_batch(limit=10, lease_seconds=60)
+
+    message = db_session.query(OutboxMessage).one()
+    message.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    assert await worker_pool.process_batch() == 1
+    db_session.refresh(message)
+    assert message.status == OutboxStatus.DELIVERED
+    assert message.attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_process_batch_skips_host_with_open_circuit(
+    worker_pool: OutboxWorkerPool, http_client: MagicMock, db_session: Session, subscription
+):
+    """Messages to a host with an open circuit wait for the cooldown without using up attempts"""
+    from app.services.webhook_service import callback_circuit_breakers
+
+    breaker = callback_circuit_breakers.get("callback.com")
+    for _ in range(breaker.minimum_calls):
+        breaker.record_failure()
+    _enqueue(db_session, subscription, count=2)
+
+    for _ in range(settings.OUTBOX_MAX_ATTEMPTS + 1):
+        await worker_pool.process_batch()
+        db_session.query(OutboxMessage).update({"next_attempt_at": datetime.now(timezone.utc)})
+        db_session.commit()
+
+    http_client.post.assert_not_called()
+    messages = db_session.query(OutboxMessage).order_by(OutboxMessage.id).all()
+    assert all(m.status == OutboxStatus.PENDING for m in messages)
+    assert [m.attempts for m in messages] == [0, 0]
+    assert "is open" in messages[0].last_error
+
+    await worker_pool.process_batch()
+    db_session.expire_all()
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=breaker.cooldown)
+    for message in db_session.query(OutboxMessage):
+        assert abs(message.next_attempt_at - retry_at) < timedelta(seconds=5)
+
+
+@pytest.mark.asyncio
+async def test_process_batch_keeps_subscriber_order(
+    worker_pool: OutboxWorkerPool, http_client: MagicMock, db_session: Session, subscription
+):
+    """After a failed delivery later messages of the subscriber wait without losing an attempt"""
+    http_client.post.side_effect = [MagicMock(status_code=500)]
+    _enqueue(db_session, subscription, count=3)
+
+    await worker_pool.process_batch()
+
+    http_client.post.assert_called_once()
+    messages = db_session.query(OutboxMessage).order_by(OutboxMessage.id).all()
+    assert [m.attempts for m in messages] == [1, 0, 0]
+    assert all(m.status == OutboxStatus.PENDING for m in messages)
+    assert messages[1].next_attempt_at >= messages[0].next_attempt_at - timedelta(seconds=1)
+
+
+@pytest.mark.asyncio
+async def test_cleanup_deletes_old_finished_messages(
+    worker_pool: OutboxWorkerPool, db_session: Session, subscription, monkeypatch
+):
+    """Delivered and failed rows past the retention period are deleted, pending ones are kept"""
+    monkeypatch.setattr(settings, "OUTBOX_RETENTION_SECONDS", 3600)
+    monkeypatch.setattr(settings, "OUTBOX_CLEANUP_BATCH_SIZE", 1)
+    _enqueue(db_session, subscription, count=5)
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    messages = db_session.query(OutboxMessage).order_by(OutboxMessage.id).all()
+    for message, status, created_at in zip(messages, [
+        OutboxStatus.DELIVERED, OutboxStatus.FAILED, OutboxStatus.PENDING,
+        OutboxStatus.DELIVERED, OutboxStatus.DELIVERED
+    ], [old, old, old, old, datetime.now(timezone.utc)]):
+        message.status = status
+        message.created_at = created_at
+    db_session.commit()
+    kept_ids = [messages[2].id, messages[4].id]
+
+    assert await worker_pool.cleanup() == 3
+
+    db_session.expire_all()
+    assert [m.id for m in db_session.query(OutboxMessage).order_by(OutboxMessage.id)] == kept_ids
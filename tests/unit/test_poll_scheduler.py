@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.repositories.channel_repository import ChannelRepository
+from app.services.poll_scheduler import PollScheduler, observed_interval, schedule_tier
+from tests.factories.post import create_test_post_webhook
+
+NOW = datetime(2024, 3, 20, 12, 0, tzinfo=timezone.utc)
+HOUR = 60 * 60
+
+
+@pytest.mark.parametrize("interval, current, expected", [
+    (60, 0, 0),
+    (2 * HOUR, 0, 1),
+    # Чуть выше порога every_5m: без запаса гистерезиса остаёмся на every_1m
+    (1.1 * HOUR, 0, 0),
+    # Чуть ниже порога every_5m: с every_5m не уходим
+    (0.9 * HOUR, 1, 1),
+    (0.5 * HOUR, 1, 0),
+    (30 * 24 * HOUR, 0, 3),
+    (None, 2, 2),
+])
+def test_schedule_tier(interval, current, expected):
+    assert schedule_tier(interval, current, hysteresis=0.25) == expected
+
+
+def test_schedule_tier_bounds(monkeypatch):
+    monkeypatch.setattr('app.services.poll_scheduler.settings.ADAPTIVE_POLLING_MAX_SCHEDULE', "every_30m")
+    monkeypatch.setattr('app.services.poll_scheduler.settings.ADAPTIVE_POLLING_MIN_SCHEDULE', "every_5m")
+
+    assert schedule_tier(30 * 24 * HOUR, 0, hysteresis=0.25) == 2
+    assert schedule_tier(60, 0, hysteresis=0.25) == 1
+
+
+def test_observed_interval_counts_silence():
+    channel = Channel(post_interval_ewma=600.0, last_post_at=NOW - timedelta(minutes=5))
+    assert observed_interval(channel, NOW) == 600.0
+
+    channel.last_post_at = NOW - timedelta(days=3)
+    assert observed_interval(channel, NOW) == 3 * 24 * HOUR
+
+    assert observed_interval(Channel(created_at=NOW - timedelta(hours=2)), NOW) == 2 * HOUR
+
+
+@pytest.mark.asyncio
+async def test_record_post_updates_ewma(channel_repository: ChannelRepository, db_session: Session):
+    channel = Channel(channel_name="test_channel")
+    db_session.add(channel)
+    db_session.commit()
+
+    for minutes in (0, 10, 30):
+        await channel_repository.record_post(channel.id, NOW + timedelta(minutes=minutes), alpha=0.5)
+    # Пост старше последнего не учитывается
+    await channel_repository.record_post(channel.id, NOW + timedelta(minutes=5), alpha=0.5)
+    await channel_repository.db.commit()
+
+    db_session.refresh(channel)
+    assert channel.last_post_at == NOW + timedelta(minutes=30)
+    assert channel.post_interval_ewma == pytest.approx(0.5 * 1200 + 0.5 * 600)
+
+
+@pytest.mark.asyncio
+async def test_process_post_records_activity(webhook_service, db_session: Session, monkeypatch):
+    monkeypatch.setattr('app.services.webhook_service.settings.ADAPTIVE_POLLING_ENABLED', True)
+    channel = Channel(channel_name="test_channel")
+    db_session.add(channel)
+    db_session.commit()
+
+    await webhook_service.process_post(create_test_post_webhook(date_published=NOW.isoformat()))
+
+    db_session.refresh(channel)
+    assert channel.last_post_at == NOW
+
+
+@pytest.mark.asyncio
+async def test_process_post_records_activity_in_guid_transaction(
+    webhook_service, db_session: Session, monkeypatch
+):
+    """The posting rate is committed with the post guid, without a commit of its own"""
+    monkeypatch.setattr('app.services.webhook_service.settings.ADAPTIVE_POLLING_ENABLED', True)
+    channel = Channel(channel_name="test_channel")
+    db_session.add(channel)
+    db_session.commit()
+
+    commit = MagicMock(wraps=webhook_service.db.commit)
+    monkeypatch.setattr(webhook_service.db, "commit", commit)
+    await webhook_service.process_batch([
+        create_test_post_webhook(id=f"guid_{i}", date_published=(NOW + timedelta(minutes=i)).isoformat())
+        for i in range(3)
+    ])
+
+    assert commit.call_count == 1
+    db_session.refresh(channel)
+    assert channel.last_post_at == NOW + timedelta(minutes=2)
+    assert channel.post_interval_ewma == pytest.approx(60.0)
+
+
+@pytest.mark.asyncio
+async def test_run_once_moves_agents_between_tiers(
+    async_session_factory, mock_huginn_client: MagicMock, db_session: Session
+):
+    now = datetime.now(timezone.utc)
+    db_session.add_all([
+        # Активный канал остаётся на every_1m
+        Channel(channel_name="hot", huginn_rss_agent_id=1, post_interval_ewma=60.0, last_post_at=now),
+        # Редкий канал уходит на every_1h
+        Channel(channel_name="cold", huginn_rss_agent_id=2, post_interval_ewma=10 * 24 * HOUR, last_post_at=now),
+        # Пак опрашивается так часто, как нужно самому активному каналу
+        Channel(channel_name="packed_cold", huginn_rss_agent_id=3, poll_schedule="every_1h",
+                post_interval_ewma=10 * 24 * HOUR, last_post_at=now),
+        Channel(channel_name="packed_hot", huginn_rss_agent_id=3, poll_schedule="every_1h",
+                post_interval_ewma=60.0, last_post_at=now),
+    ])
+    db_session.commit()
+    scheduler = PollScheduler(async_session_factory, lambda: mock_huginn_client)
+
+    assert await scheduler.run_once() == {2: "every_1h", 3: "every_1m"}
+
+    mock_huginn_client.update_agent_schedule.assert_any_await(2, "every_1h")
+    mock_huginn_client.update_agent_schedule.assert_any_await(3, "every_1m")
+    schedules = {c.channel_name: c.poll_schedule for c in db_session.query(Channel)}
+    assert schedules == {"hot": None, "cold": "every_1h", "packed_cold": "every_1m", "packed_hot": "every_1m"}
+
+    # Повторный запуск ничего не меняет
+    assert await scheduler.run_once() == {}
@@ -0,0 +1,56 @@
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.config import settings
+from app.core.process_pool import ProcessPool
+from app.utils.html_extractor import extract_post_content
+
+
+@pytest.mark.asyncio
+async def test_process_pool_runs_function_in_worker():
+    pool = ProcessPool(max_workers=1)
+    html = "<p>Hello <a href='https://example.com'>world</a></p>"
+    try:
+        result = await pool.run(extract_post_content, html)
+    finally:
+        await pool.close()
+
+    assert result == extract_post_content(html)
+
+
+@pytest.mark.asyncio
+async def test_large_post_is_parsed_in_pool(webhook_service, monkeypatch):
+    monkeypatch.setattr(settings, "HTML_PARSE_OFFLOAD_THRESHOLD", 100)
+    html = "<p>" + "long text " * 20 + "</p>"
+    webhook_service.parse_pool = ProcessPool(max_workers=1)
+    webhook_service.parse_pool.run = AsyncMock(return_value=extract_post_content(html))
+
+    result = await webhook_service._parse_post_content(html)
+
+    webhook_service.parse_pool.run.assert_awaited_once_with(extract_post_content, html)
+    assert result == extract_post_content(html)
+
+
+@pytest.mark.asyncio
+async def test_small_post_is_parsed_inline(webhook_service, monkeypatch):
+    monkeypatch.setattr(settings, "HTML_PARSE_OFFLOAD_THRESHOLD", 100)
+    webhook_service.parse_pool = ProcessPool(max_workers=1)
+    webhook_service.parse_pool.run = AsyncMock()
+
+    text, _, _, _ = await webhook_service._parse_post_content("<p>short</p>")
+
+    webhook_service.parse_pool.run.assert_not_called()
+    assert text == "short"
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_falls_back_to_inline(webhook_service, monkeypatch):
+    monkeypatch.setattr(settings, "HTML_PARSE_OFFLOAD_THRESHOLD", 10)
+    webhook_service.parse_pool = ProcessPool(max_workers=1)
+    webhook_service.parse_pool.run = AsyncMock(side_effect=BrokenProcessPool("worker died"))
+
+    text, _, _, _ = await webhook_service._parse_post_content("<p>long enough text</p>")
+
+    assert text == "long enough text"
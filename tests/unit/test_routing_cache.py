@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from app.models.channel import Channel
+from app.models.subscription import Subscription
+from app.services.routing_cache import RoutingCache
+
+
+def test_routing_cache_put_and_get():
+    cache = RoutingCache(ttl=60)
+    subscription = Subscription(id=5, channel_id=1, callback_url="http://callback.com/hook")
+
+    cache.put("test_channel", 1, [subscription])
+    route = cache.get("test_channel")
+
+    assert route.channel_id == 1
+    assert [(s.id, s.callback_url) for s in route.subscriptions] == [(5, "http://callback.com/hook")]
+    assert cache.get("other_channel") is None
+
+
+def test_routing_cache_invalidate():
+    cache = RoutingCache(ttl=60)
+    cache.put("test_channel", 1, [])
+
+    cache.invalidate("test_channel")
+
+    assert cache.get("test_channel") is None
+
+
+def test_routing_cache_skips_put_after_invalidate():
+    """A route loaded before an invalidation is returned but not cached"""
+    cache = RoutingCache(ttl=60)
+    subscription = Subscription(id=5, channel_id=1, callback_url="http://callback.com/hook")
+
+    generation = cache.generation()
+    cache.invalidate("test_channel")
+    route = cache.put("test_channel", 1, [subscription], generation=generation)
+
+    assert route.subscriptions[0].id == 5
+    assert cache.get("test_channel") is None
+
+    cache.put("test_channel", 1, [], generation=cache.generation())
+    assert cache.get("test_channel").subscriptions == ()
+
+
+def test_routing_cache_forgets_old_invalidations(monkeypatch):
+    """Invalidations are kept for ttl, older loads are still not cached"""
+    cache = RoutingCache(ttl=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    generation = cache.generation()
+    for i in range(100):
+        cache.invalidate(f"deleted_{i}")
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    cache.invalidate("test_channel")
+
+    assert list(cache._invalidated) == ["test_channel"]
+    cache.put("deleted_0", 1, [], generation=generation)
+    assert cache.get("deleted_0") is None
+    cache.put("deleted_0", 1, [], generation=cache.generation())
+    assert cache.get("deleted_0") is not None
+
+
+@pytest.mark.asyncio
+async def test_route_load_racing_with_unsubscribe_is_not_cached(webhook_service):
+    """An unsubscribe landing while the route is read from the database is not overwritten"""
+    from unittest.mock import patch
+
+    cache = webhook_service.routing_cache
+    channel = Channel(id=1, channel_name="test_channel", is_monitored=True)
+    subscription = Subscription(id=5, channel_id=1, callback_url="http://callback.com/hook")
+
+    async def load_then_unsubscribe(channel_id):
+        cache.invalidate("test_channel")
+        return [subscription]
+
+    with patch.object(webhook_service.repository, 'get_by_channel_name', return_value=channel), \
+         patch.object(webhook_service.subscription_repository, 'get_active_by_channel_id',
+                      side_effect=load_then_unsubscribe):
+        route = await webhook_service._get_route("test_channel")
+
+    assert [s.id for s in route.subscriptions] == [5]
+    assert cache.get("test_channel") is None
+
+
+def test_routing_cache_expires_after_ttl(monkeypatch):
+    cache = RoutingCache(ttl=10)
+    cache.put("test_channel", 1, [])
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    assert cache.get("test_channel") is None
+
+
+@pytest.mark.asyncio
+async def test_routing_cache_warm(db_session, async_db_session):
+    first = Channel(channel_name="first", is_monitored=True)
+    second = Channel(channel_name="second", is_monitored=True)
+    db_session.add_all([first, second])
+    db_session.flush()
+    db_session.add_all([
+        Subscription(channel_id=first.id, callback_url="http://a.com/hook", is_active=True),
+        Subscription(channel_id=first.id, callback_url="http://b.com/hook", is_active=False)
+    ])
+    db_session.commit()
+
+    cache = RoutingCache(ttl=60)
+    assert await cache.warm(async_db_session) == 2
+
+    assert [s.callback_url for s in cache.get("first").subscriptions] == ["http://a.com/hook"]
+    assert cache.get("second").subscriptions == ()
@@ -0,0 +1,158 @@
+from itertools import count
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.models.rss_agent_pack import RssAgentPack
+from app.services.rss_agent_packs import RssAgentPacks
+from app.services.shared_post_agents import SharedPostAgents
+
+
+@pytest.fixture
+def rss_agent_packs(async_db_session, mock_huginn_client, monkeypatch) -> RssAgentPacks:
+    monkeypatch.setattr('app.services.rss_agent_packs.settings.HUGINN_RSS_FEEDS_PER_AGENT', 3)
+    agent_ids = count(100)
+    mock_huginn_client.create_rss_agent.side_effect = lambda *args: next(agent_ids)
+    mock_huginn_client.create_post_agent.side_effect = lambda *args: next(agent_ids)
+    return RssAgentPacks(
+        async_db_session,
+        mock_huginn_client,
+        SharedPostAgents(async_db_session, mock_huginn_client)
+    )
+
+
+def _add_channels(db_session: Session, names: list[str], rss_agent_id=None, post_agent_id=None):
+    db_session.add_all([
+        Channel(channel_name=name, huginn_rss_agent_id=rss_agent_id, huginn_post_agent_id=post_agent_id)
+        for name in names
+    ])
+    db_session.commit()
+
+
+def _pack_members(db_session: Session) -> dict[int, list[str]]:
+    db_session.expire_all()
+    members = {}
+    for channel in db_session.query(Channel).order_by(Channel.id):
+        members.setdefault(channel.huginn_rss_agent_id, []).append(channel.channel_name)
+    return members
+
+
+@pytest.mark.asyncio
+async def test_add_channels_creates_packs(
+    rss_agent_packs: RssAgentPacks, mock_huginn_client: MagicMock, db_session: Session
+):
+    names = ["a", "b", "c", "d"]
+    _add_channels(db_session, names)
+
+    agent_ids = await rss_agent_packs.add_channels(names)
+
+    assert mock_huginn_client.create_rss_agent.await_count == 2
+    feeds = sorted(call.args[1] for call in mock_huginn_client.create_rss_agent.await_args_list)
+    assert feeds == [["a", "b", "c"], ["d"]]
+    assert agent_ids["a"] == agent_ids["c"] != agent_ids["d"]
+    assert sorted(_pack_members(db_session).values()) == [["a", "b", "c"], ["d"]]
+    assert db_session.query(RssAgentPack).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_add_channels_fills_fullest_pack(
+    rss_agent_packs: RssAgentPacks, mock_huginn_client: MagicMock, db_session: Session
+):
+    db_session.add_all([
+        RssAgentPack(huginn_rss_agent_id=1, huginn_post_agent_id=2),
+        RssAgentPack(huginn_rss_agent_id=3, huginn_post_agent_id=4)
+    ])
+    _add_channels(db_session, ["a"], 1, 2)
+    _add_channels(db_session, ["b", "c"], 3, 4)
+    _add_channels(db_session, ["new"])
+
+    assert await rss_agent_packs.add_channels(["new"]) == {"new": (3, 4)}
+
+    mock_huginn_client.update_rss_agent_feeds.assert_awaited_once_with(3, ["b", "c", "new"])
+    mock_huginn_client.create_rss_agent.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_add_channels_reverts_packs_on_failure(
+    rss_agent_packs: RssAgentPacks, mock_huginn_client: MagicMock, db_session: Session
+):
+    """A failure after packs were created or updated leaves packs and channels as they were"""
+    db_session.add(RssAgentPack(huginn_rss_agent_id=1, huginn_post_agent_id=2))
+    _add_channels(db_session, ["a", "b"], 1, 2)
+    _add_channels(db_session, ["new1", "new2", "new3"])
+
+    with patch.object(
+        rss_agent_packs.channel_repository, 'set_agent_ids_by_group', side_effect=RuntimeError("db is gone")
+    ):
+        with pytest.raises(RuntimeError):
+            await rss_agent_packs.add_channels(["new1", "new2", "new3"])
+
+    assert [c.args for c in mock_huginn_client.update_rss_agent_feeds.await_args_list] == [
+        (1, ["a", "b", "new1"]),
+        (1, ["a", "b"])
+    ]
+    # Агенты нового пака удалены вместе с ним
+    assert sorted(c.args[0] for c in mock_huginn_client.delete_agent.await_args_list) == [100, 101]
+    db_session.expire_all()
+    assert [p.huginn_rss_agent_id for p in db_session.query(RssAgentPack)] == [1]
+    assert _pack_members(db_session) == {1: ["a", "b"], None: ["new1", "new2", "new3"]}
+
+
+@pytest.mark.asyncio
+async def test_remove_channel(
+    rss_agent_packs: RssAgentPacks, mock_huginn_client: MagicMock, db_session: Session
+):
+    db_session.add(RssAgentPack(huginn_rss_agent_id=1, huginn_post_agent_id=2))
+    _add_channels(db_session, ["a", "b"], 1, 2)
+    channel_a, channel_b = db_session.query(Channel).order_by(Channel.id).all()
+
+    await rss_agent_packs.remove_channel(channel_a)
+    mock_huginn_client.update_rss_agent_feeds.assert_awaited_once_with(1, ["b"])
+    mock_huginn_client.delete_agent.assert_not_called()
+
+    db_session.delete(channel_a)
+    db_session.commit()
+    await rss_agent_packs.remove_channel(channel_b)
+
+    # Последний канал пака: агенты и сам пак удаляются
+    assert sorted(c.args[0] for c in mock_huginn_client.delete_agent.await_args_list) == [1, 2]
+    assert db_session.query(RssAgentPack).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_rebalance_merges_draining_packs(
+    rss_agent_packs: RssAgentPacks, mock_huginn_client: MagicMock, db_session: Session
+):
+    db_session.add_all([
+        RssAgentPack(huginn_rss_agent_id=1, huginn_post_agent_id=2),
+        RssAgentPack(huginn_rss_agent_id=3, huginn_post_agent_id=4)
+    ])
+    _add_channels(db_session, ["a"], 1, 2)
+    _add_channels(db_session, ["b", "c"], 3, 4)
+
+    assert await rss_agent_packs.rebalance() == 1
+
+    mock_huginn_client.update_rss_agent_feeds.assert_awaited_once_with(3, ["b", "c", "a"])
+    assert sorted(c.args[0] for c in mock_huginn_client.delete_agent.await_args_list) == [1, 2]
+    assert _pack_members(db_session) == {3: ["a", "b", "c"]}
+
+    # Паки заполнены, делать нечего
+    assert await rss_agent_packs.rebalance() == 0
+
+
+@pytest.mark.asyncio
+async def test_pack_dedicated_channels(
+    rss_agent_packs: RssAgentPacks, mock_huginn_client: MagicMock, db_session: Session, monkeypatch
+):
+    # Каналы переносятся страницами по одному, второй дополняет пак первого
+    monkeypatch.setattr('app.services.rss_agent_packs.PACK_PAGE_SIZE', 1)
+    _add_channels(db_session, ["a"], 1, 2)
+    _add_channels(db_session, ["b"], 3, 4)
+
+    summary = await rss_agent_packs.pack_dedicated_channels()
+
+    assert summary == {"packed_channels": 2, "deleted_agents": 4}
+    mock_huginn_client.create_rss_agent.assert_awaited_once()
+    assert list(_pack_members(db_session).values()) == [["a", "b"]]
@@ -0,0 +1,139 @@
+import httpx
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.models.outbox import OutboxMessage
+from app.models.subscription import Subscription
+from app.services.rss_poller import FeedState, RssPoller, parse_feed_items, poller_shard
+
+
+def _feed(*guids: int) -> bytes:
+    items = "".join(
+        f"""<item>
+            <title>Post {guid}</title>
+            <description><![CDATA[<p>Post <a href="https://example.com">{guid}</a></p>]]></description>
+            <pubDate>Wed, 20 Mar 2024 12:0{guid}:00 GMT</pubDate>
+            <guid>https://t.me/test_channel/{guid}</guid>
+            <link>https://t.me/test_channel/{guid}</link>
+        </item>"""
+        for guid in guids
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <rss version="2.0"><channel><title>Test - Telegram Channel</title>{items}</channel></rss>""".encode()
+
+
+@pytest.fixture
+def feed_responses():
+    return []
+
+
+@pytest.fixture
+def rss_poller(async_session_factory, feed_responses) -> RssPoller:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return feed_responses.pop(0)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    poller = RssPoller(session_factory=async_session_factory, http_client_factory=lambda: http_client)
+    poller.requests = requests
+    return poller
+
+
+def test_parse_feed_items():
+    post = parse_feed_items(_feed(1))[0]
+
+    assert post.guid == post.url == "https://t.me/test_channel/1"
+    assert post.title == "Post 1"
+    assert post.content == '<p>Post <a href="https://example.com">1</a></p>'
+    assert post.date_published == "2024-03-20T12:01:00+00:00"
+
+
+@pytest.mark.asyncio
+async def test_poll_channel_processes_new_items(
+    rss_poller: RssPoller, feed_responses: list, db_session: Session
+):
+    channel = Channel(channel_name="test_channel")
+    db_session.add(channel)
+    db_session.commit()
+    db_session.add(Subscription(channel_id=channel.id, callback_url="https://example.com/hook"))
+    db_session.commit()
+    feed_responses.extend([
+        httpx.Response(200, content=_feed(1, 2), headers={"ETag": '"v1"'}),
+        httpx.Response(304),
+        httpx.Response(200, content=_feed(2, 3), headers={"ETag": '"v2"'})
+    ])
+    state = FeedState()
+
+    assert await rss_poller.poll_channel("test_channel", state) == 2
+    assert await rss_poller.poll_channel("test_channel", state) == 0
+    assert await rss_poller.poll_channel("test_channel", state) == 1
+
+    assert rss_poller.requests[0].url == "http://rsshub:1200/telegram/channel/test_channel"
+    assert "If-None-Match" not in rss_poller.requests[0].headers
+    assert rss_poller.requests[1].headers["If-None-Match"] == '"v1"'
+    assert state.etag == '"v2"'
+    db_session.expire_all()
+    assert db_session.query(Channel).one().feed_etag == '"v2"'
+    guids = sorted(message.post_guid for message in db_session.query(OutboxMessage))
+    assert guids == [f"https://t.me/test_channel/{guid}" for guid in (1, 2, 3)]
+
+
+@pytest.mark.asyncio
+async def test_poll_channel_keeps_state_on_error(rss_poller: RssPoller, feed_responses: list):
+    feed_responses.append(httpx.Response(503))
+    state = FeedState(etag='"v1"', seen_guids={"guid"})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await rss_poller.poll_channel("test_channel", state)
+
+    assert state.etag == '"v1"'
+    assert state.seen_guids == {"guid"}
+
+
+@pytest.mark.asyncio
+async def test_refresh_channels(rss_poller: RssPoller, db_session: Session):
+    db_session.add_all([
+        Channel(channel_name="first"),
+        Channel(channel_name="second"),
+        Channel(channel_name="stopped", is_monitored=False)
+    ])
+    db_session.commit()
+
+    await rss_poller.refresh_channels()
+    assert set(rss_poller._feeds) == {"first", "second"}
+
+    db_session.query(Channel).filter(Channel.channel_name == "second").delete()
+    db_session.commit()
+    await rss_poller.refresh_channels()
+    assert set(rss_poller._feeds) == {"first"}
+
+
+@pytest.mark.asyncio
+async def test_refresh_channels_restores_feed_validators(rss_poller: RssPoller, db_session: Session):
+    db_session.add(Channel(
+        channel_name="first", feed_etag='"v1"', feed_last_modified="Wed, 20 Mar 2024 12:00:00 GMT"
+    ))
+    db_session.commit()
+
+    await rss_poller.refresh_channels()
+
+    state = rss_poller._feeds["first"]
+    assert (state.etag, state.last_modified) == ('"v1"', "Wed, 20 Mar 2024 12:00:00 GMT")
+
+
+@pytest.mark.asyncio
+async def test_refresh_channels_polls_own_shard(rss_poller: RssPoller, db_session: Session, monkeypatch):
+    monkeypatch.setattr('app.services.rss_poller.settings.NATIVE_POLLER_SHARDS', 2)
+    names = [f"channel{i}" for i in range(10)]
+    db_session.add_all([Channel(channel_name=name) for name in names])
+    db_session.commit()
+
+    await rss_poller.refresh_channels()
+    rss_poller.schedule("channel_new")
+
+    owned = {name for name in names + ["channel_new"] if poller_shard(name, 2) == 0}
+    assert set(rss_poller._feeds) == owned
+    assert 0 < len(owned) < len(names) + 1
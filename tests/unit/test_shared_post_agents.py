@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.models.shared_post_agent import SharedPostAgent
+from app.services.shared_post_agents import SharedPostAgents, post_agent_shard
+
+
+@pytest.fixture
+def shared_post_agents(async_db_session, mock_huginn_client, monkeypatch) -> SharedPostAgents:
+    monkeypatch.setattr('app.services.shared_post_agents.settings.HUGINN_SHARED_POST_AGENTS', 2)
+    return SharedPostAgents(async_db_session, mock_huginn_client)
+
+
+def test_post_agent_shard_is_stable():
+    assert post_agent_shard("test_channel", 4) == post_agent_shard("test_channel", 4)
+    assert {post_agent_shard(f"channel_{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_relink_channels(
+    shared_post_agents: SharedPostAgents, mock_huginn_client: MagicMock, db_session: Session, monkeypatch
+):
+    # Каналы читаются страницами по одному
+    monkeypatch.setattr('app.services.shared_post_agents.RELINK_PAGE_SIZE', 1)
+    names = ["first", "second"]
+    shards = {name: post_agent_shard(name, 2) for name in names}
+    db_session.add_all([
+        Channel(channel_name="first", huginn_rss_agent_id=1, huginn_post_agent_id=2),
+        Channel(channel_name="second", huginn_rss_agent_id=3, huginn_post_agent_id=4),
+        Channel(channel_name="no_agents")
+    ])
+    db_session.commit()
+    mock_huginn_client.create_shared_post_agent.side_effect = lambda shard: 100 + shard
+
+    summary = await shared_post_agents.relink_channels()
+
+    assert summary == {"relinked_channels": 2, "deleted_post_agents": 2, "failed_channels": 0}
+    mock_huginn_client.link_agents.assert_any_await(1, 100 + shards["first"])
+    mock_huginn_client.link_agents.assert_any_await(3, 100 + shards["second"])
+    assert sorted(c.args[0] for c in mock_huginn_client.delete_agent.await_args_list) == [2, 4]
+
+    db_session.expire_all()
+    post_agents = {c.channel_name: c.huginn_post_agent_id for c in db_session.query(Channel)}
+    assert post_agents == {"first": 100 + shards["first"], "second": 100 + shards["second"], "no_agents": None}
+
+    # Повторный запуск ничего не меняет
+    mock_huginn_client.link_agents.reset_mock()
+    summary = await shared_post_agents.relink_channels()
+    assert summary["relinked_channels"] == 0
+    mock_huginn_client.link_agents.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_relink_channels_keeps_shared_agent_of_old_shard(
+    shared_post_agents: SharedPostAgents, mock_huginn_client: MagicMock, db_session: Session
+):
+    shard = post_agent_shard("first", 2)
+    db_session.add_all([
+        Channel(channel_name="first", huginn_rss_agent_id=1, huginn_post_agent_id=50),
+        SharedPostAgent(shard=5, huginn_agent_id=50),
+        SharedPostAgent(shard=shard, huginn_agent_id=100)
+    ])
+    db_session.commit()
+
+    summary = await shared_post_agents.relink_channels()
+
+    assert summary == {"relinked_channels": 1, "deleted_post_agents": 0, "failed_channels": 0}
+    mock_huginn_client.link_agents.assert_awaited_once_with(1, 100)
+    mock_huginn_client.create_shared_post_agent.assert_not_called()
+    mock_huginn_client.delete_agent.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_agent_id_deletes_agent_losing_concurrent_creation(
+    shared_post_agents: SharedPostAgents, mock_huginn_client: MagicMock, db_session: Session
+):
+    shard = post_agent_shard("first", 2)
+
+    async def create_concurrently(shard):
+        # Другой процесс успел сохранить своего агента для шарда
+        db_session.add(SharedPostAgent(shard=shard, huginn_agent_id=100))
+        db_session.commit()
+        return 200
+
+    mock_huginn_client.create_shared_post_agent.side_effect = create_concurrently
+
+    assert await shared_post_agents.get_agent_id("first") == 100
+    mock_huginn_client.create_shared_post_agent.assert_awaited_once_with(shard)
+    mock_huginn_client.delete_agent.assert_awaited_once_with(200)
@@ -99,18 +99,19 @@ def test_extract_channel_name(webhook_service):
 def mock_http_client():
     """Create a mock HTTP client"""
     client = MagicMock()
-    client.post = AsyncMock()
-    client.post.return_value.status_code = 200
+    client.post = AsyncMock(return_value=MagicMock(status_code=200))
     return client
 
 
 @pytest.fixture
-def webhook_service(db_session):
-    """Create WebhookService instance with mocked HTTP client"""
-    service = WebhookService(db_session)
+def webhook_service(async_db_session):
+    """Create WebhookService instance with mocked HTTP client, direct delivery and no deduplication"""
+    service = WebhookService(async_db_session)
+    service.use_outbox = False
+    service.post_repository = MagicMock()
+    service.post_repository.insert_if_absent = AsyncMock(return_value=True)
     service.http_client = MagicMock()
-    service.http_client.post = AsyncMock()
-    service.http_client.post.return_value.status_code = 200
+    service.http_client.post = AsyncMock(return_value=MagicMock(status_code=200))
     return service
 
 
@@ -168,6 +169,28 @@ async def test_send_to_callback_failure(webhook_service, mock_http_client):
     assert "Failed to send callback request" in str(exc_info.value.detail) 
 
 
+@pytest.mark.asyncio
+async def test_send_to_callback_releases_limiter_between_retries(webhook_service, mock_http_client):
+    """Backoff sleeps between attempts do not hold the concurrency slots"""
+    from app.utils.concurrency import HostConcurrencyLimiter
+    from tests.factories.post import create_test_post_webhook
+
+    webhook_service.limiter = HostConcurrencyLimiter(max_concurrency=1, max_per_host=1)
+    webhook_service.http_client = mock_http_client
+    mock_http_client.post.side_effect = [httpx.ConnectError("refused"), MagicMock(status_code=200)]
+    slots_free_during_backoff = []
+
+    async def sleep(delay):
+        slots_free_during_backoff.append(not webhook_service.limiter._global.locked())
+
+    post = await webhook_service._build_parsed_post(create_test_post_webhook(), "test_channel")
+    with patch("app.utils.retry.asyncio.sleep", side_effect=sleep):
+        await webhook_service._send_to_callback("http://test-callback.com", post)
+
+    assert mock_http_client.post.call_count == 2
+    assert slots_free_during_backoff == [True]
+
+
 def test_parse_rfc822_date(webhook_service):
     """Test parsing RFC 822 date format."""
     test_date = "2024-01-14T12:00:00Z"  # ISO format date string
@@ -183,8 +206,8 @@ def test_parse_rfc822_date(webhook_service):
 @pytest.mark.asyncio
 async def test_webhook_service_context_manager():
     """Test WebhookService as async context manager."""
-    from app.db.session import get_db
-    db = next(get_db())
+    from app.db.session import AsyncSessionLocal
+    db = AsyncSessionLocal()
     
     async with WebhookService(db) as service:
         assert isinstance(service.http_client, httpx.AsyncClient)
@@ -195,8 +218,8 @@ async def test_webhook_service_context_manager():
 
 def test_webhook_service_init():
     """Test WebhookService initialization."""
-    from app.db.session import get_db
-    db = next(get_db())
+    from app.db.session import AsyncSessionLocal
+    db = AsyncSessionLocal()
     
     service = WebhookService(db)
     assert service.repository is not None
@@ -289,4 +312,350 @@ async def test_process_webhook_invalid_url(webhook_service):
         assert "Channel not found" in str(exc_info.value.detail)
         
         # Verify repository was called with extracted channel name
-        mock_get.assert_called_once()
\ No newline at end of file
+        mock_get.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_process_webhook_delivers_concurrently(webhook_service):
+    """Test that deliveries to subscribers run concurrently"""
+    import asyncio
+    import time
+
+    from app.models.subscription import Subscription
+    from tests.factories.post import create_test_post_webhook
+
+    post = create_test_post_webhook(url="https://t.me/test_channel/1234")
+    channel = Channel(id=1, channel_name="test_channel", is_monitored=True)
+    subscriptions = [
+        Subscription(id=i, channel_id=1, callback_url=f"http://callback{i}.com/webhook", is_active=True)
+        for i in range(5)
+    ]
+
+    async def slow_post(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return MagicMock(status_code=200)
+
+    webhook_service.http_client.post = AsyncMock(side_effect=slow_post)
+
+    with patch.object(webhook_service.repository, 'get_by_channel_name', return_value=channel), \
+         patch.object(webhook_service.subscription_repository, 'get_active_by_channel_id',
+                      return_value=subscriptions):
+        start = time.monotonic()
+        await webhook_service.process_post(post)
+        elapsed = time.monotonic() - start
+
+    assert webhook_service.http_client.post.call_count == 5
+    assert elapsed < 0.6
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_enqueues_outbox_deliveries(webhook_service, db_session):
+    """With outbox enabled posts are stored for delivery instead of being sent"""
+    from app.models.outbox import OutboxMessage, OutboxStatus
+    from app.models.subscription import Subscription
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add_all([
+        Subscription(channel_id=channel.id, callback_url="http://callback1.com/webhook"),
+        Subscription(channel_id=channel.id, callback_url="http://callback2.com/webhook")
+    ])
+    db_session.commit()
+
+    webhook_service.use_outbox = True
+    await webhook_service.process_post(
+        create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1234")
+    )
+
+    messages = db_session.query(OutboxMessage).order_by(OutboxMessage.id).all()
+    assert [m.callback_url for m in messages] == [
+        "http://callback1.com/webhook",
+        "http://callback2.com/webhook"
+    ]
+    assert all(m.status == OutboxStatus.PENDING for m in messages)
+    assert all(m.post_guid == "guid_1" for m in messages)
+    assert messages[0].payload == messages[1].payload
+    webhook_service.http_client.post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_serializes_post_once(webhook_service):
+    """The payload is encoded once and the same buffer is sent to every subscriber"""
+    import json
+
+    from app.models.subscription import Subscription
+    from tests.factories.post import create_test_post_webhook
+
+    post = create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1234")
+    channel = Channel(id=1, channel_name="test_channel", is_monitored=True)
+    subscriptions = [
+        Subscription(id=i, channel_id=1, callback_url=f"http://callback{i}.com/webhook", is_active=True)
+        for i in range(3)
+    ]
+
+    with patch.object(webhook_service.repository, 'get_by_channel_name', return_value=channel), \
+         patch.object(webhook_service.subscription_repository, 'get_active_by_channel_id',
+                      return_value=subscriptions), \
+         patch.object(webhook_service, '_serialize_post', wraps=webhook_service._serialize_post) as serialize:
+        await webhook_service.process_post(post)
+
+    serialize.assert_called_once()
+    payloads = [call[1]["content"] for call in webhook_service.http_client.post.call_args_list]
+    assert len(payloads) == 3
+    assert all(payload is payloads[0] for payload in payloads)
+
+    data = json.loads(payloads[0])
+    assert data["guid"] == "guid_1"
+    assert data["link"] == "https://t.me/test_channel/1234"
+    assert data["raw_content"] == post.content
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_skips_subscription_deleted_after_caching(webhook_service, db_session):
+    """A subscription deleted by another process while its route is cached does not fail the post"""
+    from app.models.outbox import OutboxMessage
+    from app.models.post import Post
+    from app.models.subscription import Subscription
+    from app.repositories.post_repository import PostRepository
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    kept = Subscription(channel_id=channel.id, callback_url="http://callback1.com/webhook")
+    deleted = Subscription(channel_id=channel.id, callback_url="http://callback2.com/webhook")
+    db_session.add_all([kept, deleted])
+    db_session.commit()
+
+    webhook_service.use_outbox = True
+    webhook_service.post_repository = PostRepository(webhook_service.db)
+    await webhook_service.process_post(
+        create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1")
+    )
+    assert webhook_service.routing_cache.get("test_channel") is not None
+
+    # Удаление в другом процессе не сбрасывает локальный кэш маршрутов
+    db_session.delete(deleted)
+    db_session.commit()
+
+    await webhook_service.process_post(
+        create_test_post_webhook(id="guid_2", url="https://t.me/test_channel/2")
+    )
+
+    messages = db_session.query(OutboxMessage).filter(OutboxMessage.post_guid == "guid_2").all()
+    assert [m.callback_url for m in messages] == ["http://callback1.com/webhook"]
+    assert db_session.query(Post).filter(Post.guid == "guid_2").count() == 1
+    assert webhook_service.routing_cache.get("test_channel") is None
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_skips_duplicate_posts(webhook_service, db_session):
+    """A re-sent guid is recorded once and delivered once"""
+    from app.models.post import Post
+    from app.models.subscription import Subscription
+    from app.repositories.post_repository import PostRepository
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channel.id, callback_url="http://callback1.com/webhook"))
+    db_session.commit()
+
+    webhook_service.post_repository = PostRepository(webhook_service.repository.db)
+    post = create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1234")
+
+    await webhook_service.process_post(post)
+    await webhook_service.process_post(post)
+
+    # Повтор из другого процесса: кэш пуст, дубликат отсекает ограничение в БД
+    webhook_service.recent_post_guids.clear()
+    await webhook_service.process_post(post)
+
+    assert webhook_service.http_client.post.call_count == 1
+    assert db_session.query(Post).filter(Post.guid == "guid_1").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_duplicate_from_cache_skips_db(webhook_service):
+    """A guid seen recently is skipped without touching the database"""
+    from tests.factories.post import create_test_post_webhook
+
+    webhook_service.routing_cache.put("test_channel", 1, [])
+    webhook_service.recent_post_guids.add((1, "guid_1"))
+
+    with patch.object(webhook_service.repository, 'get_by_channel_name') as mock_get, \
+         patch.object(webhook_service.subscription_repository, 'get_active_by_channel_id') as mock_get_subs:
+        await webhook_service.process_post(
+            create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1234")
+        )
+
+    webhook_service.post_repository.insert_if_absent.assert_not_called()
+    mock_get.assert_not_called()
+    mock_get_subs.assert_not_called()
+    webhook_service.http_client.post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_releases_guid_on_failure(webhook_service, db_session):
+    """If processing fails the guid is released so a retry is processed"""
+    from app.models.post import Post
+    from app.models.subscription import Subscription
+    from app.repositories.post_repository import PostRepository
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channel.id, callback_url="http://callback1.com/webhook"))
+    db_session.commit()
+
+    webhook_service.post_repository = PostRepository(webhook_service.repository.db)
+    post = create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1234")
+
+    with patch.object(webhook_service, '_parse_html_content', side_effect=ValueError("broken")):
+        with pytest.raises(HTTPException):
+            await webhook_service.process_post(post)
+
+    assert db_session.query(Post).count() == 0
+
+    await webhook_service.process_post(post)
+    webhook_service.http_client.post.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_commits_guid_with_outbox_rows(webhook_service, db_session):
+    """The guid and the outbox deliveries are committed in one transaction"""
+    from app.models.outbox import OutboxMessage
+    from app.models.post import Post
+    from app.models.subscription import Subscription
+    from app.repositories.post_repository import PostRepository
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channel.id, callback_url="http://callback1.com/webhook"))
+    db_session.commit()
+
+    webhook_service.use_outbox = True
+    webhook_service.post_repository = PostRepository(webhook_service.db)
+    post = create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1234")
+
+    with patch.object(webhook_service.outbox_repository, 'enqueue', side_effect=RuntimeError("db is gone")):
+        with pytest.raises(HTTPException):
+            await webhook_service.process_post(post)
+
+    assert db_session.query(Post).count() == 0
+    assert db_session.query(OutboxMessage).count() == 0
+
+    with patch.object(webhook_service.db, 'commit', wraps=webhook_service.db.commit) as commit:
+        assert await webhook_service.process_post(post) is True
+
+    commit.assert_called_once()
+    assert db_session.query(Post).filter(Post.guid == "guid_1").count() == 1
+    assert db_session.query(OutboxMessage).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_direct_delivery_runs_outside_transaction(webhook_service, db_session):
+    """Without the outbox the guid is committed before callbacks are sent"""
+    from app.models.post import Post
+    from app.models.subscription import Subscription
+    from app.repositories.post_repository import PostRepository
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(channel_name="test_channel", is_monitored=True)
+    db_session.add(channel)
+    db_session.flush()
+    db_session.add(Subscription(channel_id=channel.id, callback_url="http://callback1.com/webhook"))
+    db_session.commit()
+
+    webhook_service.post_repository = PostRepository(webhook_service.db)
+    in_transaction = []
+
+    async def post_callback(*args, **kwargs):
+        in_transaction.append(webhook_service.db.in_transaction())
+        return MagicMock(status_code=200)
+
+    webhook_service.http_client.post = AsyncMock(side_effect=post_callback)
+
+    await webhook_service.process_post(
+        create_test_post_webhook(id="guid_1", url="https://t.me/test_channel/1")
+    )
+    await webhook_service.process_batch([
+        create_test_post_webhook(id="guid_2", url="https://t.me/test_channel/2")
+    ])
+
+    assert in_transaction == [False, False]
+    assert db_session.query(Post).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_process_webhook_uses_routing_cache(webhook_service):
+    """Channel and subscriptions are loaded once and then served from the routing cache"""
+    from app.models.subscription import Subscription
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(id=1, channel_name="test_channel", is_monitored=True)
+    subscription = Subscription(id=1, channel_id=1, callback_url="http://callback1.com/webhook", is_active=True)
+
+    with patch.object(webhook_service.repository, 'get_by_channel_name', return_value=channel) as mock_get, \
+         patch.object(webhook_service.subscription_repository, 'get_active_by_channel_id',
+                      return_value=[subscription]) as mock_get_subs:
+        for i in range(3):
+            await webhook_service.process_post(
+                create_test_post_webhook(id=f"guid_{i}", url="https://t.me/test_channel/1234")
+            )
+
+    mock_get.assert_called_once_with("test_channel")
+    mock_get_subs.assert_called_once_with(1)
+    assert webhook_service.http_client.post.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_process_batch_delivers_in_order_per_host(webhook_service):
+    """Routes are loaded with one query and each host receives posts sequentially in order"""
+    import asyncio
+    import json
+
+    from app.models.subscription import Subscription
+    from tests.factories.post import create_test_post_webhook
+
+    channel = Channel(id=1, channel_name="test_channel", is_monitored=True)
+    rows = [
+        (channel, Subscription(id=1, channel_id=1, callback_url="http://slow.com/a", is_active=True)),
+        (channel, Subscription(id=2, channel_id=1, callback_url="http://fast.com/b", is_active=True))
+    ]
+    posts = [
+        create_test_post_webhook(id=f"guid_{i}", url=f"https://t.me/test_channel/{i}",
+                                 date_published=f"2024-03-14T12:0{i}:00+00:00")
+        for i in (3, 1, 2)
+    ]
+    webhook_service.post_repository.insert_many_if_absent = AsyncMock(
+        return_value={post.guid for post in posts}
+    )
+
+    sent = []
+    active = {}
+
+    async def record_post(url, content, headers):
+        host = url.split("/")[2]
+        active[host] = active.get(host, 0) + 1
+        assert active[host] == 1
+        await asyncio.sleep(0.01)
+        sent.append((host, json.loads(content)["guid"]))
+        active[host] -= 1
+        return MagicMock(status_code=200)
+
+    webhook_service.http_client.post = AsyncMock(side_effect=record_post)
+
+    with patch.object(webhook_service.repository, 'get_with_active_subscriptions',
+                      return_value=rows) as mock_routes:
+        summary = await webhook_service.process_batch(posts)
+
+    mock_routes.assert_called_once_with(["test_channel"])
+    assert summary["successful_deliveries"] == 6
+    for host in ("slow.com", "fast.com"):
+        assert [guid for h, guid in sent if h == host] == ["guid_1", "guid_2", "guid_3"]